@@ -0,0 +1,346 @@
+# ============================================================================
+# SERVIDOR REPLICATE LOCAL (SIMULADO)
+# Implementa lo mínimo de la API de predicciones para medir sin gastar en la API real
+# ============================================================================
+
+import io
+import json
+import time
+import uuid
+import random
+import hashlib
+import threading
+from email import policy
+from email.parser import BytesParser
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+def _iso(instante: Optional[float]) -> Optional[str]:
+    if instante is None:
+        return None
+    return datetime.fromtimestamp(instante, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _imagen_png(ancho: int, alto: int) -> bytes:
+    """Genera una imagen PNG de prueba (con ruido para que no comprima a casi nada)."""
+    from PIL import Image
+
+    img = Image.frombytes("RGB", (ancho, alto), random.randbytes(ancho * alto * 3))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ServidorReplicateFalso:
+    """
+    Servidor HTTP local que imita los endpoints de predicciones de Replicate.
+
+    Cada predicción pasa por "starting" durante el retardo de cola y por
+    "processing" durante el retardo de ejecución; luego termina bien (con la URL
+    de una imagen servida por el propio servidor) o falla según `tasa_fallos`.
+    También acepta subidas de archivos (POST /v1/files) como la API real.
+    """
+
+    def __init__(self,
+                 retardo_cola: float = 0.5,
+                 retardo_ejecucion: float = 2.0,
+                 variacion: float = 0.2,
+                 tasa_fallos: float = 0.0,
+                 tasa_throttling: float = 0.0,
+                 tamano_imagen: tuple = (1024, 768),
+                 host: str = "127.0.0.1",
+                 puerto: int = 0,
+                 acepta_subidas: bool = True):
+        """
+        Args:
+            retardo_cola: Segundos medios en estado "starting"
+            retardo_ejecucion: Segundos medios en estado "processing"
+            variacion: Variación relativa aleatoria de los retardos (0.2 = ±20%)
+            tasa_fallos: Proporción de predicciones que terminan en "failed"
+            tasa_throttling: Proporción de peticiones respondidas con 429
+            tamano_imagen: Tamaño (ancho, alto) de la imagen servida como salida
+            host: Interfaz donde escuchar
+            puerto: Puerto (0 para uno libre)
+            acepta_subidas: Si es False POST /v1/files responde 404 (proveedor sin subidas)
+        """
+        self.retardo_cola = retardo_cola
+        self.retardo_ejecucion = retardo_ejecucion
+        self.variacion = variacion
+        self.tasa_fallos = tasa_fallos
+        self.tasa_throttling = tasa_throttling
+        self.host = host
+        self.puerto = puerto
+        self.acepta_subidas = acepta_subidas
+        self.imagen = _imagen_png(*tamano_imagen)
+        self.predicciones = {}
+        self.archivos = {}
+        self.contadores = {"create": 0, "get": 0, "cancel": 0, "download": 0, "throttled": 0,
+                           "upload": 0, "bytes_create": 0, "bytes_upload": 0}
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.puerto}"
+
+    def _retardo(self, media: float) -> float:
+        return max(0.0, media * random.uniform(1 - self.variacion, 1 + self.variacion))
+
+    def crear(self, modelo: str, cuerpo: dict) -> dict:
+        """Registra una predicción nueva y devuelve su JSON."""
+        ahora = time.time()
+        prediccion = {
+            "id": uuid.uuid4().hex,
+            "model": modelo,
+            "input": cuerpo.get("input", {}),
+            "creada": ahora,
+            "inicio": ahora + self._retardo(self.retardo_cola),
+            "falla": random.random() < self.tasa_fallos,
+            "cancelada": None,
+        }
+        prediccion["fin"] = prediccion["inicio"] + self._retardo(self.retardo_ejecucion)
+        with self._lock:
+            self.predicciones[prediccion["id"]] = prediccion
+            self.contadores["create"] += 1
+        return self.estado(prediccion["id"])
+
+    def subir(self, nombre: str, content_type: str, contenido: bytes) -> dict:
+        """Guarda un archivo subido y devuelve su JSON (con la URL para usarlo como input)."""
+        ahora = time.time()
+        archivo = {
+            "id": uuid.uuid4().hex,
+            "name": nombre,
+            "content_type": content_type,
+            "size": len(contenido),
+            "etag": hashlib.md5(contenido).hexdigest(),
+            "checksums": {"sha256": hashlib.sha256(contenido).hexdigest()},
+            "metadata": {},
+            "created_at": _iso(ahora),
+            "expires_at": _iso(ahora + 24 * 3600),
+        }
+        archivo["urls"] = {"get": f"{self.base_url}/v1/files/{archivo['id']}/download"}
+        with self._lock:
+            self.archivos[archivo["id"]] = (archivo, contenido)
+            self.contadores["upload"] += 1
+            self.contadores["bytes_upload"] += len(contenido)
+        return archivo
+
+    def cancelar(self, prediction_id: str) -> Optional[dict]:
+        with self._lock:
+            prediccion = self.predicciones.get(prediction_id)
+            if prediccion is None:
+                return None
+            self.contadores["cancel"] += 1
+            if prediccion["cancelada"] is None and time.time() < prediccion["fin"]:
+                prediccion["cancelada"] = time.time()
+        return self.estado(prediction_id)
+
+    def estado(self, prediction_id: str) -> Optional[dict]:
+        """JSON de la predicción según el tiempo transcurrido."""
+        prediccion = self.predicciones.get(prediction_id)
+        if prediccion is None:
+            return None
+
+        ahora = time.time()
+        iniciada = prediccion["inicio"] if ahora >= prediccion["inicio"] else None
+        completada = None
+        output = None
+        error = None
+
+        if prediccion["cancelada"] is not None:
+            status, completada = "canceled", prediccion["cancelada"]
+        elif ahora < prediccion["inicio"]:
+            status = "starting"
+        elif ahora < prediccion["fin"]:
+            status = "processing"
+        elif prediccion["falla"]:
+            status, completada, error = "failed", prediccion["fin"], "Fallo simulado"
+        else:
+            status, completada = "succeeded", prediccion["fin"]
+            # Modelos multi-salida: una URL por imagen pedida (num_outputs / max_images)
+            cantidad = int(prediccion["input"].get("num_outputs") or prediccion["input"].get("max_images") or 1)
+            if cantidad == 1:
+                output = [f"{self.base_url}/files/{prediction_id}.png"]
+            else:
+                output = [f"{self.base_url}/files/{prediction_id}_{i}.png" for i in range(cantidad)]
+
+        return {
+            "id": prediction_id,
+            "model": prediccion["model"],
+            "version": "simulada",
+            "status": status,
+            "input": prediccion["input"],
+            "output": output,
+            "logs": "",
+            "error": error,
+            "metrics": {},
+            "created_at": _iso(prediccion["creada"]),
+            "started_at": _iso(iniciada),
+            "completed_at": _iso(completada),
+            "urls": {
+                "get": f"{self.base_url}/v1/predictions/{prediction_id}",
+                "cancel": f"{self.base_url}/v1/predictions/{prediction_id}/cancel",
+            },
+        }
+
+    def _throttle(self) -> bool:
+        if self.tasa_throttling and random.random() < self.tasa_throttling:
+            with self._lock:
+                self.contadores["throttled"] += 1
+            return True
+        return False
+
+    def iniciar(self) -> "ServidorReplicateFalso":
+        """Arranca el servidor en un hilo en segundo plano."""
+        servidor_falso = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _responder_json(self, codigo: int, cuerpo: dict, headers: Optional[dict] = None):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                for nombre, valor in (headers or {}).items():
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _leer_cuerpo(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _leer_json(self) -> dict:
+                return json.loads(self._leer_cuerpo() or b"{}")
+
+            def _leer_archivo_multipart(self):
+                """Extrae (nombre, content_type, contenido) de la parte "content" del formulario."""
+                cabecera = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+                mensaje = BytesParser(policy=policy.default).parsebytes(cabecera + self._leer_cuerpo())
+                for parte in mensaje.iter_parts():
+                    if parte.get_param("name", header="content-disposition") == "content":
+                        return parte.get_filename() or "file", parte.get_content_type(), parte.get_payload(decode=True)
+                return None
+
+            def _responder_throttling(self):
+                self._responder_json(
+                    429,
+                    {"detail": "Request was throttled. Expected available in 1 second.", "status": 429},
+                    {"Retry-After": "1"},
+                )
+
+            def do_POST(self):
+                partes = self.path.strip("/").split("/")
+                # /v1/models/{owner}/{name}/predictions
+                if len(partes) == 5 and partes[:2] == ["v1", "models"] and partes[4] == "predictions":
+                    datos = self._leer_cuerpo()
+                    cuerpo = json.loads(datos or b"{}")
+                    with servidor_falso._lock:
+                        servidor_falso.contadores["bytes_create"] += len(datos)
+                    if servidor_falso._throttle():
+                        return self._responder_throttling()
+                    return self._responder_json(201, servidor_falso.crear(f"{partes[2]}/{partes[3]}", cuerpo))
+
+                # /v1/files (multipart con el campo "content")
+                if partes == ["v1", "files"]:
+                    if not servidor_falso.acepta_subidas:
+                        self._leer_cuerpo()
+                        return self._responder_json(404, {"detail": "Not found", "status": 404})
+                    if servidor_falso._throttle():
+                        self._leer_cuerpo()
+                        return self._responder_throttling()
+                    archivo = self._leer_archivo_multipart()
+                    if archivo is None:
+                        return self._responder_json(400, {"detail": "Falta el campo content", "status": 400})
+                    return self._responder_json(201, servidor_falso.subir(*archivo))
+
+                # /v1/predictions/{id}/cancel
+                if len(partes) == 4 and partes[:2] == ["v1", "predictions"] and partes[3] == "cancel":
+                    self._leer_json()
+                    estado = servidor_falso.cancelar(partes[2])
+                    if estado is None:
+                        return self._responder_json(404, {"detail": "Not found", "status": 404})
+                    return self._responder_json(200, estado)
+
+                self._responder_json(404, {"detail": "Not found", "status": 404})
+
+            def do_GET(self):
+                partes = self.path.strip("/").split("/")
+                # /v1/predictions/{id}
+                if len(partes) == 3 and partes[:2] == ["v1", "predictions"]:
+                    if servidor_falso._throttle():
+                        return self._responder_throttling()
+                    with servidor_falso._lock:
+                        servidor_falso.contadores["get"] += 1
+                    estado = servidor_falso.estado(partes[2])
+                    if estado is None:
+                        return self._responder_json(404, {"detail": "Not found", "status": 404})
+                    return self._responder_json(200, estado)
+
+                # /files/{id}.png
+                if len(partes) == 2 and partes[0] == "files":
+                    return self._servir_imagen()
+
+                # /v1/files/{id}/download
+                if len(partes) == 4 and partes[:2] == ["v1", "files"] and partes[3] == "download":
+                    archivo = servidor_falso.archivos.get(partes[2])
+                    if archivo is None:
+                        return self._responder_json(404, {"detail": "Not found", "status": 404})
+                    metadatos, contenido = archivo
+                    self.send_response(200)
+                    self.send_header("Content-Type", metadatos["content_type"])
+                    self.send_header("Content-Length", str(len(contenido)))
+                    self.end_headers()
+                    self.wfile.write(contenido)
+                    return
+
+                self._responder_json(404, {"detail": "Not found", "status": 404})
+
+            def _servir_imagen(self):
+                datos = servidor_falso.imagen
+                inicio = 0
+                rango = self.headers.get("Range")
+                if rango and rango.startswith("bytes="):
+                    inicio = int(rango[len("bytes="):].split("-")[0] or 0)
+
+                with servidor_falso._lock:
+                    servidor_falso.contadores["download"] += 1
+
+                if inicio >= len(datos):
+                    # Rango que empieza después del final: 416 con el tamaño real
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(datos)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(206 if inicio else 200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(datos) - inicio))
+                if inicio:
+                    self.send_header("Content-Range", f"bytes {inicio}-{len(datos) - 1}/{len(datos)}")
+                self.end_headers()
+                self.wfile.write(datos[inicio:])
+
+            def log_message(self, format, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), _Manejador)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self) -> None:
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
@@ -0,0 +1,356 @@
+# ============================================================================
+# SUITE DE BENCHMARKS DEL PIPELINE
+# Mide generación + descarga, prompts y redimensionado contra el servidor simulado
+# ============================================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.benchmarks.fake_replicate import ServidorReplicateFalso
+from src.utils.metrics import AgregadorMemoria, instrumentacion
+from src.utils.logging_config import configurar_logging, obtener_logger
+
+logger = obtener_logger(__name__)
+
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "benchmarks")
+RUTA_PROMPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "prompts", "img_prompts.json")
+DIRECTORIO_RAIZ = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+# Presupuesto de importación (ms acumulados) de los módulos que cargan los comandos
+# de la CLI; replicate, requests y PIL deben importarse solo al usarse
+PRESUPUESTO_IMPORTACION_MS = {
+    "src.cli": 50,
+    "src.utils.random_prompt_generator": 50,
+    "src.utils.catalog": 50,
+    "src.processors.generador_imagenes_basico": 100,
+    "src.processors.generador_lotes": 120,
+}
+
+
+def percentiles(valores: List[float]) -> dict:
+    """Resumen de latencias en segundos: n, media, p50, p95, p99 y máximo."""
+    if not valores:
+        return {"n": 0, "media": None, "p50": None, "p95": None, "p99": None, "max": None}
+
+    ordenados = sorted(valores)
+
+    def _p(q: float) -> float:
+        # Interpolación lineal entre los dos rangos más cercanos
+        posicion = (len(ordenados) - 1) * q
+        inferior = int(posicion)
+        superior = min(inferior + 1, len(ordenados) - 1)
+        return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+    return {
+        "n": len(ordenados),
+        "media": sum(ordenados) / len(ordenados),
+        "p50": _p(0.50),
+        "p95": _p(0.95),
+        "p99": _p(0.99),
+        "max": ordenados[-1],
+    }
+
+
+def rss_pico_mb() -> Optional[float]:
+    """Memoria residente máxima del proceso en MB (None si la plataforma no la expone)."""
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux la reporta en KB y macOS en bytes
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+class _Medicion:
+    """Cronometra un bloque: tiempo de pared, tiempo de CPU y RSS pico al terminar."""
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        self.cpu_inicio = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.duracion = time.perf_counter() - self.inicio
+        self.cpu = time.process_time() - self.cpu_inicio
+        self.rss_pico_mb = rss_pico_mb()
+
+    def resumen(self) -> dict:
+        return {"duracion": self.duracion, "cpu_segundos": self.cpu, "rss_pico_mb": self.rss_pico_mb}
+
+
+def _crear_generador_cronometrado(**kwargs):
+    """Crea un GeneradorImagenes que registra la duración de cada etapa."""
+    from src.processors.generador_imagenes_basico import GeneradorImagenes
+
+    class GeneradorCronometrado(GeneradorImagenes):
+        def __init__(self, **kw):
+            super().__init__(**kw)
+            self.tiempos = {"submit": [], "espera": [], "descarga": []}
+
+        def _cronometrar(self, etapa, funcion, *args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                self.tiempos[etapa].append(time.perf_counter() - inicio)
+
+        def enviar_prediccion(self, *args, **kwargs):
+            return self._cronometrar("submit", super().enviar_prediccion, *args, **kwargs)
+
+        def esperar_prediccion(self, *args, **kwargs):
+            return self._cronometrar("espera", super().esperar_prediccion, *args, **kwargs)
+
+        def descargar_imagen(self, *args, **kwargs):
+            return self._cronometrar("descarga", super().descargar_imagen, *args, **kwargs)
+
+    return GeneradorCronometrado(**kwargs)
+
+
+def medir_generacion(servidor: ServidorReplicateFalso,
+                     tamano_lote: int,
+                     concurrencia: int,
+                     directorio: str,
+                     imagen_referencia: str) -> dict:
+    """Ejecuta un lote contra el servidor simulado y resume rendimiento y latencias por etapa."""
+    from src.processors.generador_lotes import GeneradorLotes
+    from src.utils.result_cache import CacheResultados
+    from src.utils.reference_uploads import SubidasReferencias
+
+    generador = _crear_generador_cronometrado(
+        base_url=servidor.base_url,
+        cache_resultados=CacheResultados(os.path.join(directorio, "cache")),
+        intervalo_inicial=0.25,
+        intervalo_maximo=2.0,
+    )
+    # Subidas solo en memoria: el puerto del servidor simulado cambia en cada ejecución
+    generador.subidas_referencias = SubidasReferencias(ruta_indice=None)
+    salida = os.path.join(directorio, f"salida_{tamano_lote}_{concurrencia}")
+    trabajos = [
+        {
+            "prompt": f"Benchmark {i}",
+            "imagen_referencia": imagen_referencia,
+            "ruta_destino": salida,
+            "nombre_archivo": f"{i}.png",
+            "nombre_carpeta": "bench",
+            "usar_cache": False,
+        }
+        for i in range(tamano_lote)
+    ]
+
+    # Los tiempos remotos (cola y ejecución) salen de los timestamps de cada predicción
+    agregador = AgregadorMemoria()
+    instrumentacion.agregar_sink(agregador)
+    try:
+        with _Medicion() as medicion:
+            resultado = GeneradorLotes(generador, concurrencia).procesar(trabajos)
+    finally:
+        instrumentacion.quitar_sink(agregador)
+
+    resumen = resultado["resumen"]
+    return {
+        "tamano_lote": tamano_lote,
+        "concurrencia": concurrencia,
+        "imagenes_por_minuto": resumen["imagenes_por_minuto"],
+        "exitosos": resumen["exitosos"],
+        "fallidos": resumen["fallidos"],
+        **medicion.resumen(),
+        "latencias": {
+            "trabajo": percentiles([r["duracion"] for r in resultado["resultados"]]),
+            **{etapa: percentiles(valores) for etapa, valores in generador.tiempos.items()},
+        },
+        "instrumentacion": agregador.resumen(),
+    }
+
+
+def medir_prompts(cantidad: int) -> dict:
+    """Mide generate_random_prompt (por llamada) y generate_prompts_bulk (lote completo)."""
+    from src.utils.prompt_history import InMemoryPromptHistory
+    from src.utils.random_prompt_generator import generate_prompts_bulk, generate_random_prompt
+
+    filas = [
+        {"motorcycle_type": "Naked", "city": "Ciudad de México", "model": f"Modelo {i // 3}", "img_count": i % 3}
+        for i in range(cantidad)
+    ]
+
+    historial = InMemoryPromptHistory()
+    latencias = []
+    with _Medicion() as individual:
+        for fila in filas:
+            inicio = time.perf_counter()
+            generate_random_prompt(fila["motorcycle_type"], fila["city"], fila["model"], fila["img_count"],
+                                   prompts_config_path=RUTA_PROMPTS, history=historial)
+            latencias.append(time.perf_counter() - inicio)
+
+    with _Medicion() as lote:
+        generate_prompts_bulk(filas, seed=0, prompts_config_path=RUTA_PROMPTS)
+
+    return {
+        "cantidad": cantidad,
+        "individual": {**individual.resumen(), "latencias": percentiles(latencias)},
+        "lote": {**lote.resumen(), "prompts_por_segundo": cantidad / lote.duracion if lote.duracion else None},
+    }
+
+
+def medir_resize(rutas: List[str], directorio: str, ancho: int = 800, alto: int = 600) -> dict:
+    """Mide ResizeImage.resize_and_crop_transparent sobre imágenes descargadas."""
+    from src.utils.resize_image import ResizeImage
+
+    os.makedirs(directorio, exist_ok=True)
+    latencias = []
+    with _Medicion() as medicion:
+        for i, ruta in enumerate(rutas):
+            inicio = time.perf_counter()
+            ResizeImage.resize_and_crop_transparent(ruta, os.path.join(directorio, f"{i}.png"), ancho, alto)
+            latencias.append(time.perf_counter() - inicio)
+
+    return {"imagenes": len(rutas), **medicion.resumen(), "latencias": percentiles(latencias)}
+
+
+def _ms_importacion(modulo: str) -> float:
+    """Tiempo acumulado (ms) de importar `modulo` en un intérprete nuevo, según -X importtime."""
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                             capture_output=True, text=True, cwd=DIRECTORIO_RAIZ, check=True)
+    for linea in reversed(proceso.stderr.splitlines()):
+        partes = [parte.strip() for parte in linea.split("|")]
+        if len(partes) == 3 and partes[2] == modulo:
+            return int(partes[1]) / 1000
+    raise RuntimeError(f"No se encontró {modulo} en la salida de -X importtime")
+
+
+def medir_importacion(presupuesto: Dict[str, float] = PRESUPUESTO_IMPORTACION_MS, repeticiones: int = 3) -> dict:
+    """
+    Mide el tiempo de importación de cada módulo (mínimo de `repeticiones`) y lo
+    compara con su presupuesto.
+    """
+    modulos = {}
+    for modulo, limite in presupuesto.items():
+        ms = min(_ms_importacion(modulo) for _ in range(repeticiones))
+        modulos[modulo] = {"ms": ms, "presupuesto_ms": limite, "dentro_presupuesto": ms <= limite}
+        if ms > limite:
+            logger.warning(f"⚠️ Importar {modulo} tarda {ms:.0f} ms (presupuesto {limite} ms)")
+
+    return {"modulos": modulos, "dentro_presupuesto": all(m["dentro_presupuesto"] for m in modulos.values())}
+
+
+def _version_git() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar_suite(lotes: List[int],
+                   concurrencias: List[int],
+                   retardo_cola: float = 0.5,
+                   retardo_ejecucion: float = 2.0,
+                   tasa_fallos: float = 0.0,
+                   prompts: int = 1000,
+                   salida: Optional[str] = None) -> Dict:
+    """
+    Ejecuta la suite completa y guarda el resultado en JSON.
+
+    Args:
+        lotes: Tamaños de lote a medir
+        concurrencias: Niveles de concurrencia a medir para cada tamaño de lote
+        retardo_cola: Segundos medios de cola del servidor simulado
+        retardo_ejecucion: Segundos medios de ejecución del servidor simulado
+        tasa_fallos: Proporción de predicciones simuladas que fallan
+        prompts: Número de prompts para el benchmark de prompts
+        salida: Ruta del JSON (por defecto src/data/benchmarks/bench_<fecha>.json)
+
+    Returns:
+        Resultados de la suite
+    """
+    os.environ.setdefault("REPLICATE_API_TOKEN", "benchmark")
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _version_git(),
+        "configuracion": {
+            "lotes": lotes,
+            "concurrencias": concurrencias,
+            "retardo_cola": retardo_cola,
+            "retardo_ejecucion": retardo_ejecucion,
+            "tasa_fallos": tasa_fallos,
+        },
+        "generacion": [],
+    }
+
+    with tempfile.TemporaryDirectory() as directorio:
+        from PIL import Image
+        imagen_referencia = os.path.join(directorio, "referencia.png")
+        Image.new("RGB", (2000, 1500), (200, 30, 30)).save(imagen_referencia)
+
+        with ServidorReplicateFalso(retardo_cola, retardo_ejecucion, tasa_fallos=tasa_fallos) as servidor:
+            for tamano_lote in lotes:
+                for concurrencia in concurrencias:
+                    resultados["generacion"].append(
+                        medir_generacion(servidor, tamano_lote, concurrencia, directorio, imagen_referencia)
+                    )
+            resultados["llamadas_servidor"] = dict(servidor.contadores)
+
+        descargadas = [
+            os.path.join(raiz, nombre)
+            for raiz, _, archivos in os.walk(directorio)
+            for nombre in archivos
+            if nombre.endswith(".png") and "salida_" in raiz
+        ][:50]
+        resultados["resize"] = medir_resize(descargadas, os.path.join(directorio, "resize"))
+
+    resultados["prompts"] = medir_prompts(prompts)
+    resultados["importacion"] = medir_importacion()
+
+    salida = salida or os.path.join(
+        DIRECTORIO_RESULTADOS, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    resultados["archivo"] = salida
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=4)
+
+    logger.info(f"📊 Resultados guardados en: {salida}")
+    return resultados
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline contra un Replicate simulado")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[20], help="Tamaños de lote")
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 4, 16], help="Niveles de concurrencia")
+    parser.add_argument("--retardo-cola", type=float, default=0.5, help="Segundos medios en cola")
+    parser.add_argument("--retardo-ejecucion", type=float, default=2.0, help="Segundos medios de ejecución")
+    parser.add_argument("--tasa-fallos", type=float, default=0.0, help="Proporción de predicciones fallidas")
+    parser.add_argument("--prompts", type=int, default=1000, help="Prompts a generar en el benchmark de prompts")
+    parser.add_argument("--salida", help="Ruta del JSON de resultados")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar el progreso de cada trabajo")
+    parser.add_argument("--silencioso", action="store_true", help="Mostrar solo advertencias y errores "
+                                                                  "(por defecto salvo con --verbose)")
+    args = parser.parse_args(argv)
+
+    configurar_logging(silencioso=args.silencioso or not args.verbose)
+
+    resultados = ejecutar_suite(args.lotes, args.concurrencia, args.retardo_cola, args.retardo_ejecucion,
+                                args.tasa_fallos, args.prompts, args.salida)
+    print(f"📊 Resultados guardados en: {resultados['archivo']}")
+    fallidos = sum(medida["fallidos"] for medida in resultados["generacion"])
+    if fallidos:
+        print(f"❌ {fallidos} trabajos fallaron en los benchmarks de generación")
+    # Código de salida 1 si falla algún trabajo o algún módulo se pasa de su presupuesto de importación
+    return 0 if resultados["importacion"]["dentro_presupuesto"] and not fallidos else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+# ============================================================================
+# LÍNEA DE COMANDOS
+# python -m src <comando> ...  (prompts, generate, enqueue, worker, resize, mirror, bench)
+# Cada comando importa sus dependencias pesadas solo al ejecutarse
+# ============================================================================
+
+import os
+import sys
+import json
+import argparse
+from typing import List, Optional
+
+from src.utils.logging_config import configurar_logging, obtener_logger
+
+logger = obtener_logger(__name__)
+
+# Comandos que reenvían sus argumentos a la línea de comandos de su módulo
+COMANDOS_DELEGADOS = {
+    "mirror": "src.utils.reference_mirror",
+    "bench": "src.benchmarks.run_benchmarks",
+}
+
+# Relativa al paquete, no al directorio desde el que se ejecuta
+RUTA_CONFIG_PROMPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "prompts", "img_prompts.json")
+
+
+def _leer_trabajos(ruta: str) -> List[dict]:
+    """Lee trabajos de generación desde un JSON (lista) o un JSONL (uno por línea)."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        if ruta.lower().endswith(".jsonl"):
+            return [json.loads(linea) for linea in f if linea.strip()]
+        return json.load(f)
+
+
+def _espejo(args):
+    """Espejo local de referencias si se pidió con --espejo."""
+    if not args.espejo:
+        return None
+    from src.utils.reference_mirror import EspejoReferencias
+    return EspejoReferencias()
+
+
+def comando_prompts(args) -> int:
+    """Genera prompts para las publicaciones del catálogo y los escribe como JSONL."""
+    from src.utils.catalog import HuellasCatalogo, RUTA_CATALOGO, leer_catalogo, publicaciones_cambiadas
+    from src.utils.prompt_config import MOTORCYCLE_CATEGORIES
+    from src.utils.random_prompt_generator import generate_prompts_bulk
+
+    ruta_catalogo = args.catalogo or RUTA_CATALOGO
+    huellas = None
+    if args.solo_cambios:
+        huellas = HuellasCatalogo(args.huellas) if args.huellas else HuellasCatalogo()
+        publicaciones = publicaciones_cambiadas(huellas, ruta_catalogo, args.disponibilidad, args.tipos)
+    else:
+        publicaciones = leer_catalogo(ruta_catalogo, args.disponibilidad, args.tipos)
+
+    tipos_soportados = {tipo for tipos in MOTORCYCLE_CATEGORIES.values() for tipo in tipos}
+    filas = []
+    procesadas = []
+    for publicacion in publicaciones:
+        if publicacion.type not in tipos_soportados:
+            logger.warning(f"⚠️ Tipo no soportado para {publicacion.id}: '{publicacion.type}'")
+            continue
+        procesadas.append(publicacion)
+        for img_count in range(args.imagenes):
+            filas.append({
+                "id": publicacion.id,
+                "motorcycle_type": publicacion.type,
+                "city": args.ciudad,
+                "model": f"{publicacion.brand} {publicacion.model}",
+                "img_count": img_count,
+                "image_link": publicacion.image_link,
+            })
+
+    prompts = generate_prompts_bulk(filas, seed=args.seed, prompts_config_path=args.config)
+
+    salida = open(args.salida, "w", encoding="utf-8") if args.salida else sys.stdout
+    try:
+        for fila, prompt in zip(filas, prompts):
+            salida.write(json.dumps({**fila, **prompt}, ensure_ascii=False) + "\n")
+    finally:
+        if args.salida:
+            salida.close()
+
+    # Solo con los prompts ya escritos: si algo falla antes, la siguiente ejecución los repite
+    if huellas is not None:
+        for publicacion in procesadas:
+            huellas.confirmar(publicacion)
+        huellas.guardar()
+
+    logger.info(f"✅ {len(prompts)} prompts generados")
+    return 0
+
+
+def comando_generate(args) -> int:
+    """Genera (y opcionalmente redimensiona) los trabajos de un archivo JSON/JSONL."""
+    from src.processors.generador_imagenes_basico import GeneradorImagenes
+
+    generador = GeneradorImagenes(args.modelo, base_url=args.base_url, espejo=_espejo(args))
+
+    if args.carpeta_resize:
+        from src.processors.pipeline import PipelineImagenes
+
+        procesador = PipelineImagenes(generador, args.concurrencia, args.concurrencia,
+                                      carpeta_resize=args.carpeta_resize, ancho=args.ancho, alto=args.alto,
+                                      guardar_original=args.guardar_original)
+    else:
+        from src.processors.generador_lotes import GeneradorLotes
+        from src.utils.job_ledger import RegistroTrabajos
+
+        registro = RegistroTrabajos(args.registro) if args.registro else None
+        procesador = GeneradorLotes(generador, args.concurrencia, registro)
+        if args.reanudar:
+            if registro is None:
+                raise SystemExit("--reanudar necesita --registro")
+            resumen = procesador.reanudar()["resumen"]
+            print(json.dumps(resumen, ensure_ascii=False, indent=2))
+            return 1 if resumen["fallidos"] else 0
+
+    if not args.trabajos:
+        raise SystemExit("Falta --trabajos")
+
+    resumen = procesador.procesar(_leer_trabajos(args.trabajos))["resumen"]
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    return 1 if resumen["fallidos"] else 0
+
+
+def comando_enqueue(args) -> int:
+    """Añade los trabajos de un archivo JSON/JSONL a la cola compartida."""
+    from src.utils.job_queue import ColaTrabajos, RUTA_COLA
+
+    cola = ColaTrabajos(args.cola or RUTA_COLA, max_intentos=args.max_intentos, wal=not args.disco_red)
+    if args.reencolar_fallidos:
+        logger.info(f"🔁 {cola.reencolar_fallidos()} trabajos fallidos vueltos a la cola")
+    if args.trabajos:
+        logger.info(f"📥 {cola.encolar(_leer_trabajos(args.trabajos))} trabajos nuevos en la cola")
+    print(json.dumps(cola.resumen(), ensure_ascii=False, indent=2))
+    return 0
+
+
+def comando_worker(args) -> int:
+    """Procesa trabajos de la cola compartida hasta vaciarla (o sin parar con --continuo)."""
+    from src.processors.generador_imagenes_basico import GeneradorImagenes
+    from src.processors.worker import TrabajadorCola
+    from src.utils.job_queue import ColaTrabajos, RUTA_COLA
+
+    cola = ColaTrabajos(args.cola or RUTA_COLA, max_intentos=args.max_intentos, wal=not args.disco_red)
+    generador = GeneradorImagenes(args.modelo, base_url=args.base_url, espejo=_espejo(args))
+    trabajador = TrabajadorCola(cola, generador, args.concurrencia,
+                                duracion_lease=args.lease, carpeta_resize=args.carpeta_resize,
+                                ancho=args.ancho, alto=args.alto, guardar_original=args.guardar_original)
+    resumen = trabajador.ejecutar(hasta_vaciar=not args.continuo)["resumen"]
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    return 1 if resumen["fallidos"] else 0
+
+
+def comando_resize(args) -> int:
+    """Redimensiona todas las imágenes de una carpeta."""
+    from src.utils.resize_image import ResizeImage
+
+    resumen = ResizeImage.process_images_in_folder(args.entrada, args.salida, args.ancho, args.alto,
+                                                   max_workers=args.procesos, incremental=args.incremental,
+                                                   background=tuple(args.fondo), tolerance=args.tolerancia,
+                                                   make_transparent=args.transparentar)
+    logger.info(f"✅ {resumen['processed']} procesadas, {resumen['skipped']} omitidas, "
+                f"{resumen['failed']} fallidas")
+    return 1 if resumen["failed"] else 0
+
+
+def crear_parser_globales() -> argparse.ArgumentParser:
+    """Opciones comunes a todos los comandos (SUPPRESS: si no se dan, no pisan el valor global)."""
+    globales = argparse.ArgumentParser(add_help=False)
+    globales.add_argument("--silencioso", action="store_true", default=argparse.SUPPRESS,
+                          help="Mostrar solo advertencias y errores")
+    return globales
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src", description="Generador de imágenes para motocicletas")
+    parser.add_argument("--silencioso", action="store_true", help="Mostrar solo advertencias y errores")
+    # Las opciones globales también se aceptan después del comando
+    globales = crear_parser_globales()
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    prompts = subparsers.add_parser("prompts", parents=[globales], help="Generar prompts para el catálogo (JSONL)")
+    prompts.add_argument("--catalogo", help="CSV del catálogo (por defecto src/data/df_publications_image.csv)")
+    prompts.add_argument("--config", default=RUTA_CONFIG_PROMPTS, help="JSON de prompts")
+    prompts.add_argument("--disponibilidad", nargs="+", default=["in stock"], help="Valores de availability")
+    prompts.add_argument("--tipos", nargs="+", help="Valores de type a incluir")
+    prompts.add_argument("--solo-cambios", action="store_true", help="Solo publicaciones nuevas o cambiadas")
+    prompts.add_argument("--huellas", help="JSON de huellas de --solo-cambios "
+                                           "(por defecto src/data/registros/catalogo_huellas.json)")
+    prompts.add_argument("--ciudad", default="Ciudad de México", help="Ciudad de los entornos")
+    prompts.add_argument("--imagenes", type=int, default=3, help="Prompts por publicación")
+    prompts.add_argument("--seed", type=int, help="Semilla para resultados reproducibles")
+    prompts.add_argument("--salida", help="Archivo JSONL de salida (por defecto stdout)")
+    prompts.set_defaults(funcion=comando_prompts)
+
+    generate = subparsers.add_parser("generate", parents=[globales], help="Generar imágenes de un archivo de trabajos")
+    generate.add_argument("--trabajos", help="JSON (lista) o JSONL de trabajos de generación")
+    generate.add_argument("--modelo", default="google/nano-banana", help="Modelo de Replicate")
+    generate.add_argument("--base-url", help="URL base de la API (ej: el servidor simulado de benchmarks)")
+    generate.add_argument("--espejo", action="store_true",
+                          help="Usar la copia local de las referencias (ver python -m src mirror)")
+    generate.add_argument("--concurrencia", type=int, default=4, help="Predicciones en curso a la vez")
+    generate.add_argument("--registro", help="Registro SQLite para poder reanudar")
+    generate.add_argument("--reanudar", action="store_true", help="Retomar los pendientes del registro")
+    generate.add_argument("--carpeta-resize", help="Redimensionar en pipeline a esta carpeta")
+    generate.add_argument("--ancho", type=int, default=800, help="Ancho del redimensionado")
+    generate.add_argument("--alto", type=int, default=600, help="Alto del redimensionado")
+    generate.add_argument("--guardar-original", action="store_true",
+                          help="Con --carpeta-resize, escribir también la imagen original")
+    generate.set_defaults(funcion=comando_generate)
+
+    for nombre, ayuda in (("enqueue", "Añadir trabajos a la cola compartida de trabajadores"),
+                          ("worker", "Procesar trabajos de la cola compartida")):
+        comando = subparsers.add_parser(nombre, parents=[globales], help=ayuda)
+        comando.add_argument("--cola", help="Archivo SQLite de la cola, en disco compartido para varias máquinas "
+                                            "(por defecto src/data/registros/cola.sqlite)")
+        comando.add_argument("--max-intentos", type=int, default=3, help="Intentos por trabajo")
+        comando.add_argument("--disco-red", action="store_true", help="La cola está en un disco de red (sin WAL)")
+    enqueue, worker = subparsers.choices["enqueue"], subparsers.choices["worker"]
+    enqueue.add_argument("--trabajos", help="JSON (lista) o JSONL de trabajos de generación")
+    enqueue.add_argument("--reencolar-fallidos", action="store_true", help="Volver a poner en cola los fallidos")
+    enqueue.set_defaults(funcion=comando_enqueue)
+    worker.add_argument("--modelo", default="google/nano-banana", help="Modelo de Replicate")
+    worker.add_argument("--base-url", help="URL base de la API (ej: el servidor simulado de benchmarks)")
+    worker.add_argument("--espejo", action="store_true",
+                        help="Usar la copia local de las referencias (ver python -m src mirror)")
+    worker.add_argument("--concurrencia", type=int, default=4, help="Trabajos en curso a la vez en este proceso")
+    worker.add_argument("--lease", type=float, default=120.0, help="Segundos de cada concesión sin latido")
+    worker.add_argument("--continuo", action="store_true", help="Seguir esperando trabajos al vaciarse la cola")
+    worker.add_argument("--carpeta-resize", help="Redimensionar a esta carpeta tras descargar")
+    worker.add_argument("--ancho", type=int, default=800, help="Ancho del redimensionado")
+    worker.add_argument("--alto", type=int, default=600, help="Alto del redimensionado")
+    worker.add_argument("--guardar-original", action="store_true",
+                        help="Con --carpeta-resize, escribir también la imagen original")
+    worker.set_defaults(funcion=comando_worker)
+
+    resize = subparsers.add_parser("resize", parents=[globales], help="Redimensionar las imágenes de una carpeta")
+    resize.add_argument("entrada", help="Carpeta con las imágenes originales")
+    resize.add_argument("salida", help="Carpeta de salida")
+    resize.add_argument("--ancho", type=int, default=800, help="Ancho objetivo")
+    resize.add_argument("--alto", type=int, default=600, help="Alto objetivo")
+    resize.add_argument("--procesos", type=int, default=1, help="Procesos en paralelo")
+    resize.add_argument("--incremental", action="store_true", help="Omitir salidas ya al día")
+    resize.add_argument("--fondo", type=int, nargs=3, default=[255, 255, 255], metavar=("R", "G", "B"),
+                        help="Color del fondo a recortar")
+    resize.add_argument("--tolerancia", type=int, default=12, help="Diferencia por canal aceptada como fondo (0-255)")
+    resize.add_argument("--transparentar", action="store_true", help="Volver transparente el fondo restante")
+    resize.set_defaults(funcion=comando_resize)
+
+    for comando, modulo in COMANDOS_DELEGADOS.items():
+        subparsers.add_parser(comando, add_help=False, help=f"Ver python -m {modulo} --help")
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    # Opciones globales antes del comando
+    posicion = 0
+    while posicion < len(argv) and argv[posicion].startswith("-"):
+        posicion += 1
+
+    # mirror y bench tienen su propia línea de comandos: se les pasa el resto de argumentos
+    if posicion < len(argv) and argv[posicion] in COMANDOS_DELEGADOS:
+        import importlib
+        globales = crear_parser_globales().parse_args(argv[:posicion])
+        resto = argv[posicion + 1:]
+        if getattr(globales, "silencioso", False) and "--silencioso" not in resto:
+            resto.append("--silencioso")
+        modulo = importlib.import_module(COMANDOS_DELEGADOS[argv[posicion]])
+        return modulo.main(resto)
+
+    args = crear_parser().parse_args(argv)
+    configurar_logging(silencioso=args.silencioso)
+    return args.funcion(args)
@@ -5,27 +5,110 @@
 
 import os
 import time
-import requests
-import replicate
-from src.utils.utils import *
-from src.utils.replicate_utils import *
-from typing import Optional
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.utils.utils import extraer_urls_imagen
+from src.utils.replicate_utils import TiempoAgotadoError, cancelar_prediccion, esperar_completado, esperar_primera
+from src.utils.download_utils import descargar_archivo, descargar_bytes, ruta_temporal_unica
+from src.utils.rate_limiter import es_reintentable_sin_envio, limitador_creacion, llamar_con_reintentos
+from src.utils.metrics import (
+    instrumentacion,
+    registrar_tiempos_remotos,
+    ETAPA_CODIFICACION_REFERENCIA,
+    ETAPA_DESCARGA,
+    ETAPA_ENVIO,
+)
+from src.utils.logging_config import obtener_logger
+from src.utils.hedging import PoliticaCobertura
+from src.processors.model_router import EnrutadorModelos
+from src.utils.result_cache import CacheResultados
+from src.utils.reference_cache import CacheReferencias, cache_referencias as cache_referencias_compartida
+from src.utils.reference_uploads import SubidasReferencias, subidas_referencias as subidas_referencias_compartidas
+from src.utils.reference_mirror import EspejoReferencias
+from typing import Callable, List, Optional, Sequence
+
+logger = obtener_logger(__name__)
+
+# Parámetro de entrada con el que cada modelo acepta varias imágenes por predicción.
+# Los modelos que no aparecen aquí generan una sola imagen por predicción.
+PARAMETRO_NUM_SALIDAS = {
+    "black-forest-labs/flux-schnell": "num_outputs",
+    "black-forest-labs/flux-dev": "num_outputs",
+    "stability-ai/sdxl": "num_outputs",
+    "bytedance/seedream-4": "max_images",
+}
+
+# Descargas simultáneas al bajar todas las salidas de una generación múltiple
+MAX_DESCARGAS_PARALELAS = 8
+
 
 class GeneradorImagenes:
     """Clase básica para generar imágenes usando Replicate con imagen de referencia."""
 
-    def __init__(self, modelo: str = "google/nano-banana"):
+    def __init__(self,
+                 modelo: str = "google/nano-banana",
+                 receptor_webhook=None,
+                 timeout: Optional[float] = 600,
+                 cache_referencias: Optional[CacheReferencias] = None,
+                 cache_resultados: Optional[CacheResultados] = None,
+                 base_url: Optional[str] = None,
+                 intervalo_inicial: float = 1.0,
+                 intervalo_maximo: float = 10.0,
+                 subir_referencias: bool = True,
+                 cobertura: Optional[PoliticaCobertura] = None,
+                 cancelar_al_vencer: bool = True,
+                 enrutador: Optional[EnrutadorModelos] = None,
+                 espejo: Optional[EspejoReferencias] = None):
         """
         Inicializa el generador de imágenes.
 
         Args:
-            api_token: Token de API de Replicate
             modelo: Modelo a usar para generación (por defecto: google/nano-banana)
+            receptor_webhook: ReceptorWebhook opcional para recibir la finalización
+                por webhook en lugar de consultar el estado
+            timeout: Plazo máximo de espera por predicción en segundos (None para no limitar)
+            cache_referencias: Caché de referencias preparadas (por defecto la compartida del proceso)
+            cache_resultados: Caché en disco de imágenes generadas (por defecto src/data/cache/resultados)
+            base_url: URL base de la API (ej: el servidor simulado de src/benchmarks); por defecto Replicate
+            intervalo_inicial: Espera tras la primera consulta de estado (segundos)
+            intervalo_maximo: Tope del intervalo entre consultas de estado (segundos)
+            subir_referencias: Subir cada referencia local una vez y enviar su URL;
+                si es False (o la subida falla) se envía como data URL en cada predicción
+            cobertura: PoliticaCobertura opcional para enviar un duplicado de las
+                predicciones que superan la latencia habitual y quedarse con la primera
+            cancelar_al_vencer: Cancelar en Replicate las predicciones que agotan su plazo
+            enrutador: EnrutadorModelos opcional; cada predicción va al modelo compatible con
+                menor tiempo esperado y, si falla, se reintenta con el siguiente
+                (`modelo` pasa a ser el primero del enrutador)
+            espejo: EspejoReferencias opcional; las referencias dadas por URL que estén en
+                el espejo (python -m src mirror) se usan desde la copia local
         """
-        self.api_token = os.getenv("REPLICATE_API_TOKEN")
-        self.modelo = modelo
-        self.client = replicate.Client(api_token=self.api_token)
+        # replicate (y httpx) se importan aquí y no al importar el módulo, para que
+        # los comandos que no generan imágenes arranquen rápido
+        import replicate
 
+        self.api_token = os.getenv("REPLICATE_API_TOKEN")
+        self.enrutador = enrutador
+        self.espejo = espejo
+        self.modelo = enrutador.modelos[0] if enrutador is not None else modelo
+        self.client = replicate.Client(api_token=self.api_token, base_url=base_url)
+        self.receptor_webhook = receptor_webhook
+        self.timeout = timeout
+        self.cache_referencias = cache_referencias or cache_referencias_compartida
+        self.base_url = base_url
+        self.subidas_referencias = None
+        if subir_referencias:
+            self.subidas_referencias = (SubidasReferencias(cache_referencias) if cache_referencias
+                                        else subidas_referencias_compartidas)
+        self.cache_resultados = cache_resultados or CacheResultados()
+        self.intervalo_inicial = intervalo_inicial
+        self.intervalo_maximo = intervalo_maximo
+        self.cobertura = cobertura
+        self.cancelar_al_vencer = cancelar_al_vencer
+        # prediction_id -> (modelo, instante de envío), para las estadísticas del enrutador
+        self._en_curso = {}
+        self._lock_en_curso = threading.Lock()
 
     def descargar_imagen(self, url: str, ruta_destino: str, nombre_archivo: str, nombre_carpeta: str) -> str:
         """
@@ -44,25 +127,312 @@ class GeneradorImagenes:
             carpeta_completa = os.path.join(ruta_destino, nombre_carpeta)
             os.makedirs(carpeta_completa, exist_ok=True)
 
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-
-            print("nombre archivo: ", nombre_archivo)
+            logger.debug(f"nombre archivo: {nombre_archivo}")
 
+            # Descarga en bloques con la sesión compartida, a un temporal que se renombra al terminar
             ruta_archivo = os.path.join(carpeta_completa, nombre_archivo)
-            with open(ruta_archivo, 'wb') as f:
-                f.write(response.content)
+            with instrumentacion.span(ETAPA_DESCARGA, modelo=self.modelo):
+                return descargar_archivo(url, ruta_archivo)
 
-            return ruta_archivo
+        except Exception as e:
+            raise RuntimeError(f"Error descargando imagen: {e}")
 
+    def descargar_en_memoria(self, url: str) -> bytes:
+        """
+        Descarga una imagen desde URL a memoria, sin escribirla en disco.
+
+        Args:
+            url: URL de la imagen
+        Returns:
+            Contenido de la imagen
+        """
+        try:
+            with instrumentacion.span(ETAPA_DESCARGA, modelo=self.modelo):
+                return descargar_bytes(url)
         except Exception as e:
             raise RuntimeError(f"Error descargando imagen: {e}")
 
+    @staticmethod
+    def guardar_contenido(contenido: bytes, ruta_destino: str, nombre_archivo: str, nombre_carpeta: str) -> str:
+        """Escribe una imagen ya descargada en la carpeta de destino y devuelve su ruta."""
+        carpeta_completa = os.path.join(ruta_destino, nombre_carpeta)
+        os.makedirs(carpeta_completa, exist_ok=True)
+
+        ruta_archivo = os.path.join(carpeta_completa, nombre_archivo)
+        ruta_temporal = ruta_temporal_unica(ruta_archivo)
+        with open(ruta_temporal, "wb") as f:
+            f.write(contenido)
+        os.replace(ruta_temporal, ruta_archivo)
+        return ruta_archivo
+
+    def enviar_prediccion(self,
+                          prompt: str,
+                          imagen_referencia: str,
+                          aspect_ratio: str = "4:3",
+                          output_format: str = "png",
+                          num_salidas: int = 1,
+                          modelo: Optional[str] = None) -> str:
+        """
+        Envía la predicción a Replicate sin esperar el resultado.
+
+        Args:
+            prompt: Descripción de la imagen a generar
+            imagen_referencia: Ruta a imagen de referencia o data URL
+            aspect_ratio: Proporción de la imagen ("1:1", "16:9", "9:16", etc.)
+            output_format: Formato de salida ("png" o "jpg")
+            num_salidas: Imágenes a generar en esta predicción (solo modelos de PARAMETRO_NUM_SALIDAS)
+            modelo: Modelo a usar (por defecto el que elija el enrutador, o self.modelo)
+
+        Returns:
+            ID de la predicción
+        """
+        modelo = modelo or self._elegir_modelo()
+        imagen_referencia = self.resolver_referencia(imagen_referencia)
+        logger.info(f"🎨 Generando imagen con modelo: {modelo}")
+        logger.debug(f"📝 Prompt: {prompt}")
+
+        # Preparar parámetros de entrada
+        input_params = {
+            "prompt": prompt,
+            "output_format": output_format,
+            "aspect_ratio": aspect_ratio
+        }
+        if num_salidas > 1:
+            parametro = PARAMETRO_NUM_SALIDAS.get(modelo)
+            if parametro is None:
+                raise ValueError(f"El modelo {modelo} no admite varias salidas por predicción")
+            input_params[parametro] = num_salidas
+
+        # Si imagen_referencia es una ruta de archivo, subirla una vez (o convertir a data URL reducida y en caché)
+        if os.path.exists(imagen_referencia):
+            with instrumentacion.span(ETAPA_CODIFICACION_REFERENCIA):
+                if self.subidas_referencias is not None:
+                    url_referencia = self.subidas_referencias.url_referencia(
+                        self.client, imagen_referencia, self.base_url or "replicate"
+                    )
+                else:
+                    url_referencia = self.cache_referencias.preparar(imagen_referencia)
+            input_params["image_input"] = [url_referencia]
+            logger.info("✅ Imagen de referencia cargada desde archivo local")
+        else:
+            # Asumir que es una URL o data URL
+            input_params["image_input"] = [imagen_referencia]
+            logger.info("✅ Usando imagen de referencia desde URL/data URL")
+
+        # Nombres de parámetros propios del modelo elegido
+        if self.enrutador is not None:
+            input_params = self.enrutador.adaptador(modelo).adaptar(input_params)
+
+        # ? Enviar trabajo a Replicate
+        logger.info("📤 Enviando trabajo a Replicate...")
+        parametros_webhook = {}
+        if self.receptor_webhook is not None:
+            parametros_webhook = {
+                "webhook": self.receptor_webhook.url,
+                "webhook_events_filter": ["completed"]
+            }
+
+        # Limitador compartido del proceso. Crear no es idempotente: solo se reintenta lo que
+        # seguro no llegó a Replicate (429 o fallo de conexión), para no pagar predicciones duplicadas
+        # El enrutador cuenta el envío desde ya: si la creación falla, el fallo es del modelo
+        if self.enrutador is not None:
+            self.enrutador.iniciar(modelo)
+        enviada = time.monotonic()
+        try:
+            with instrumentacion.span(ETAPA_ENVIO, modelo=modelo):
+                prediction = llamar_con_reintentos(
+                    self.client.predictions.create,
+                    limitador=limitador_creacion,
+                    reintentable=es_reintentable_sin_envio,
+                    model=modelo,
+                    input=input_params,
+                    **parametros_webhook
+                )
+            if not prediction.id:
+                raise RuntimeError("No se recibió ID de predicción")
+        except Exception:
+            if self.enrutador is not None:
+                self.enrutador.registrar_fallo(modelo)
+            raise
+
+        with self._lock_en_curso:
+            self._en_curso[prediction.id] = (modelo, enviada)
+
+        logger.info(f"🔄 Procesando... (ID: {prediction.id})")
+        return prediction.id
+
+    def resolver_referencia(self, imagen_referencia: str) -> str:
+        """Ruta local de una referencia dada por URL si está en el espejo; si no, la misma referencia."""
+        if self.espejo is not None and imagen_referencia.startswith(("http://", "https://")):
+            ruta_local = self.espejo.ruta_local(imagen_referencia)
+            if ruta_local:
+                return ruta_local
+        return imagen_referencia
+
+    def _elegir_modelo(self, excluir: Sequence[str] = ()) -> str:
+        """Modelo para una predicción nueva: el del enrutador si lo hay o self.modelo."""
+        if self.enrutador is None:
+            return self.modelo
+        return self.enrutador.elegir(excluir)
+
+    def _cerrar_predicciones(self, prediction_ids: List[str], ganadora: Optional[str]) -> str:
+        """
+        Saca las predicciones de las en curso e informa al enrutador: la ganadora
+        como éxito, las demás como descartadas, o todas como fallo si no hay ganadora.
+
+        Returns:
+            Modelo de la predicción ganadora (o self.modelo si no se conoce)
+        """
+        ahora = time.monotonic()
+        modelo_ganador = self.modelo
+        for prediction_id in prediction_ids:
+            with self._lock_en_curso:
+                modelo, enviada = self._en_curso.pop(prediction_id, (self.modelo, None))
+            latencia = ahora - enviada if enviada is not None else None
+
+            if prediction_id == ganadora:
+                modelo_ganador = modelo
+            if self.enrutador is None or enviada is None:
+                continue
+            if ganadora is None:
+                self.enrutador.registrar_fallo(modelo, latencia)
+            elif prediction_id == ganadora:
+                self.enrutador.registrar_exito(modelo, latencia)
+            else:
+                self.enrutador.descartar(modelo)
+        return modelo_ganador
+
+    def _esperar_una(self, prediction_id: str, timeout: Optional[float]) -> dict:
+        return esperar_completado(
+            self.client,
+            prediction_id,
+            intervalo_inicial=self.intervalo_inicial,
+            intervalo_maximo=self.intervalo_maximo,
+            timeout=timeout,
+            receptor=self.receptor_webhook
+        )
+
+    def _esperar_con_cobertura(self,
+                               prediction_ids: List[str],
+                               timeout: Optional[float],
+                               reenviar: Optional[Callable[[], str]]) -> dict:
+        """
+        Espera la predicción y, si supera el umbral de la política de cobertura,
+        envía un duplicado (agregado a `prediction_ids`) y se queda con la primera
+        que termine; la otra se cancela.
+        """
+        umbral = self.cobertura.umbral() if self.cobertura is not None and reenviar is not None else None
+        if umbral is None or (timeout is not None and umbral >= timeout):
+            return self._esperar_una(prediction_ids[0], timeout)
+
+        inicio = time.monotonic()
+        try:
+            return self._esperar_una(prediction_ids[0], umbral)
+        except TiempoAgotadoError:
+            pass
+
+        # Lo que queda del plazo, descontando lo ya esperado (que puede pasar del umbral)
+        restante = None if timeout is None else max(0.0, timeout - (time.monotonic() - inicio))
+        if not self.cobertura.reservar():
+            # Sin cupo para más duplicados: seguir esperando solo la original
+            return self._esperar_una(prediction_ids[0], restante)
+
+        ganadora = None
+        vencida = False
+        try:
+            logger.warning(f"🐢 La predicción {prediction_ids[0]} supera {umbral:.0f}s: enviando duplicado")
+            try:
+                prediction_ids.append(reenviar())
+            except Exception as e:
+                # La original sigue sana: no se abandona por no poder duplicarla
+                logger.warning(f"   ⚠️ No se pudo enviar el duplicado, se sigue esperando la original: {e}")
+                return self._esperar_una(prediction_ids[0], restante)
+            instrumentacion.contar("coberturas", modelo=self.modelo)
+            if restante is not None:
+                restante = max(0.0, timeout - (time.monotonic() - inicio))
+            ganadora, resultado = esperar_primera(self.client, prediction_ids, self.intervalo_inicial,
+                                                  self.intervalo_maximo, restante)
+            return resultado
+        except TiempoAgotadoError:
+            vencida = True
+            raise
+        finally:
+            self.cobertura.liberar()
+            # Cancelar las que no ganaron; si se agotó el plazo, la original la decide
+            # quien llama (cancelar_al_vencer) y solo se cancelan los duplicados
+            if len(prediction_ids) > 1:
+                for indice, prediction_id in enumerate(prediction_ids):
+                    if prediction_id != ganadora and not (vencida and indice == 0):
+                        cancelar_prediccion(self.client, prediction_id)
+
+    def esperar_urls(self,
+                     prediction_id: str,
+                     plazo: Optional[float] = None,
+                     reenviar: Optional[Callable[[], str]] = None) -> List[str]:
+        """
+        Espera una predicción ya enviada y devuelve las URLs de todas sus salidas.
+
+        Args:
+            prediction_id: ID devuelto por enviar_prediccion
+            plazo: Segundos máximos de espera para este trabajo (por defecto self.timeout);
+                al agotarse se cancela la predicción si cancelar_al_vencer
+            reenviar: Función que envía una predicción equivalente (para la cobertura)
+
+        Returns:
+            URLs de las imágenes generadas, en el orden del output
+        """
+        # * Esperar a que complete (con duplicado si se atrasa y hay política de cobertura)
+        inicio = time.monotonic()
+        prediction_ids = [prediction_id]
+        try:
+            resultado = self._esperar_con_cobertura(prediction_ids, plazo if plazo is not None else self.timeout,
+                                                    reenviar)
+        except TiempoAgotadoError:
+            self._cerrar_predicciones(prediction_ids, ganadora=None)
+            if self.cancelar_al_vencer:
+                for pendiente in prediction_ids:
+                    cancelar_prediccion(self.client, pendiente)
+            raise
+        except Exception:
+            self._cerrar_predicciones(prediction_ids, ganadora=None)
+            raise
+
+        modelo = self._cerrar_predicciones(prediction_ids, ganadora=resultado.get("id") or prediction_ids[-1])
+        if self.cobertura is not None:
+            self.cobertura.registrar(time.monotonic() - inicio)
+
+        # * Tiempos remotos (cola y ejecución) a partir de los timestamps de la predicción
+        registrar_tiempos_remotos(resultado, modelo=modelo)
+
+        # * Extraer las URLs de todas las imágenes generadas
+        urls = extraer_urls_imagen(resultado)
+
+        logger.info(f"✅ Imagen generada exitosamente! ({len(urls)} salida(s))")
+        return urls
+
+    def esperar_prediccion(self,
+                           prediction_id: str,
+                           plazo: Optional[float] = None,
+                           reenviar: Optional[Callable[[], str]] = None) -> str:
+        """
+        Espera una predicción ya enviada y devuelve la URL de la imagen generada.
+
+        Args:
+            prediction_id: ID devuelto por enviar_prediccion
+            plazo: Segundos máximos de espera (por defecto self.timeout)
+            reenviar: Función que envía una predicción equivalente (para la cobertura)
+
+        Returns:
+            URL de la (primera) imagen generada
+        """
+        return self.esperar_urls(prediction_id, plazo, reenviar)[0]
+
     def generar_imagen(self,
                       prompt: str,
                       imagen_referencia: str,
                       aspect_ratio: str = "4:3",
-                      output_format: str = "png") -> str:
+                      output_format: str = "png",
+                      plazo: Optional[float] = None) -> str:
         """
         Genera una imagen usando prompt e imagen de referencia.
 
@@ -71,55 +441,133 @@ class GeneradorImagenes:
             imagen_referencia: Ruta a imagen de referencia o data URL
             aspect_ratio: Proporción de la imagen ("1:1", "16:9", "9:16", etc.)
             output_format: Formato de salida ("png" o "jpg")
+            plazo: Segundos máximos de espera de la predicción (por defecto self.timeout)
 
         Returns:
             URL de la imagen generada
         """
-        try:
-            print(f"🎨 Generando imagen con modelo: {self.modelo}")
-            # print(f"📝 Prompt: {prompt}")
-            # print(f"🖼️ Imagen referencia: {imagen_referencia[:50]}...")
-
-            # Preparar parámetros de entrada
-            input_params = {
-                "prompt": prompt,
-                "output_format": output_format,
-                "aspect_ratio": aspect_ratio
-            }
+        def reenviar():
+            return self.enviar_prediccion(prompt, imagen_referencia, aspect_ratio, output_format)
+
+        # Con enrutador, si un modelo falla se reintenta con el siguiente mejor
+        intentados = []
+        while True:
+            modelo = self._elegir_modelo(intentados)
+            try:
+                prediction_id = self.enviar_prediccion(prompt, imagen_referencia, aspect_ratio, output_format,
+                                                       modelo=modelo)
+                return self.esperar_prediccion(prediction_id, plazo, reenviar)
+
+            except TiempoAgotadoError as e:
+                raise RuntimeError(f"Error generando imagen: {e}")
+            except Exception as e:
+                intentados.append(modelo)
+                if self.enrutador is None or len(intentados) >= len(self.enrutador.modelos):
+                    raise RuntimeError(f"Error generando imagen: {e}")
+                logger.warning(f"🔀 {modelo} falló ({e}); probando con otro modelo")
+
+    def clave_cache(self,
+                    prompt: str,
+                    imagen_referencia: str,
+                    aspect_ratio: str,
+                    output_format: str) -> str:
+        """
+        Calcula la clave de la caché de resultados para una generación.
 
-            # Si imagen_referencia es una ruta de archivo, convertir a data URL
-            if os.path.exists(imagen_referencia):
-                imagen_data_url = imagen_a_data_url(imagen_referencia)
-                input_params["image_input"] = [imagen_data_url]
-                print("✅ Imagen de referencia cargada desde archivo local")
-            else:
-                # Asumir que es una URL o data URL
-                input_params["image_input"] = [imagen_referencia]
-                print("✅ Usando imagen de referencia desde URL/data URL")
+        Con enrutador la imagen puede salir de cualquiera de sus modelos, así que la
+        clave usa el conjunto de modelos y no se confunde con la de un solo modelo.
+        """
+        imagen_referencia = self.resolver_referencia(imagen_referencia)
+        if os.path.exists(imagen_referencia):
+            hash_referencia = self.cache_referencias.hash_referencia(imagen_referencia)
+        else:
+            hash_referencia = imagen_referencia
+        return CacheResultados.clave(self._modelo_cache(), prompt, hash_referencia, aspect_ratio, output_format)
+
+    def _modelo_cache(self) -> str:
+        """Modelo (o modelos del enrutador) con el que se identifican las entradas de caché."""
+        if self.enrutador is None:
+            return self.modelo
+        return "|".join(sorted(self.enrutador.modelos))
+
+    def recuperar_de_cache(self, clave: str, ruta_destino: str, nombre_archivo: str, nombre_carpeta: str) -> Optional[str]:
+        """
+        Copia una imagen de la caché de resultados a la carpeta de destino.
 
-            # ? Enviar trabajo a Replicate
-            print("📤 Enviando trabajo a Replicate...")
-            prediction = self.client.predictions.create(
-                model=self.modelo,
-                input=input_params
-            )
+        Returns:
+            Ruta del archivo copiado, o None si la clave no está en caché
+        """
+        entrada = self.cache_resultados.obtener(clave)
+        if not entrada:
+            return None
 
-            if not prediction.id:
-                raise RuntimeError("No se recibió ID de predicción")
+        carpeta_completa = os.path.join(ruta_destino, nombre_carpeta)
+        os.makedirs(carpeta_completa, exist_ok=True)
 
-            print(f"🔄 Procesando... (ID: {prediction.id})")
+        ruta_archivo = os.path.join(carpeta_completa, nombre_archivo)
+        ruta_temporal = ruta_temporal_unica(ruta_archivo)
+        shutil.copyfile(entrada["ruta_archivo"], ruta_temporal)
+        os.replace(ruta_temporal, ruta_archivo)
 
-            # * Esperar a que complete
-            resultado = esperar_completado(self.client, prediction.id)
+        logger.info(f"♻️ Imagen recuperada de caché: {ruta_archivo}")
+        return ruta_archivo
 
-            # * Extraer URL de la imagen generada
-            url_imagen = extraer_url_imagen(resultado)
+    def guardar_en_cache(self, clave: str, ruta_archivo: str, prompt: str,
+                         aspect_ratio: str, output_format: str, url_imagen: str,
+                         contenido: Optional[bytes] = None) -> None:
+        """
+        Guarda una imagen descargada en la caché de resultados.
+
+        Con `contenido` se guardan esos bytes y `ruta_archivo` solo aporta la extensión.
+        """
+        metadatos = {
+            "modelo": self._modelo_cache(),
+            "prompt": prompt,
+            "aspect_ratio": aspect_ratio,
+            "output_format": output_format,
+            "url": url_imagen,
+        }
+        if contenido is not None:
+            self.cache_resultados.guardar_contenido(clave, contenido, os.path.splitext(ruta_archivo)[1], metadatos)
+        else:
+            self.cache_resultados.guardar(clave, ruta_archivo, metadatos)
+
+    def generar_en_memoria(self,
+                           prompt: str,
+                           imagen_referencia: str,
+                           aspect_ratio: str = "4:3",
+                           output_format: str = "png",
+                           usar_cache: bool = True,
+                           plazo: Optional[float] = None) -> bytes:
+        """
+        Genera una imagen (o la recupera de la caché) y devuelve su contenido sin
+        escribirlo en la carpeta de destino, para redimensionarlo directamente desde memoria.
 
-            print("✅ Imagen generada exitosamente!")
-            return url_imagen
+        Args:
+            prompt: Descripción de la imagen
+            imagen_referencia: Ruta o URL de imagen de referencia
+            aspect_ratio: Proporción de la imagen
+            output_format: Formato de salida
+            usar_cache: Si es False se ignora la caché de resultados y se genera de nuevo
+            plazo: Segundos máximos de espera de la predicción (por defecto self.timeout)
 
-        except Exception as e:
-            raise RuntimeError(f"Error generando imagen: {e}")
+        Returns:
+            Contenido de la imagen generada
+        """
+        clave = self.clave_cache(prompt, imagen_referencia, aspect_ratio, output_format)
+
+        if usar_cache:
+            entrada = self.cache_resultados.obtener(clave)
+            if entrada:
+                logger.info(f"♻️ Imagen recuperada de caché: {entrada['ruta_archivo']}")
+                with open(entrada["ruta_archivo"], "rb") as f:
+                    return f.read()
+
+        url_imagen = self.generar_imagen(prompt, imagen_referencia, aspect_ratio, output_format, plazo)
+        contenido = self.descargar_en_memoria(url_imagen)
+        self.guardar_en_cache(clave, f"imagen.{output_format}", prompt, aspect_ratio, output_format, url_imagen,
+                              contenido=contenido)
+        return contenido
 
     # Función casi principal
     def generar_y_descargar(self,
@@ -129,7 +577,9 @@ class GeneradorImagenes:
                            nombre_archivo: str,
                            nombre_carpeta: str,
                            aspect_ratio: str = "4:3",
-                           output_format: str = "png") -> str:
+                           output_format: str = "png",
+                           usar_cache: bool = True,
+                           plazo: Optional[float] = None) -> str:
         """
         Genera imagen y la descarga automáticamente.
 
@@ -141,27 +591,177 @@ class GeneradorImagenes:
             nombre_carpeta: Nombre de la carpeta
             aspect_ratio: Proporción de la imagen
             output_format: Formato de salida
+            usar_cache: Si es False se ignora la caché de resultados y se genera de nuevo
+            plazo: Segundos máximos de espera de la predicción (por defecto self.timeout)
 
         Returns:
             Ruta del archivo descargado
         """
+        clave = self.clave_cache(prompt, imagen_referencia, aspect_ratio, output_format)
+
+        # Reutilizar una generación idéntica anterior sin llamar a la API
+        if usar_cache:
+            ruta_final = self.recuperar_de_cache(clave, ruta_destino, nombre_archivo, nombre_carpeta)
+            if ruta_final:
+                return ruta_final
+
         # Generar imagen
-        url_imagen = self.generar_imagen(prompt, imagen_referencia, aspect_ratio, output_format)
+        url_imagen = self.generar_imagen(prompt, imagen_referencia, aspect_ratio, output_format, plazo)
 
         # Descargar imagen
-        print(f"📥 Descargando imagen a: {ruta_destino}")
+        logger.info(f"📥 Descargando imagen a: {ruta_destino}")
         ruta_final = self.descargar_imagen(url_imagen, ruta_destino, nombre_archivo, nombre_carpeta)
+        self.guardar_en_cache(clave, ruta_final, prompt, aspect_ratio, output_format, url_imagen)
 
-        print(f"✅ Imagen guardada en: {ruta_final}")
+        logger.info(f"✅ Imagen guardada en: {ruta_final}")
         return ruta_final
 
+    @staticmethod
+    def nombre_variante(nombre_base: str, aspect_ratio: str, indice: int, output_format: str) -> str:
+        """Nombre determinista de una salida múltiple, ej: ("moto", "4:3", 2, "png") -> moto_4x3_2.png"""
+        return f"{nombre_base}_{aspect_ratio.replace(':', 'x')}_{indice}.{output_format}"
+
+    def generar_urls(self,
+                     prompt: str,
+                     imagen_referencia: str,
+                     aspect_ratio: str = "4:3",
+                     output_format: str = "png",
+                     num_salidas: int = 1) -> List[str]:
+        """
+        Genera `num_salidas` imágenes de un prompt y devuelve todas sus URLs.
+
+        Si el modelo admite varias salidas se pide todo en una sola predicción;
+        si no, se envían `num_salidas` predicciones y se esperan a la vez. En ese
+        caso, si alguna falla se devuelven las URLs de las demás (ya están pagadas)
+        y solo se lanza el error si no se obtuvo ninguna.
+        """
+        try:
+            modelo = self._elegir_modelo()
+            if num_salidas == 1 or modelo in PARAMETRO_NUM_SALIDAS:
+                def reenviar():
+                    return self.enviar_prediccion(prompt, imagen_referencia, aspect_ratio,
+                                                  output_format, num_salidas, modelo)
+
+                return self.esperar_urls(reenviar(), reenviar=reenviar)
+
+            ids = []
+            try:
+                for _ in range(num_salidas):
+                    ids.append(self.enviar_prediccion(prompt, imagen_referencia, aspect_ratio, output_format))
+            except Exception:
+                # Sin todas las salidas enviadas no se esperan las demás: no seguir pagándolas
+                for prediction_id in ids:
+                    cancelar_prediccion(self.client, prediction_id)
+                raise
+
+            urls_por_id = {}
+            errores = []
+            with ThreadPoolExecutor(max_workers=num_salidas) as executor:
+                futuros = {executor.submit(self.esperar_urls, prediction_id): prediction_id for prediction_id in ids}
+                for futuro in as_completed(futuros):
+                    try:
+                        urls_por_id[futuros[futuro]] = futuro.result()
+                    except Exception as e:
+                        errores.append(e)
+                        # Si se agotó el plazo puede seguir en curso en Replicate
+                        cancelar_prediccion(self.client, futuros[futuro])
+
+            if not urls_por_id:
+                raise errores[0]
+            if errores:
+                logger.warning(f"⚠️ {len(errores)} de {num_salidas} salidas fallaron: {errores[0]}")
+            return [url for prediction_id in ids for url in urls_por_id.get(prediction_id, ())]
+
+        except Exception as e:
+            raise RuntimeError(f"Error generando imagen: {e}")
+
+    def generar_y_descargar_variantes(self,
+                                      prompt: str,
+                                      imagen_referencia: str,
+                                      ruta_destino: str,
+                                      nombre_base: str,
+                                      nombre_carpeta: str,
+                                      aspect_ratios: Sequence[str] = ("4:3",),
+                                      num_salidas: int = 1,
+                                      output_format: str = "png") -> dict:
+        """
+        Genera varias imágenes de un mismo prompt y las descarga en paralelo.
+
+        Cada proporción se genera en paralelo con `num_salidas` imágenes, y todas las
+        salidas se descargan a la vez con nombres deterministas (ver nombre_variante).
+        Las variantes no pasan por la caché de resultados: cada una es una muestra distinta.
+        Si falla una proporción, las demás (ya pagadas) se descargan igualmente.
+
+        Args:
+            prompt: Descripción de la imagen
+            imagen_referencia: Ruta o URL de imagen de referencia
+            ruta_destino: Ruta donde guardar las imágenes generadas
+            nombre_base: Prefijo de los archivos (ej: "moto" -> moto_4x3_1.png, moto_4x3_2.png, ...)
+            nombre_carpeta: Nombre de la carpeta
+            aspect_ratios: Proporciones a generar
+            num_salidas: Imágenes por proporción
+            output_format: Formato de salida
+
+        Returns:
+            Diccionario con "rutas" (archivos descargados, ordenados por proporción y número
+            de salida) y "errores" (mensaje de error por proporción que falló)
+        """
+        aspect_ratios = list(dict.fromkeys(aspect_ratios))
+        if not aspect_ratios:
+            raise ValueError("Se necesita al menos una proporción (aspect_ratios)")
+
+        urls_por_ratio = {}
+        errores = {}
+        with ThreadPoolExecutor(max_workers=len(aspect_ratios)) as executor:
+            futuros = {
+                executor.submit(self.generar_urls, prompt, imagen_referencia, aspect_ratio,
+                                output_format, num_salidas): aspect_ratio
+                for aspect_ratio in aspect_ratios
+            }
+            for futuro in as_completed(futuros):
+                aspect_ratio = futuros[futuro]
+                try:
+                    urls_por_ratio[aspect_ratio] = futuro.result()
+                except Exception as e:
+                    errores[aspect_ratio] = str(e)
+                    logger.error(f"❌ Falló la proporción {aspect_ratio}: {e}")
+
+        descargas = [
+            (aspect_ratio, url, self.nombre_variante(nombre_base, aspect_ratio, indice, output_format))
+            for aspect_ratio in aspect_ratios
+            for indice, url in enumerate(urls_por_ratio.get(aspect_ratio, ()), start=1)
+        ]
+
+        rutas = {}
+        if descargas:
+            logger.info(f"📥 Descargando {len(descargas)} imágenes a: {ruta_destino}")
+            with ThreadPoolExecutor(max_workers=min(len(descargas), MAX_DESCARGAS_PARALELAS)) as executor:
+                futuros = {
+                    executor.submit(self.descargar_imagen, url, ruta_destino, nombre, nombre_carpeta):
+                        (aspect_ratio, nombre)
+                    for aspect_ratio, url, nombre in descargas
+                }
+                for futuro in as_completed(futuros):
+                    aspect_ratio, nombre = futuros[futuro]
+                    try:
+                        rutas[nombre] = futuro.result()
+                    except Exception as e:
+                        previo = errores.get(aspect_ratio)
+                        errores[aspect_ratio] = f"{previo}; {nombre}: {e}" if previo else f"{nombre}: {e}"
+                        logger.error(f"❌ No se pudo descargar {nombre}: {e}")
+
+        rutas = [rutas[nombre] for _, _, nombre in descargas if nombre in rutas]
+        logger.info(f"✅ {len(rutas)} imágenes guardadas en: {os.path.join(ruta_destino, nombre_carpeta)}")
+        return {"rutas": rutas, "errores": errores}
+
 
 def generar_imagen_con_referencia(modelo: Optional[str],
                                   prompt: str,
                                   imagen_referencia: str,
                                   ruta_destino: Optional[str],
                                   nombre_archivo: Optional[str],
-                                  nombre_carpeta: Optional[str]) -> str:
+                                  nombre_carpeta: Optional[str],
+                                  usar_cache: bool = True) -> str:
     """
     Genera una imagen rápidamente.
 
@@ -170,6 +770,7 @@ def generar_imagen_con_referencia(modelo: Optional[str],
         imagen_referencia: Ruta o URL de imagen de referencia
         ruta_destino: Donde guardar (opcional, si no se da retorna URL)
         modelo: Modelo a usar
+        usar_cache: Consultar la caché de resultados antes de generar (solo al descargar)
 
     Returns:
         URL de la imagen generada o ruta del archivo si se descargó
@@ -177,6 +778,7 @@ def generar_imagen_con_referencia(modelo: Optional[str],
     generador = GeneradorImagenes(modelo)
 
     if ruta_destino:
-        return generador.generar_y_descargar(prompt, imagen_referencia, ruta_destino, nombre_archivo, nombre_carpeta)
+        return generador.generar_y_descargar(prompt, imagen_referencia, ruta_destino, nombre_archivo, nombre_carpeta,
+                                             usar_cache=usar_cache)
     else:
         return generador.generar_imagen(prompt, imagen_referencia)
\ No newline at end of file
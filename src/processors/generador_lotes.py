@@ -0,0 +1,247 @@
+# ============================================================================
+# GENERADOR DE IMÁGENES POR LOTES
+# Mantiene varias predicciones en curso a la vez sobre GeneradorImagenes
+# ============================================================================
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional
+
+from src.processors.generador_imagenes_basico import GeneradorImagenes
+from src.utils.replicate_utils import TiempoAgotadoError, cancelar_prediccion
+from src.utils.logging_config import obtener_logger
+from src.utils.job_ledger import (
+    RegistroTrabajos,
+    id_trabajo,
+    ESTADO_EN_COLA,
+    ESTADO_ENVIADO,
+    ESTADO_DESCARGADO,
+    ESTADO_FALLIDO,
+)
+
+logger = obtener_logger(__name__)
+
+
+class GeneradorLotes:
+    """Ejecuta muchos trabajos de generación en paralelo con un límite de concurrencia."""
+
+    def __init__(self,
+                 generador: Optional[GeneradorImagenes] = None,
+                 concurrencia: int = 4,
+                 registro: Optional[RegistroTrabajos] = None):
+        """
+        Inicializa el generador por lotes.
+
+        Args:
+            generador: Instancia de GeneradorImagenes a compartir entre trabajos
+                (por defecto se crea una con el modelo por defecto)
+            concurrencia: Número máximo de predicciones en curso a la vez
+            registro: RegistroTrabajos opcional para poder reanudar una ejecución
+                interrumpida sin volver a enviar predicciones ya pagadas
+        """
+        if concurrencia < 1:
+            raise ValueError("La concurrencia debe ser al menos 1")
+
+        self.generador = generador or GeneradorImagenes()
+        self.concurrencia = concurrencia
+        self.registro = registro
+
+    def _ejecutar_trabajo(self, indice: int, trabajo: dict) -> dict:
+        """Ejecuta un trabajo y devuelve su resultado sin propagar excepciones."""
+        inicio = time.perf_counter()
+        resultado = {
+            "indice": indice,
+            "trabajo": trabajo,
+            "ruta": None,
+            "error": None,
+        }
+
+        try:
+            if self.registro is not None:
+                resultado["ruta"] = self._ejecutar_con_registro(trabajo)
+            else:
+                resultado["ruta"] = self.generador.generar_y_descargar(
+                    prompt=trabajo["prompt"],
+                    imagen_referencia=trabajo["imagen_referencia"],
+                    ruta_destino=trabajo["ruta_destino"],
+                    nombre_archivo=trabajo["nombre_archivo"],
+                    nombre_carpeta=trabajo["nombre_carpeta"],
+                    aspect_ratio=trabajo.get("aspect_ratio", "4:3"),
+                    output_format=trabajo.get("output_format", "png"),
+                    usar_cache=trabajo.get("usar_cache", True),
+                    plazo=trabajo.get("plazo"),
+                )
+        except Exception as e:
+            resultado["error"] = str(e)
+
+        resultado["duracion"] = time.perf_counter() - inicio
+        return resultado
+
+    def _ejecutar_con_registro(self, trabajo: dict) -> str:
+        """
+        Ejecuta un trabajo retomándolo desde el último estado guardado en el registro.
+
+        - downloaded: no hace nada si el archivo sigue en disco
+        - succeeded: solo descarga la URL ya obtenida
+        - submitted: vuelve a consultar la predicción ya enviada (y cancela los
+          duplicados de cobertura que dejó una ejecución interrumpida)
+        - queued / failed: envía una predicción nueva
+        """
+        generador = self.generador
+        identificador = id_trabajo(trabajo)
+        registro = self.registro.encolar(identificador, trabajo)
+
+        aspect_ratio = trabajo.get("aspect_ratio", "4:3")
+        output_format = trabajo.get("output_format", "png")
+        ruta_final = os.path.join(trabajo["ruta_destino"], trabajo["nombre_carpeta"], trabajo["nombre_archivo"])
+
+        if registro["estado"] == ESTADO_DESCARGADO and os.path.exists(ruta_final):
+            return ruta_final
+
+        clave = generador.clave_cache(trabajo["prompt"], trabajo["imagen_referencia"], aspect_ratio, output_format)
+        if registro["estado"] in (ESTADO_EN_COLA, ESTADO_FALLIDO) and trabajo.get("usar_cache", True):
+            ruta_cache = generador.recuperar_de_cache(
+                clave, trabajo["ruta_destino"], trabajo["nombre_archivo"], trabajo["nombre_carpeta"]
+            )
+            if ruta_cache:
+                self.registro.marcar_descargado(identificador, ruta_cache)
+                return ruta_cache
+
+        if registro["estado"] in (ESTADO_EN_COLA, ESTADO_FALLIDO):
+            prediction_id = generador.enviar_prediccion(
+                trabajo["prompt"], trabajo["imagen_referencia"], aspect_ratio, output_format
+            )
+            self.registro.marcar_enviado(identificador, prediction_id)
+            registro = self.registro.obtener(identificador)
+
+        if registro["estado"] == ESTADO_ENVIADO:
+            for duplicado in registro["duplicados"]:
+                cancelar_prediccion(generador.client, duplicado)
+
+            def reenviar():
+                duplicado = generador.enviar_prediccion(
+                    trabajo["prompt"], trabajo["imagen_referencia"], aspect_ratio, output_format
+                )
+                # Anotado antes de esperarlo: si el proceso muere, al reanudar se cancela
+                self.registro.agregar_duplicado(identificador, duplicado)
+                return duplicado
+
+            try:
+                url_imagen = generador.esperar_prediccion(registro["prediction_id"], trabajo.get("plazo"), reenviar)
+            except TiempoAgotadoError as e:
+                if generador.cancelar_al_vencer:
+                    # Se canceló en Replicate: al reanudar se envía de nuevo
+                    self.registro.marcar_fallido(identificador, str(e))
+                else:
+                    # Sigue en curso en Replicate: se deja como enviado para reconsultarlo al reanudar
+                    self.registro.registrar_error(identificador, str(e))
+                raise
+            except Exception as e:
+                self.registro.marcar_fallido(identificador, str(e))
+                raise
+            self.registro.marcar_exitoso(identificador, url_imagen)
+            registro = self.registro.obtener(identificador)
+
+        try:
+            ruta_final = generador.descargar_imagen(
+                registro["url"], trabajo["ruta_destino"], trabajo["nombre_archivo"], trabajo["nombre_carpeta"]
+            )
+        except Exception as e:
+            self.registro.registrar_error(identificador, str(e))
+            raise
+
+        self.registro.marcar_descargado(identificador, ruta_final)
+        generador.guardar_en_cache(clave, ruta_final, trabajo["prompt"], aspect_ratio, output_format, registro["url"])
+        return ruta_final
+
+    def procesar(self, trabajos: List[dict]) -> dict:
+        """
+        Procesa una lista de trabajos manteniendo hasta `concurrencia` en curso.
+
+        Cada trabajo es un diccionario con las claves de `generar_y_descargar`:
+        prompt, imagen_referencia, ruta_destino, nombre_archivo, nombre_carpeta
+        y opcionalmente aspect_ratio, output_format, usar_cache y plazo (segundos
+        máximos de espera de su predicción).
+
+        Args:
+            trabajos: Lista de trabajos a ejecutar
+
+        Returns:
+            Diccionario con los resultados por trabajo (en el orden de entrada)
+            y un resumen del lote
+        """
+        inicio = time.perf_counter()
+        resultados = [None] * len(trabajos)
+
+        logger.info(f"🚀 Procesando {len(trabajos)} trabajos con concurrencia {self.concurrencia}")
+
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as executor:
+            futuros = [
+                executor.submit(self._ejecutar_trabajo, indice, trabajo)
+                for indice, trabajo in enumerate(trabajos)
+            ]
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                resultados[resultado["indice"]] = resultado
+
+                if resultado["error"]:
+                    logger.error(f"❌ Trabajo {resultado['indice']} falló: {resultado['error']}")
+                else:
+                    logger.info(f"✅ Trabajo {resultado['indice']} listo: {resultado['ruta']}")
+
+        duracion_total = time.perf_counter() - inicio
+        resumen = resumir_lote(resultados, duracion_total)
+
+        logger.info(f"📊 Lote terminado: {resumen['exitosos']}/{resumen['total']} exitosos "
+                    f"en {resumen['duracion_total']:.1f}s "
+                    f"({resumen['imagenes_por_minuto']:.1f} imágenes/min)")
+
+        return {"resultados": resultados, "resumen": resumen}
+
+    def reanudar(self) -> dict:
+        """
+        Retoma los trabajos sin terminar del registro (enviados, exitosos sin
+        descargar, fallidos o en cola), sin recorrer el catálogo completo.
+        """
+        if self.registro is None:
+            raise ValueError("Se necesita un RegistroTrabajos para reanudar")
+
+        trabajos = [dict(registro["trabajo"], id=registro["id"]) for registro in self.registro.pendientes()]
+        logger.info(f"🔁 Reanudando {len(trabajos)} trabajos pendientes")
+        return self.procesar(trabajos)
+
+
+def resumir_lote(resultados: List[dict], duracion_total: float) -> dict:
+    """Construye el resumen de un lote a partir de sus resultados."""
+    exitosos = [r for r in resultados if r and not r["error"]]
+    fallidos = [r for r in resultados if r and r["error"]]
+    duraciones = [r["duracion"] for r in resultados if r]
+
+    return {
+        "total": len(resultados),
+        "exitosos": len(exitosos),
+        "fallidos": len(fallidos),
+        "duracion_total": duracion_total,
+        "duracion_media": sum(duraciones) / len(duraciones) if duraciones else 0.0,
+        "imagenes_por_minuto": len(exitosos) / duracion_total * 60 if duracion_total > 0 else 0.0,
+        "errores": {r["indice"]: r["error"] for r in fallidos},
+    }
+
+
+def generar_lote(trabajos: List[dict],
+                 modelo: str = "google/nano-banana",
+                 concurrencia: int = 4) -> dict:
+    """
+    Genera un lote de imágenes rápidamente.
+
+    Args:
+        trabajos: Lista de trabajos (ver GeneradorLotes.procesar)
+        modelo: Modelo a usar
+        concurrencia: Número máximo de predicciones en curso a la vez
+
+    Returns:
+        Resultados por trabajo y resumen del lote
+    """
+    generador_lotes = GeneradorLotes(GeneradorImagenes(modelo), concurrencia)
+    return generador_lotes.procesar(trabajos)
@@ -0,0 +1,174 @@
+# ============================================================================
+# ENRUTADOR DE MODELOS
+# Reparte las predicciones entre modelos compatibles según latencia y fallos
+# ============================================================================
+
+import time
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from src.utils.logging_config import obtener_logger
+
+logger = obtener_logger(__name__)
+
+
+class AdaptadorModelo:
+    """
+    Traduce los parámetros de entrada estándar de GeneradorImagenes (prompt,
+    image_input, aspect_ratio, output_format) a los nombres que usa un modelo.
+    """
+
+    def __init__(self,
+                 modelo: str,
+                 parametro_imagen: str = "image_input",
+                 imagen_como_lista: bool = True,
+                 parametro_aspect_ratio: Optional[str] = "aspect_ratio",
+                 parametro_formato: Optional[str] = "output_format",
+                 fijos: Optional[dict] = None):
+        """
+        Args:
+            modelo: Identificador del modelo en Replicate (ej: "black-forest-labs/flux-kontext-pro")
+            parametro_imagen: Nombre del parámetro de la imagen de referencia
+            imagen_como_lista: Si el modelo espera una lista de imágenes o una sola URL
+            parametro_aspect_ratio: Nombre del parámetro de proporción (None si no lo admite)
+            parametro_formato: Nombre del parámetro de formato de salida (None si no lo admite)
+            fijos: Parámetros adicionales que se envían siempre (ej: {"safety_tolerance": 2})
+        """
+        self.modelo = modelo
+        self.parametro_imagen = parametro_imagen
+        self.imagen_como_lista = imagen_como_lista
+        self.parametro_aspect_ratio = parametro_aspect_ratio
+        self.parametro_formato = parametro_formato
+        self.fijos = dict(fijos or {})
+
+    def adaptar(self, input_params: dict) -> dict:
+        """Devuelve una copia de `input_params` con los nombres y formas del modelo."""
+        adaptados = dict(input_params)
+
+        imagenes = adaptados.pop("image_input", None)
+        if imagenes:
+            adaptados[self.parametro_imagen] = imagenes if self.imagen_como_lista else imagenes[0]
+
+        for estandar, propio in (("aspect_ratio", self.parametro_aspect_ratio),
+                                 ("output_format", self.parametro_formato)):
+            valor = adaptados.pop(estandar, None)
+            if propio and valor is not None:
+                adaptados[propio] = valor
+
+        adaptados.update(self.fijos)
+        return adaptados
+
+
+class EnrutadorModelos:
+    """
+    Elige, para cada predicción nueva, el modelo con menor tiempo esperado de
+    finalización entre una lista ordenada de modelos compatibles.
+
+    Por modelo mantiene medias móviles exponenciales de la latencia (envío →
+    resultado) y de la tasa de fallos, más las predicciones en curso. El tiempo
+    esperado es la latencia media, inflada según la carga en curso respecto a
+    `capacidad`, dividida por la probabilidad de éxito; a igualdad gana el
+    primero de la lista. Un modelo que no se usa durante
+    `enfriamiento` segundos vuelve a sus valores iniciales para poder comprobar
+    si se recuperó.
+    """
+
+    def __init__(self,
+                 adaptadores: Sequence,
+                 alfa: float = 0.2,
+                 latencia_inicial: float = 30.0,
+                 enfriamiento: float = 300.0,
+                 capacidad: float = 8.0):
+        """
+        Args:
+            adaptadores: AdaptadorModelo (o nombres de modelo) en orden de preferencia
+            alfa: Peso de cada observación nueva en las medias móviles (0-1)
+            latencia_inicial: Latencia supuesta de un modelo sin observaciones (segundos)
+            enfriamiento: Segundos sin usar un modelo tras los que se olvidan sus estadísticas
+            capacidad: Predicciones en curso con las que la latencia esperada de un modelo se duplica
+        """
+        if not adaptadores:
+            raise ValueError("Se necesita al menos un modelo")
+
+        self.adaptadores = [a if isinstance(a, AdaptadorModelo) else AdaptadorModelo(a) for a in adaptadores]
+        self.alfa = alfa
+        self.latencia_inicial = latencia_inicial
+        self.enfriamiento = enfriamiento
+        self.capacidad = capacidad
+        self._estadisticas = {a.modelo: self._estadistica_inicial() for a in self.adaptadores}
+        self._lock = threading.Lock()
+
+    @property
+    def modelos(self) -> List[str]:
+        return [a.modelo for a in self.adaptadores]
+
+    def _estadistica_inicial(self) -> dict:
+        return {"latencia": self.latencia_inicial, "tasa_fallos": 0.0, "en_curso": 0,
+                "exitos": 0, "fallos": 0, "ultimo_uso": time.monotonic()}
+
+    def adaptador(self, modelo: str) -> AdaptadorModelo:
+        """Adaptador de `modelo` (uno sin cambios de nombres si no está en la lista)."""
+        for adaptador in self.adaptadores:
+            if adaptador.modelo == modelo:
+                return adaptador
+        return AdaptadorModelo(modelo)
+
+    def _tiempo_esperado(self, estadistica: dict) -> float:
+        if time.monotonic() - estadistica["ultimo_uso"] > self.enfriamiento and estadistica["en_curso"] == 0:
+            estadistica.update(self._estadistica_inicial())
+        latencia = estadistica["latencia"] * (1.0 + estadistica["en_curso"] / self.capacidad)
+        return latencia / max(0.05, 1.0 - estadistica["tasa_fallos"])
+
+    def ordenar(self) -> List[str]:
+        """Modelos de menor a mayor tiempo esperado (orden de preferencia en caso de empate)."""
+        with self._lock:
+            tiempos = {modelo: self._tiempo_esperado(e) for modelo, e in self._estadisticas.items()}
+        return sorted(self.modelos, key=lambda modelo: tiempos[modelo])
+
+    def elegir(self, excluir: Sequence[str] = ()) -> str:
+        """Modelo con menor tiempo esperado que no esté en `excluir`."""
+        candidatos = [modelo for modelo in self.ordenar() if modelo not in excluir]
+        if not candidatos:
+            raise RuntimeError("No quedan modelos disponibles")
+        return candidatos[0]
+
+    def iniciar(self, modelo: str) -> None:
+        """Registra una predicción que se va a enviar a `modelo` (antes de crearla)."""
+        with self._lock:
+            estadistica = self._estadisticas.setdefault(modelo, self._estadistica_inicial())
+            estadistica["en_curso"] += 1
+            estadistica["ultimo_uso"] = time.monotonic()
+
+    def _terminar(self, modelo: str, latencia: Optional[float], fallo: bool) -> None:
+        with self._lock:
+            estadistica = self._estadisticas.setdefault(modelo, self._estadistica_inicial())
+            estadistica["en_curso"] = max(0, estadistica["en_curso"] - 1)
+            estadistica["ultimo_uso"] = time.monotonic()
+            estadistica["tasa_fallos"] += self.alfa * ((1.0 if fallo else 0.0) - estadistica["tasa_fallos"])
+            if fallo:
+                estadistica["fallos"] += 1
+            else:
+                estadistica["exitos"] += 1
+            if latencia is not None:
+                estadistica["latencia"] += self.alfa * (latencia - estadistica["latencia"])
+
+    def registrar_exito(self, modelo: str, latencia: float) -> None:
+        """Registra una predicción de `modelo` terminada bien en `latencia` segundos."""
+        self._terminar(modelo, latencia, fallo=False)
+
+    def registrar_fallo(self, modelo: str, latencia: Optional[float] = None) -> None:
+        """Registra una predicción fallida, vencida o que no se pudo crear en `modelo`."""
+        self._terminar(modelo, latencia, fallo=True)
+
+    def descartar(self, modelo: str) -> None:
+        """Quita una predicción en curso sin contarla (ej: duplicado cancelado)."""
+        with self._lock:
+            estadistica = self._estadisticas.get(modelo)
+            if estadistica:
+                estadistica["en_curso"] = max(0, estadistica["en_curso"] - 1)
+
+    def estadisticas(self) -> Dict[str, dict]:
+        """Copia de las estadísticas por modelo, con su tiempo esperado."""
+        with self._lock:
+            return {modelo: dict(e, tiempo_esperado=self._tiempo_esperado(e))
+                    for modelo, e in self._estadisticas.items()}
@@ -0,0 +1,289 @@
+# ============================================================================
+# PIPELINE GENERAR → DESCARGAR → REDIMENSIONAR
+# Etapas independientes conectadas por colas acotadas, cada una con su concurrencia
+# ============================================================================
+
+import io
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+from src.processors.generador_imagenes_basico import GeneradorImagenes
+from src.processors.generador_lotes import resumir_lote
+from src.utils.resize_image import ResizeImage
+from src.utils.logging_config import obtener_logger
+
+logger = obtener_logger(__name__)
+
+# Marca de fin de entrada que cada etapa reenvía a la siguiente
+_FIN = object()
+
+
+class PipelineImagenes:
+    """
+    Ejecuta generación, descarga y redimensionado como etapas en paralelo.
+
+    Cada etapa tiene sus propios hilos y lee de una cola acotada: si una etapa
+    se atrasa, su cola se llena y frena a la anterior (backpressure) en lugar de
+    acumular imágenes en memoria. Así la duración total se acerca a la de la
+    etapa más lenta y no a la suma de todas.
+
+    - Generación: hilos que envían y esperan predicciones (E/S de red)
+    - Descarga: hilos sobre la sesión HTTP compartida (E/S de red)
+    - Redimensionado: pool de procesos (CPU), o en el propio hilo con procesos_resize=0
+
+    Con carpeta de redimensionado la imagen descargada viaja en memoria hasta el
+    redimensionado y se decodifica una sola vez; el original solo se escribe en
+    `ruta_destino` con guardar_original=True.
+    """
+
+    def __init__(self,
+                 generador: Optional[GeneradorImagenes] = None,
+                 concurrencia_generacion: int = 8,
+                 concurrencia_descarga: int = 8,
+                 procesos_resize: Optional[int] = None,
+                 tamano_cola: int = 16,
+                 carpeta_resize: Optional[str] = None,
+                 ancho: int = 800,
+                 alto: int = 600,
+                 guardar_original: bool = False):
+        """
+        Inicializa el pipeline.
+
+        Args:
+            generador: Instancia de GeneradorImagenes a compartir (por defecto el modelo por defecto)
+            concurrencia_generacion: Predicciones en curso a la vez
+            concurrencia_descarga: Descargas simultáneas
+            procesos_resize: Procesos para redimensionar (por defecto uno por CPU; 0 para no usar procesos)
+            tamano_cola: Capacidad de cada cola entre etapas
+            carpeta_resize: Carpeta de las imágenes redimensionadas; sin ella no se redimensiona
+            ancho: Ancho objetivo del redimensionado (los archivos "lifestyle" usan 1000x700)
+            alto: Alto objetivo del redimensionado
+            guardar_original: Escribir también la imagen original cuando se redimensiona
+                (sin carpeta_resize siempre se escribe)
+        """
+        if min(concurrencia_generacion, concurrencia_descarga, tamano_cola) < 1:
+            raise ValueError("La concurrencia y el tamaño de cola deben ser al menos 1")
+
+        self.generador = generador or GeneradorImagenes()
+        self.concurrencia_generacion = concurrencia_generacion
+        self.concurrencia_descarga = concurrencia_descarga
+        self.procesos_resize = (os.cpu_count() or 1) if procesos_resize is None else procesos_resize
+        self.tamano_cola = tamano_cola
+        self.carpeta_resize = carpeta_resize
+        self.ancho = ancho
+        self.alto = alto
+        self.guardar_original = guardar_original or not carpeta_resize
+
+    # ------------------------------------------------------------------
+    # Etapas: cada una recibe y devuelve el resultado en curso del trabajo
+    # ------------------------------------------------------------------
+
+    def _generar(self, resultado: dict) -> dict:
+        """Etapa 1: caché de resultados o predicción remota hasta obtener la URL."""
+        trabajo = resultado["trabajo"]
+        generador = self.generador
+        aspect_ratio = trabajo.get("aspect_ratio", "4:3")
+        output_format = trabajo.get("output_format", "png")
+
+        resultado["clave"] = generador.clave_cache(trabajo["prompt"], trabajo["imagen_referencia"],
+                                                   aspect_ratio, output_format)
+        if trabajo.get("usar_cache", True):
+            if self.carpeta_resize:
+                # La imagen sigue en memoria hasta el redimensionado
+                entrada = generador.cache_resultados.obtener(resultado["clave"])
+                if entrada:
+                    with open(entrada["ruta_archivo"], "rb") as f:
+                        resultado["contenido"] = f.read()
+                    self._escribir_original(resultado)
+                    return resultado
+            else:
+                resultado["ruta"] = generador.recuperar_de_cache(
+                    resultado["clave"], trabajo["ruta_destino"], trabajo["nombre_archivo"], trabajo["nombre_carpeta"]
+                )
+                if resultado["ruta"]:
+                    return resultado
+
+        resultado["url"] = generador.generar_imagen(trabajo["prompt"], trabajo["imagen_referencia"],
+                                                    aspect_ratio, output_format, trabajo.get("plazo"))
+        return resultado
+
+    def _escribir_original(self, resultado: dict) -> None:
+        """Escribe en ruta_destino la imagen en memoria si hay que conservar el original."""
+        if self.guardar_original:
+            trabajo = resultado["trabajo"]
+            resultado["ruta"] = self.generador.guardar_contenido(
+                resultado["contenido"], trabajo["ruta_destino"], trabajo["nombre_archivo"], trabajo["nombre_carpeta"]
+            )
+
+    def _descargar(self, resultado: dict) -> dict:
+        """Etapa 2: descarga la imagen generada y la guarda en la caché de resultados."""
+        if resultado["ruta"] or resultado["contenido"] is not None:
+            # Ya recuperada de la caché en la etapa de generación
+            return resultado
+
+        trabajo = resultado["trabajo"]
+        if self.carpeta_resize:
+            # A memoria: el redimensionado la decodifica sin volver a leerla de disco
+            resultado["contenido"] = self.generador.descargar_en_memoria(resultado["url"])
+            self.generador.guardar_en_cache(resultado["clave"], trabajo["nombre_archivo"], trabajo["prompt"],
+                                            trabajo.get("aspect_ratio", "4:3"), trabajo.get("output_format", "png"),
+                                            resultado["url"], contenido=resultado["contenido"])
+            self._escribir_original(resultado)
+            return resultado
+
+        resultado["ruta"] = self.generador.descargar_imagen(
+            resultado["url"], trabajo["ruta_destino"], trabajo["nombre_archivo"], trabajo["nombre_carpeta"]
+        )
+        self.generador.guardar_en_cache(resultado["clave"], resultado["ruta"], trabajo["prompt"],
+                                        trabajo.get("aspect_ratio", "4:3"), trabajo.get("output_format", "png"),
+                                        resultado["url"])
+        return resultado
+
+    def _redimensionar(self, resultado: dict, pool: Optional[ProcessPoolExecutor]) -> dict:
+        """Etapa 3: redimensiona la imagen descargada (en el pool de procesos si lo hay)."""
+        if not self.carpeta_resize:
+            return resultado
+
+        trabajo = resultado["trabajo"]
+        carpeta = os.path.join(self.carpeta_resize, trabajo["nombre_carpeta"])
+        os.makedirs(carpeta, exist_ok=True)
+
+        ruta_resize = os.path.join(carpeta, trabajo["nombre_archivo"])
+        ancho, alto = ResizeImage.target_size_for(trabajo["nombre_archivo"], self.ancho, self.alto)
+        origen = io.BytesIO(resultado.pop("contenido")) if resultado["contenido"] is not None else resultado["ruta"]
+        argumentos = (origen, ruta_resize, ancho, alto)
+
+        if pool is not None:
+            ResizeImage.resize_in_pool(pool, *argumentos)
+        else:
+            ResizeImage.resize_and_crop_transparent(*argumentos)
+
+        resultado["ruta_resize"] = ruta_resize
+        return resultado
+
+    # ------------------------------------------------------------------
+
+    def _iniciar_etapa(self,
+                       nombre: str,
+                       funcion: Callable[[dict], dict],
+                       hilos: int,
+                       entrada: queue.Queue,
+                       salida: queue.Queue,
+                       hilos_siguiente: int = 1) -> List[threading.Thread]:
+        """
+        Arranca `hilos` trabajadores que aplican `funcion` a lo que llega por `entrada`.
+
+        Los trabajos que fallan atraviesan las etapas siguientes sin procesarse,
+        con su error, para que lleguen igualmente al resultado final. Cuando todos los
+        trabajadores reciben la marca de fin, se envía una marca por cada hilo de la
+        siguiente etapa (`hilos_siguiente`).
+        """
+        restantes = [hilos]
+        lock = threading.Lock()
+
+        def trabajador():
+            while True:
+                resultado = entrada.get()
+                if resultado is _FIN:
+                    break
+                if not resultado["error"]:
+                    try:
+                        resultado = funcion(resultado)
+                    except Exception as e:
+                        resultado["error"] = str(e)
+                salida.put(resultado)
+
+            with lock:
+                restantes[0] -= 1
+                ultimo = restantes[0] == 0
+            if ultimo:
+                for _ in range(hilos_siguiente):
+                    salida.put(_FIN)
+
+        trabajadores = [
+            threading.Thread(target=trabajador, name=f"pipeline-{nombre}-{i}", daemon=True)
+            for i in range(hilos)
+        ]
+        for hilo in trabajadores:
+            hilo.start()
+        return trabajadores
+
+    def procesar(self, trabajos: List[dict]) -> dict:
+        """
+        Procesa los trabajos a través de las tres etapas.
+
+        Cada trabajo es un diccionario con las claves de `generar_y_descargar`:
+        prompt, imagen_referencia, ruta_destino, nombre_archivo, nombre_carpeta
+        y opcionalmente aspect_ratio, output_format y usar_cache.
+
+        Args:
+            trabajos: Lista de trabajos a ejecutar
+
+        Returns:
+            Diccionario con los resultados por trabajo (en el orden de entrada, con
+            "ruta" y "ruta_resize"; "ruta" es None si no se guarda el original) y un resumen del lote
+        """
+        inicio = time.perf_counter()
+        resultados = [None] * len(trabajos)
+        hilos_resize = max(1, self.procesos_resize)
+
+        logger.info(f"🚀 Pipeline de {len(trabajos)} trabajos: generación x{self.concurrencia_generacion}, "
+                    f"descarga x{self.concurrencia_descarga}, resize x{hilos_resize}")
+
+        # entrada -> generación -> a_descarga -> descarga -> a_resize -> redimensionado -> terminados
+        entrada, a_descarga, a_resize, terminados = (queue.Queue(maxsize=self.tamano_cola) for _ in range(4))
+
+        pool = ProcessPoolExecutor(max_workers=self.procesos_resize) if self.procesos_resize > 0 else None
+        try:
+            self._iniciar_etapa("generacion", self._generar, self.concurrencia_generacion,
+                                entrada, a_descarga, self.concurrencia_descarga)
+            self._iniciar_etapa("descarga", self._descargar, self.concurrencia_descarga,
+                                a_descarga, a_resize, hilos_resize)
+            self._iniciar_etapa("resize", lambda resultado: self._redimensionar(resultado, pool), hilos_resize,
+                                a_resize, terminados)
+
+            def alimentar():
+                for indice, trabajo in enumerate(trabajos):
+                    entrada.put({
+                        "indice": indice,
+                        "trabajo": trabajo,
+                        "inicio": time.perf_counter(),
+                        "url": None,
+                        "ruta": None,
+                        "contenido": None,
+                        "ruta_resize": None,
+                        "error": None,
+                    })
+                for _ in range(self.concurrencia_generacion):
+                    entrada.put(_FIN)
+
+            threading.Thread(target=alimentar, name="pipeline-entrada", daemon=True).start()
+
+            while True:
+                resultado = terminados.get()
+                if resultado is _FIN:
+                    break
+
+                resultado["duracion"] = time.perf_counter() - resultado.pop("inicio")
+                resultado.pop("contenido", None)
+                resultados[resultado["indice"]] = resultado
+                if resultado["error"]:
+                    logger.error(f"❌ Trabajo {resultado['indice']} falló: {resultado['error']}")
+                else:
+                    logger.info(f"✅ Trabajo {resultado['indice']} listo: {resultado['ruta_resize'] or resultado['ruta']}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        duracion_total = time.perf_counter() - inicio
+        resumen = resumir_lote(resultados, duracion_total)
+
+        logger.info(f"📊 Pipeline terminado: {resumen['exitosos']}/{resumen['total']} exitosos "
+                    f"en {resumen['duracion_total']:.1f}s "
+                    f"({resumen['imagenes_por_minuto']:.1f} imágenes/min)")
+
+        return {"resultados": resultados, "resumen": resumen}
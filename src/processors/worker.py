@@ -0,0 +1,222 @@
+# ============================================================================
+# TRABAJADOR DE COLA
+# Varios procesos (en una o varias máquinas) se reparten una misma cola de trabajos
+# ============================================================================
+
+import io
+import os
+import time
+import socket
+import threading
+from typing import Optional
+
+from src.processors.generador_imagenes_basico import GeneradorImagenes
+from src.processors.generador_lotes import resumir_lote
+from src.utils.job_queue import ColaTrabajos
+from src.utils.resize_image import ResizeImage
+from src.utils.logging_config import obtener_logger
+
+logger = obtener_logger(__name__)
+
+
+class TrabajadorCola:
+    """
+    Toma trabajos de una ColaTrabajos compartida y los ejecuta con
+    `generar_y_descargar` y, si hay carpeta de redimensionado, ResizeImage.
+
+    Cada hilo toma un trabajo cada vez con una concesión de `duracion_lease`
+    segundos; un hilo de latidos las renueva mientras se procesan. Si el proceso
+    muere, sus concesiones vencen y otros trabajadores retoman esos trabajos.
+    Para escalar se lanzan más procesos `python -m src worker` contra la misma cola.
+
+    Con carpeta de redimensionado la imagen se redimensiona desde memoria y el
+    original solo se escribe con guardar_original=True.
+    """
+
+    def __init__(self,
+                 cola: ColaTrabajos,
+                 generador: Optional[GeneradorImagenes] = None,
+                 concurrencia: int = 4,
+                 duracion_lease: float = 120.0,
+                 intervalo_latido: Optional[float] = None,
+                 carpeta_resize: Optional[str] = None,
+                 ancho: int = 800,
+                 alto: int = 600,
+                 guardar_original: bool = False,
+                 nombre: Optional[str] = None):
+        """
+        Args:
+            cola: Cola compartida de donde se toman los trabajos
+            generador: Instancia de GeneradorImagenes a compartir (por defecto el modelo por defecto)
+            concurrencia: Trabajos en curso a la vez en este proceso
+            duracion_lease: Segundos que dura cada concesión sin latido
+            intervalo_latido: Segundos entre latidos (por defecto un tercio de duracion_lease)
+            carpeta_resize: Carpeta de las imágenes redimensionadas; sin ella no se redimensiona
+            ancho: Ancho objetivo del redimensionado (los archivos "lifestyle" usan 1000x700)
+            alto: Alto objetivo del redimensionado
+            guardar_original: Escribir también la imagen original cuando se redimensiona
+            nombre: Identificador del trabajador en la cola (por defecto "host:pid")
+        """
+        if concurrencia < 1:
+            raise ValueError("La concurrencia debe ser al menos 1")
+
+        self.cola = cola
+        self.generador = generador or GeneradorImagenes()
+        self.concurrencia = concurrencia
+        self.duracion_lease = duracion_lease
+        self.intervalo_latido = intervalo_latido or duracion_lease / 3
+        self.carpeta_resize = carpeta_resize
+        self.ancho = ancho
+        self.alto = alto
+        self.guardar_original = guardar_original
+        self.nombre = nombre or f"{socket.gethostname()}:{os.getpid()}"
+
+        self._asignados = set()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        # Aparte de _detener: los latidos siguen hasta que terminan los trabajos en curso
+        self._detener_latidos = threading.Event()
+
+    def detener(self) -> None:
+        """Pide a los hilos que no tomen más trabajos (los que están en curso terminan)."""
+        self._detener.set()
+
+    def _liberar_asignados(self) -> None:
+        """Devuelve a la cola, sin gastar intento, los trabajos que este proceso deja a medias."""
+        with self._lock:
+            ids = list(self._asignados)
+        for id_ in ids:
+            try:
+                if self.cola.liberar(id_, self.nombre):
+                    logger.info(f"↩️ Trabajo {id_} devuelto a la cola")
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo devolver el trabajo {id_} a la cola: {e}")
+
+    def _ejecutar(self, trabajo: dict) -> str:
+        """generar_y_descargar + redimensionado opcional; devuelve la ruta final."""
+        if not self.carpeta_resize:
+            return self.generador.generar_y_descargar(
+                prompt=trabajo["prompt"],
+                imagen_referencia=trabajo["imagen_referencia"],
+                ruta_destino=trabajo["ruta_destino"],
+                nombre_archivo=trabajo["nombre_archivo"],
+                nombre_carpeta=trabajo["nombre_carpeta"],
+                aspect_ratio=trabajo.get("aspect_ratio", "4:3"),
+                output_format=trabajo.get("output_format", "png"),
+                usar_cache=trabajo.get("usar_cache", True),
+                plazo=trabajo.get("plazo"),
+            )
+
+        contenido = self.generador.generar_en_memoria(
+            prompt=trabajo["prompt"],
+            imagen_referencia=trabajo["imagen_referencia"],
+            aspect_ratio=trabajo.get("aspect_ratio", "4:3"),
+            output_format=trabajo.get("output_format", "png"),
+            usar_cache=trabajo.get("usar_cache", True),
+            plazo=trabajo.get("plazo"),
+        )
+        if self.guardar_original:
+            self.generador.guardar_contenido(contenido, trabajo["ruta_destino"], trabajo["nombre_archivo"],
+                                             trabajo["nombre_carpeta"])
+
+        carpeta = os.path.join(self.carpeta_resize, trabajo["nombre_carpeta"])
+        os.makedirs(carpeta, exist_ok=True)
+        ruta_resize = os.path.join(carpeta, trabajo["nombre_archivo"])
+        ancho, alto = ResizeImage.target_size_for(trabajo["nombre_archivo"], self.ancho, self.alto)
+        ResizeImage.resize_and_crop_transparent(io.BytesIO(contenido), ruta_resize, ancho, alto)
+        return ruta_resize
+
+    def _latidos(self) -> None:
+        """Renueva periódicamente las concesiones de los trabajos en curso."""
+        while not self._detener_latidos.wait(self.intervalo_latido):
+            with self._lock:
+                ids = list(self._asignados)
+            try:
+                for perdido in self.cola.renovar(ids, self.nombre, self.duracion_lease):
+                    logger.warning(f"⚠️ Concesión perdida para el trabajo {perdido}; otro trabajador lo retomará")
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudieron renovar las concesiones: {e}")
+
+    def _bucle(self, resultados: list, hasta_vaciar: bool, espera_vacia: float) -> None:
+        """Un hilo: toma, ejecuta y confirma trabajos hasta que no quedan o se detiene."""
+        while not self._detener.is_set():
+            registro = self.cola.tomar(self.nombre, self.duracion_lease)
+            if registro is None:
+                if hasta_vaciar and self.cola.pendientes() == 0:
+                    return
+                # Quedan trabajos asignados a otros (podrían vencer) o llegarán más
+                self._detener.wait(espera_vacia)
+                continue
+
+            with self._lock:
+                self._asignados.add(registro["id"])
+
+            inicio = time.perf_counter()
+            resultado = {"indice": registro["id"], "trabajo": registro["trabajo"], "ruta": None, "error": None}
+            try:
+                resultado["ruta"] = self._ejecutar(registro["trabajo"])
+                if self.cola.completar(registro["id"], self.nombre, resultado["ruta"]):
+                    logger.info(f"✅ Trabajo {registro['id']} listo: {resultado['ruta']}")
+                else:
+                    # La concesión venció y otro trabajador lo tiene: su resultado es el que cuenta
+                    logger.warning(f"⚠️ Trabajo {registro['id']} terminado con la concesión perdida; "
+                                   f"lo confirmará otro trabajador")
+            except Exception as e:
+                resultado["error"] = str(e)
+                # Un trabajo mal formado no mejora al reintentarlo
+                reintentar = not isinstance(e, (KeyError, ValueError))
+                self.cola.fallar(registro["id"], self.nombre, str(e), reintentar)
+                logger.error(f"❌ Trabajo {registro['id']} falló (intento {registro['intentos']}): {e}")
+            finally:
+                with self._lock:
+                    self._asignados.discard(registro["id"])
+
+            resultado["duracion"] = time.perf_counter() - inicio
+            with self._lock:
+                resultados.append(resultado)
+
+    def ejecutar(self, hasta_vaciar: bool = True, espera_vacia: float = 2.0) -> dict:
+        """
+        Procesa trabajos de la cola con `concurrencia` hilos.
+
+        Args:
+            hasta_vaciar: Terminar cuando no quede nada en cola ni asignado; con False
+                el trabajador sigue esperando trabajos nuevos hasta `detener()`
+            espera_vacia: Segundos de espera cuando no hay trabajo disponible
+
+        Returns:
+            Resultados de los trabajos procesados por este trabajador y resumen
+        """
+        inicio = time.perf_counter()
+        logger.info(f"👷 Trabajador {self.nombre}: {self.concurrencia} hilos sobre {self.cola.ruta}")
+
+        self._detener.clear()
+        self._detener_latidos.clear()
+        latidos = threading.Thread(target=self._latidos, name="latidos", daemon=True)
+        latidos.start()
+
+        resultados = []
+        hilos = [threading.Thread(target=self._bucle, args=(resultados, hasta_vaciar, espera_vacia),
+                                  name=f"trabajador-{i}", daemon=True)
+                 for i in range(self.concurrencia)]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            for hilo in hilos:
+                while hilo.is_alive():
+                    hilo.join(0.5)
+        except KeyboardInterrupt:
+            # Los trabajos en curso vuelven a la cola sin esperar a que venzan sus concesiones
+            logger.warning("⏹️ Trabajador interrumpido")
+            self.detener()
+            self._liberar_asignados()
+            raise
+        finally:
+            self._detener.set()
+            self._detener_latidos.set()
+            latidos.join()
+
+        resumen = resumir_lote(resultados, time.perf_counter() - inicio)
+        logger.info(f"📊 Trabajador {self.nombre}: {resumen['exitosos']}/{resumen['total']} trabajos en "
+                    f"{resumen['duracion_total']:.1f}s; cola: {self.cola.resumen()}")
+        return {"resultados": resultados, "resumen": resumen}
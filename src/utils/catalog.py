@@ -0,0 +1,149 @@
+import os
+import csv
+import json
+import hashlib
+import threading
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from src.utils.job_ledger import DIRECTORIO_REGISTROS
+from src.utils.logging_config import obtener_logger
+
+logger = obtener_logger(__name__)
+
+RUTA_CATALOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "df_publications_image.csv")
+RUTA_HUELLAS = os.path.join(DIRECTORIO_REGISTROS, "catalogo_huellas.json")
+
+
+class Publicacion(NamedTuple):
+    """Una fila del catálogo de publicaciones (columnas de df_publications_image.csv)."""
+    id: str
+    brand: str
+    model: str
+    type: str
+    availability: str
+    link: str
+    image_link: str
+
+    @property
+    def huella(self) -> str:
+        """Hash de lo que decide si hay que regenerar la fila: id + image_link + type."""
+        return hashlib.sha1(f"{self.id}\x1f{self.image_link}\x1f{self.type}".encode("utf-8")).hexdigest()
+
+
+def leer_catalogo(ruta: str = RUTA_CATALOGO,
+                  disponibilidad: Optional[Iterable[str]] = None,
+                  tipos: Optional[Iterable[str]] = None) -> Iterator[Publicacion]:
+    """
+    Lee el catálogo fila a fila (sin pandas) como Publicacion.
+
+    Args:
+        ruta: Ruta del CSV
+        disponibilidad: Valores de `availability` a incluir (ej: ["in stock"]); None para todos
+        tipos: Valores de `type` a incluir (ej: ["Naked", "Deportiva"]); None para todos
+
+    Yields:
+        Publicaciones que pasan los filtros, en el orden del archivo
+    """
+    disponibilidad = set(disponibilidad) if disponibilidad is not None else None
+    tipos = set(tipos) if tipos is not None else None
+
+    with open(ruta, "r", encoding="utf-8-sig", newline="") as f:
+        lector = csv.reader(f)
+        encabezado = next(lector, None)
+        if encabezado is None:
+            return
+
+        faltantes = [campo for campo in Publicacion._fields if campo not in encabezado]
+        if faltantes:
+            raise ValueError(f"Al catálogo le faltan columnas: {', '.join(faltantes)}")
+        posiciones = [encabezado.index(campo) for campo in Publicacion._fields]
+
+        for fila in lector:
+            if not fila:
+                continue
+            fila += [""] * (len(encabezado) - len(fila))
+            publicacion = Publicacion._make(fila[i].strip() for i in posiciones)
+
+            if disponibilidad is not None and publicacion.availability not in disponibilidad:
+                continue
+            if tipos is not None and publicacion.type not in tipos:
+                continue
+            yield publicacion
+
+
+class HuellasCatalogo:
+    """
+    Huellas (id + image_link + type) de las publicaciones ya procesadas en
+    ejecuciones anteriores, guardadas en un JSON.
+
+    Una publicación solo se confirma cuando su generación terminó bien, así que
+    las que fallaron vuelven a aparecer como cambiadas en la siguiente ejecución.
+    """
+
+    def __init__(self, ruta: str = RUTA_HUELLAS):
+        """
+        Args:
+            ruta: Archivo JSON de huellas (se crea al guardar)
+        """
+        self.ruta = os.path.normpath(ruta)
+        self._lock = threading.Lock()
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                self._huellas = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._huellas = {}
+
+    def cambio(self, publicacion: Publicacion) -> bool:
+        """True si la publicación es nueva o cambió desde que se confirmó."""
+        with self._lock:
+            return self._huellas.get(publicacion.id) != publicacion.huella
+
+    def confirmar(self, publicacion: Publicacion) -> None:
+        """Marca la publicación como procesada (se persiste con `guardar`)."""
+        with self._lock:
+            self._huellas[publicacion.id] = publicacion.huella
+
+    def olvidar(self, id_publicacion: str) -> None:
+        """Fuerza a que la publicación se vuelva a procesar."""
+        with self._lock:
+            self._huellas.pop(id_publicacion, None)
+
+    def guardar(self) -> None:
+        """Escribe las huellas a un temporal y lo mueve para no dejar el archivo a medias."""
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        with self._lock:
+            datos = json.dumps(self._huellas, indent=0, sort_keys=True)
+        with open(self.ruta + ".tmp", "w", encoding="utf-8") as f:
+            f.write(datos)
+        os.replace(self.ruta + ".tmp", self.ruta)
+
+    def __len__(self) -> int:
+        return len(self._huellas)
+
+
+def publicaciones_cambiadas(huellas: HuellasCatalogo,
+                            ruta: str = RUTA_CATALOGO,
+                            disponibilidad: Optional[Iterable[str]] = ("in stock",),
+                            tipos: Optional[Iterable[str]] = None) -> Iterator[Publicacion]:
+    """
+    Publicaciones nuevas o cambiadas desde la última ejecución.
+
+    Es un generador: se puede conectar directamente al pipeline de generación y
+    llamar a `huellas.confirmar(publicacion)` + `huellas.guardar()` según terminen.
+
+    Args:
+        huellas: Huellas de la ejecución anterior
+        ruta: Ruta del CSV
+        disponibilidad: Valores de `availability` a incluir (por defecto solo "in stock")
+        tipos: Valores de `type` a incluir; None para todos
+
+    Yields:
+        Publicaciones cuya huella no coincide con la guardada
+    """
+    revisadas = cambiadas = 0
+    for publicacion in leer_catalogo(ruta, disponibilidad, tipos):
+        revisadas += 1
+        if huellas.cambio(publicacion):
+            cambiadas += 1
+            yield publicacion
+    logger.info(f"📋 Catálogo: {cambiadas} de {revisadas} publicaciones nuevas o cambiadas")
@@ -0,0 +1,218 @@
+import os
+import time
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Optional
+from src.utils.metrics import instrumentacion
+from src.utils.rate_limiter import ESTADOS_REINTENTABLES
+from src.utils.logging_config import obtener_logger
+
+if TYPE_CHECKING:
+    import requests
+
+logger = obtener_logger(__name__)
+
+_sesion = None
+_sesion_lock = threading.Lock()
+
+
+def obtener_sesion(tamano_pool: int = 32) -> "requests.Session":
+    """
+    Devuelve la sesión HTTP compartida del proceso (keep-alive y pool de conexiones).
+
+    Args:
+        tamano_pool: Conexiones máximas por host en el pool (solo en la primera llamada)
+    """
+    global _sesion
+    if _sesion is None:
+        with _sesion_lock:
+            if _sesion is None:
+                # requests solo se importa cuando de verdad se descarga algo
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                sesion = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool)
+                sesion.mount("http://", adaptador)
+                sesion.mount("https://", adaptador)
+                _sesion = sesion
+    return _sesion
+
+
+def _tamano_total(response: "requests.Response", inicio: int) -> Optional[int]:
+    """Calcula el tamaño total esperado del archivo a partir de los encabezados."""
+    content_range = response.headers.get("Content-Range")
+    if response.status_code == 206 and content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+
+    content_length = response.headers.get("Content-Length")
+    if content_length and content_length.isdigit():
+        return inicio + int(content_length)
+    return None
+
+
+def ruta_temporal_unica(ruta_archivo: str) -> str:
+    """
+    Crea un temporal vacío junto a `ruta_archivo` ("<nombre>.<aleatorio>.part") y devuelve su ruta.
+
+    Al estar en la misma carpeta, os.replace lo mueve de forma atómica; al ser único,
+    dos escrituras simultáneas de la misma ruta no se mezclan.
+    """
+    descriptor, ruta_temporal = tempfile.mkstemp(
+        prefix=os.path.basename(ruta_archivo) + ".", suffix=".part", dir=os.path.dirname(ruta_archivo) or "."
+    )
+    os.close(descriptor)
+    return ruta_temporal
+
+
+def _es_reintentable(error: Exception) -> bool:
+    """Los errores HTTP solo se reintentan con estados transitorios (no 403/404...)."""
+    response = getattr(error, "response", None)
+    if response is not None and getattr(response, "status_code", None) is not None:
+        return response.status_code in ESTADOS_REINTENTABLES
+    return True
+
+
+def descargar_archivo(url: str,
+                      ruta_archivo: str,
+                      session: Optional["requests.Session"] = None,
+                      tamano_bloque: int = 64 * 1024,
+                      reintentos: int = 3,
+                      timeout: float = 60) -> str:
+    """
+    Descarga un archivo en bloques a un temporal y lo mueve a su ruta final.
+
+    El temporal (único por llamada, ver ruta_temporal_unica) se conserva entre
+    intentos para reanudar la transferencia con un encabezado Range; la ruta final
+    solo aparece cuando el archivo está completo. Los errores HTTP no transitorios
+    (ej: 403, 404) no se reintentan.
+
+    Args:
+        url: URL del archivo
+        ruta_archivo: Ruta final del archivo
+        session: Sesión HTTP a usar (por defecto la sesión compartida)
+        tamano_bloque: Tamaño de cada bloque escrito en disco
+        reintentos: Número de reintentos tras el primer intento
+        timeout: Timeout de conexión/lectura en segundos
+
+    Returns:
+        Ruta del archivo descargado
+    """
+    session = session or obtener_sesion()
+    ruta_temporal = ruta_temporal_unica(ruta_archivo)
+    ultimo_error = None
+
+    for intento in range(reintentos + 1):
+        inicio = os.path.getsize(ruta_temporal) if os.path.exists(ruta_temporal) else 0
+        headers = {"Range": f"bytes={inicio}-"} if inicio else {}
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416:
+                    # El temporal ya no corresponde al recurso remoto: empezar de cero
+                    os.remove(ruta_temporal)
+                    raise IOError("Rango no satisfacible, reiniciando descarga")
+                response.raise_for_status()
+
+                if response.status_code != 206:
+                    inicio = 0
+                total = _tamano_total(response, inicio)
+
+                transferidos = 0
+                try:
+                    with open(ruta_temporal, "ab" if inicio else "wb") as f:
+                        for bloque in response.iter_content(chunk_size=tamano_bloque):
+                            if bloque:
+                                f.write(bloque)
+                                transferidos += len(bloque)
+                finally:
+                    instrumentacion.contar("bytes_descargados", transferidos)
+
+            descargado = os.path.getsize(ruta_temporal)
+            if total is not None and descargado != total:
+                raise IOError(f"Descarga incompleta: {descargado} de {total} bytes")
+
+            os.replace(ruta_temporal, ruta_archivo)
+            return ruta_archivo
+
+        except Exception as e:
+            ultimo_error = e
+            if not _es_reintentable(e):
+                break
+            if intento < reintentos:
+                instrumentacion.contar("reintentos", operacion="descarga")
+                logger.warning(f"   ⚠️ Reintentando descarga ({intento + 1}/{reintentos}): {e}")
+                time.sleep(min(2 ** intento, 10))
+
+    if os.path.exists(ruta_temporal):
+        os.remove(ruta_temporal)
+    raise RuntimeError(f"Error descargando {url}: {ultimo_error}")
+
+
+def descargar_bytes(url: str,
+                    session: Optional["requests.Session"] = None,
+                    tamano_bloque: int = 64 * 1024,
+                    reintentos: int = 3,
+                    timeout: float = 60) -> bytes:
+    """
+    Descarga un archivo a memoria, sin pasar por disco.
+
+    Como `descargar_archivo`, reanuda con un encabezado Range lo ya recibido
+    si la conexión se corta a mitad de la transferencia y no reintenta los
+    errores HTTP no transitorios.
+
+    Args:
+        url: URL del archivo
+        session: Sesión HTTP a usar (por defecto la sesión compartida)
+        tamano_bloque: Tamaño de cada bloque leído
+        reintentos: Número de reintentos tras el primer intento
+        timeout: Timeout de conexión/lectura en segundos
+
+    Returns:
+        Contenido del archivo
+    """
+    session = session or obtener_sesion()
+    contenido = bytearray()
+    ultimo_error = None
+
+    for intento in range(reintentos + 1):
+        inicio = len(contenido)
+        headers = {"Range": f"bytes={inicio}-"} if inicio else {}
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416:
+                    # Lo recibido ya no corresponde al recurso remoto: empezar de cero
+                    contenido.clear()
+                    raise IOError("Rango no satisfacible, reiniciando descarga")
+                response.raise_for_status()
+
+                if response.status_code != 206:
+                    contenido.clear()
+                    inicio = 0
+                total = _tamano_total(response, inicio)
+
+                transferidos = 0
+                try:
+                    for bloque in response.iter_content(chunk_size=tamano_bloque):
+                        if bloque:
+                            contenido += bloque
+                            transferidos += len(bloque)
+                finally:
+                    instrumentacion.contar("bytes_descargados", transferidos)
+
+            if total is not None and len(contenido) != total:
+                raise IOError(f"Descarga incompleta: {len(contenido)} de {total} bytes")
+            return bytes(contenido)
+
+        except Exception as e:
+            ultimo_error = e
+            if not _es_reintentable(e):
+                break
+            if intento < reintentos:
+                instrumentacion.contar("reintentos", operacion="descarga")
+                logger.warning(f"   ⚠️ Reintentando descarga ({intento + 1}/{reintentos}): {e}")
+                time.sleep(min(2 ** intento, 10))
+
+    raise RuntimeError(f"Error descargando {url}: {ultimo_error}")
@@ -0,0 +1,58 @@
+import threading
+from collections import deque
+from typing import Optional
+
+
+class PoliticaCobertura:
+    """
+    Decide cuándo cubrir una predicción lenta con un duplicado.
+
+    Guarda las latencias de las últimas predicciones terminadas; una predicción
+    que lleva más que el percentil `percentil` de esas latencias recibe un
+    duplicado, y se queda la que termine primero. `max_simultaneas` limita
+    cuántos duplicados pueden estar en curso a la vez (cada uno se paga).
+    """
+
+    def __init__(self,
+                 percentil: float = 0.95,
+                 max_simultaneas: int = 2,
+                 minimo_muestras: int = 20,
+                 ventana: int = 200,
+                 umbral_minimo: float = 5.0):
+        """
+        Args:
+            percentil: Latencia observada a partir de la cual se envía un duplicado
+            max_simultaneas: Duplicados en curso como máximo
+            minimo_muestras: Latencias necesarias antes de empezar a cubrir
+            ventana: Latencias recientes que se tienen en cuenta
+            umbral_minimo: Segundos mínimos antes de cubrir, aunque el percentil sea menor
+        """
+        self.percentil = percentil
+        self.max_simultaneas = max_simultaneas
+        self.minimo_muestras = minimo_muestras
+        self.umbral_minimo = umbral_minimo
+        self._latencias = deque(maxlen=ventana)
+        self._lock = threading.Lock()
+        self._cupos = threading.BoundedSemaphore(max_simultaneas) if max_simultaneas > 0 else None
+
+    def registrar(self, latencia: float) -> None:
+        """Registra la latencia (segundos) de una predicción terminada con éxito."""
+        with self._lock:
+            self._latencias.append(latencia)
+
+    def umbral(self) -> Optional[float]:
+        """Segundos de espera tras los que conviene cubrir, o None si aún no hay datos suficientes."""
+        with self._lock:
+            if len(self._latencias) < self.minimo_muestras:
+                return None
+            ordenadas = sorted(self._latencias)
+        posicion = min(len(ordenadas) - 1, int(round(self.percentil * (len(ordenadas) - 1))))
+        return max(self.umbral_minimo, ordenadas[posicion])
+
+    def reservar(self) -> bool:
+        """Reserva un cupo para un duplicado sin esperar; False si están todos ocupados."""
+        return self._cupos is not None and self._cupos.acquire(blocking=False)
+
+    def liberar(self) -> None:
+        """Devuelve el cupo reservado con `reservar`."""
+        self._cupos.release()
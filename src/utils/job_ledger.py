@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional
+
+DIRECTORIO_REGISTROS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "registros")
+
+# Estados de un trabajo, en el orden en que avanza
+ESTADO_EN_COLA = "queued"
+ESTADO_ENVIADO = "submitted"
+ESTADO_EXITOSO = "succeeded"
+ESTADO_DESCARGADO = "downloaded"
+ESTADO_FALLIDO = "failed"
+
+
+def id_trabajo(trabajo: dict) -> str:
+    """
+    Identificador estable de un trabajo: `trabajo["id"]` si existe o, si no,
+    un hash de su ruta de destino (carpeta + nombre de archivo).
+    """
+    if trabajo.get("id"):
+        return str(trabajo["id"])
+    destino = os.path.join(trabajo["ruta_destino"], trabajo["nombre_carpeta"], trabajo["nombre_archivo"])
+    return hashlib.sha256(os.path.normpath(destino).encode("utf-8")).hexdigest()[:32]
+
+
+class RegistroTrabajos:
+    """
+    Registro persistente (SQLite) del estado de cada trabajo de generación.
+
+    Guarda el ID de predicción en cuanto se envía y la URL en cuanto termina, de
+    modo que una ejecución reiniciada puede volver a consultar o descargar lo ya
+    pagado en lugar de enviarlo otra vez. Los duplicados enviados por la política
+    de cobertura también se anotan, para poder cancelarlos si la ejecución se corta.
+    """
+
+    def __init__(self, ruta: str = os.path.join(DIRECTORIO_REGISTROS, "trabajos.sqlite")):
+        """
+        Args:
+            ruta: Archivo SQLite del registro (se crea si no existe)
+        """
+        self.ruta = os.path.normpath(ruta)
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        with self._conexion() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS trabajos ("
+                " id TEXT PRIMARY KEY,"
+                " estado TEXT NOT NULL,"
+                " trabajo TEXT NOT NULL,"
+                " prediction_id TEXT,"
+                " url TEXT,"
+                " ruta TEXT,"
+                " error TEXT,"
+                " intentos INTEGER NOT NULL DEFAULT 0,"
+                " actualizado REAL NOT NULL,"
+                " duplicados TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos (estado)")
+            # Registros creados antes de anotar los duplicados de cobertura
+            columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(trabajos)")}
+            if "duplicados" not in columnas:
+                conn.execute("ALTER TABLE trabajos ADD COLUMN duplicados TEXT")
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _fila_a_dict(fila: sqlite3.Row) -> dict:
+        registro = dict(fila)
+        registro["trabajo"] = json.loads(registro["trabajo"])
+        registro["duplicados"] = json.loads(registro["duplicados"]) if registro.get("duplicados") else []
+        return registro
+
+    def obtener(self, id_trabajo: str) -> Optional[dict]:
+        """Devuelve el registro de un trabajo, o None si no existe."""
+        fila = self._conexion().execute("SELECT * FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+        return self._fila_a_dict(fila) if fila else None
+
+    def encolar(self, id_trabajo: str, trabajo: dict) -> dict:
+        """Registra un trabajo en cola si aún no existe y devuelve su registro actual."""
+        with self._conexion() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO trabajos (id, estado, trabajo, actualizado) VALUES (?, ?, ?, ?)",
+                (id_trabajo, ESTADO_EN_COLA, json.dumps(trabajo), time.time()),
+            )
+        return self.obtener(id_trabajo)
+
+    def _actualizar(self, id_trabajo: str, estado: str, **campos) -> None:
+        asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+        asignaciones = f"estado = ?, actualizado = ?{', ' + asignaciones if asignaciones else ''}"
+        with self._conexion() as conn:
+            conn.execute(
+                f"UPDATE trabajos SET {asignaciones} WHERE id = ?",
+                (estado, time.time(), *campos.values(), id_trabajo),
+            )
+
+    def marcar_enviado(self, id_trabajo: str, prediction_id: str) -> None:
+        with self._conexion() as conn:
+            conn.execute(
+                "UPDATE trabajos SET estado = ?, prediction_id = ?, error = NULL, duplicados = NULL,"
+                " intentos = intentos + 1, actualizado = ? WHERE id = ?",
+                (ESTADO_ENVIADO, prediction_id, time.time(), id_trabajo),
+            )
+
+    def agregar_duplicado(self, id_trabajo: str, prediction_id: str) -> None:
+        """Anota una predicción duplicada (cobertura) enviada para el trabajo."""
+        with self._conexion() as conn:
+            fila = conn.execute("SELECT duplicados FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+            duplicados = json.loads(fila["duplicados"]) if fila and fila["duplicados"] else []
+            conn.execute(
+                "UPDATE trabajos SET duplicados = ?, actualizado = ? WHERE id = ?",
+                (json.dumps(duplicados + [prediction_id]), time.time(), id_trabajo),
+            )
+
+    def marcar_exitoso(self, id_trabajo: str, url: str) -> None:
+        self._actualizar(id_trabajo, ESTADO_EXITOSO, url=url, error=None)
+
+    def marcar_descargado(self, id_trabajo: str, ruta: str) -> None:
+        self._actualizar(id_trabajo, ESTADO_DESCARGADO, ruta=ruta, error=None)
+
+    def marcar_fallido(self, id_trabajo: str, error: str) -> None:
+        self._actualizar(id_trabajo, ESTADO_FALLIDO, error=error)
+
+    def registrar_error(self, id_trabajo: str, error: str) -> None:
+        """Anota un error sin cambiar el estado (ej: una descarga que se reintentará)."""
+        with self._conexion() as conn:
+            conn.execute(
+                "UPDATE trabajos SET error = ?, actualizado = ? WHERE id = ?",
+                (error, time.time(), id_trabajo),
+            )
+
+    def pendientes(self) -> List[dict]:
+        """Trabajos sin terminar (todo lo que no está descargado), en orden de registro."""
+        filas = self._conexion().execute(
+            "SELECT * FROM trabajos WHERE estado != ? ORDER BY rowid", (ESTADO_DESCARGADO,)
+        ).fetchall()
+        return [self._fila_a_dict(fila) for fila in filas]
+
+    def resumen(self) -> dict:
+        """Número de trabajos por estado."""
+        filas = self._conexion().execute("SELECT estado, COUNT(*) FROM trabajos GROUP BY estado").fetchall()
+        return {estado: cantidad for estado, cantidad in filas}
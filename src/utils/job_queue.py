@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+
+from src.utils.job_ledger import DIRECTORIO_REGISTROS, id_trabajo
+
+RUTA_COLA = os.path.join(DIRECTORIO_REGISTROS, "cola.sqlite")
+
+# Estados de un trabajo en la cola compartida
+ESTADO_EN_COLA = "queued"
+ESTADO_ASIGNADO = "leased"
+ESTADO_TERMINADO = "done"
+ESTADO_FALLIDO = "failed"
+
+
+class ColaTrabajos:
+    """
+    Cola de trabajos compartida entre varios procesos o máquinas (SQLite).
+
+    Un trabajador toma un trabajo con una concesión (lease) de duración limitada
+    y la renueva con latidos mientras lo procesa. Si el trabajador muere, la
+    concesión vence y el trabajo vuelve a poder tomarse, así que no se pierde
+    ninguno; como mucho se procesa dos veces (las salidas se sobrescriben).
+    Cada toma cuenta como un intento y, tras `max_intentos`, el trabajo queda fallido.
+    """
+
+    def __init__(self,
+                 ruta: str = RUTA_COLA,
+                 max_intentos: int = 3,
+                 wal: bool = True):
+        """
+        Args:
+            ruta: Archivo SQLite de la cola (se crea si no existe)
+            max_intentos: Tomas como máximo por trabajo (incluidas las de concesiones vencidas)
+            wal: Usar journal WAL; ponerlo en False si el archivo está en un disco de red
+                (NFS/SMB), donde WAL no es seguro entre máquinas
+        """
+        self.ruta = os.path.normpath(ruta)
+        self.max_intentos = max_intentos
+        self.wal = wal
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        with self._conexion() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cola ("
+                " id TEXT PRIMARY KEY,"
+                " estado TEXT NOT NULL,"
+                " trabajo TEXT NOT NULL,"
+                " trabajador TEXT,"
+                " vence REAL,"
+                " intentos INTEGER NOT NULL DEFAULT 0,"
+                " ruta TEXT,"
+                " error TEXT,"
+                " actualizado REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cola_estado ON cola (estado, vence)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute(f"PRAGMA journal_mode={'WAL' if self.wal else 'DELETE'}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaccion(self, sql: str, parametros: tuple = ()) -> int:
+        """Ejecuta una sentencia en su propia transacción y devuelve las filas afectadas."""
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            filas = conn.execute(sql, parametros).rowcount
+            conn.execute("COMMIT")
+            return filas
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _fila_a_dict(fila: sqlite3.Row) -> dict:
+        registro = dict(fila)
+        registro["trabajo"] = json.loads(registro["trabajo"])
+        return registro
+
+    def encolar(self, trabajos: Iterable[dict]) -> int:
+        """
+        Añade trabajos a la cola (los que ya están, por su id_trabajo, se ignoran).
+
+        Returns:
+            Número de trabajos nuevos
+        """
+        ahora = time.time()
+        filas = [(id_trabajo(trabajo), ESTADO_EN_COLA, json.dumps(trabajo), ahora) for trabajo in trabajos]
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            antes = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO cola (id, estado, trabajo, actualizado) VALUES (?, ?, ?, ?)", filas
+            )
+            nuevos = conn.total_changes - antes
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return nuevos
+
+    def tomar(self, trabajador: str, duracion: float) -> Optional[dict]:
+        """
+        Asigna a `trabajador` el trabajo en cola más antiguo (o uno con la concesión vencida).
+
+        Args:
+            trabajador: Identificador del trabajador (ej: "host:pid")
+            duracion: Segundos de la concesión; hay que renovarla antes de que venza
+
+        Returns:
+            Registro del trabajo asignado, o None si no queda ninguno disponible
+        """
+        ahora = time.time()
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Concesiones vencidas que ya agotaron sus intentos: el trabajo queda fallido
+            conn.execute(
+                "UPDATE cola SET estado = ?, error = COALESCE(error, 'Concesión vencida'), actualizado = ?"
+                " WHERE estado = ? AND vence < ? AND intentos >= ?",
+                (ESTADO_FALLIDO, ahora, ESTADO_ASIGNADO, ahora, self.max_intentos),
+            )
+            fila = conn.execute(
+                "SELECT id FROM cola WHERE estado = ? OR (estado = ? AND vence < ?) ORDER BY rowid LIMIT 1",
+                (ESTADO_EN_COLA, ESTADO_ASIGNADO, ahora),
+            ).fetchone()
+            if fila is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE cola SET estado = ?, trabajador = ?, vence = ?, intentos = intentos + 1,"
+                " actualizado = ? WHERE id = ?",
+                (ESTADO_ASIGNADO, trabajador, ahora + duracion, ahora, fila["id"]),
+            )
+            registro = conn.execute("SELECT * FROM cola WHERE id = ?", (fila["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._fila_a_dict(registro)
+
+    def renovar(self, ids: List[str], trabajador: str, duracion: float) -> List[str]:
+        """
+        Latido: extiende las concesiones de `trabajador` sobre `ids`.
+
+        Returns:
+            IDs cuya concesión ya no es de `trabajador` (vencida y tomada por otro)
+        """
+        if not ids:
+            return []
+        ahora = time.time()
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            perdidos = []
+            for id_ in ids:
+                cursor = conn.execute(
+                    "UPDATE cola SET vence = ?, actualizado = ? WHERE id = ? AND estado = ? AND trabajador = ?",
+                    (ahora + duracion, ahora, id_, ESTADO_ASIGNADO, trabajador),
+                )
+                if cursor.rowcount == 0:
+                    perdidos.append(id_)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return perdidos
+
+    def completar(self, id_: str, trabajador: str, ruta: Optional[str] = None) -> bool:
+        """Marca el trabajo como terminado; False si la concesión ya no era de `trabajador`."""
+        return self._transaccion(
+            "UPDATE cola SET estado = ?, ruta = ?, error = NULL, vence = NULL, actualizado = ?"
+            " WHERE id = ? AND estado = ? AND trabajador = ?",
+            (ESTADO_TERMINADO, ruta, time.time(), id_, ESTADO_ASIGNADO, trabajador),
+        ) > 0
+
+    def fallar(self, id_: str, trabajador: str, error: str, reintentar: bool = True) -> bool:
+        """
+        Devuelve el trabajo a la cola si le quedan intentos (y `reintentar`) o lo marca fallido.
+
+        Returns:
+            False si la concesión ya no era de `trabajador`
+        """
+        return self._transaccion(
+            "UPDATE cola SET estado = CASE WHEN ? AND intentos < ? THEN ? ELSE ? END,"
+            " error = ?, vence = NULL, actualizado = ?"
+            " WHERE id = ? AND estado = ? AND trabajador = ?",
+            (int(reintentar), self.max_intentos, ESTADO_EN_COLA, ESTADO_FALLIDO, error, time.time(),
+             id_, ESTADO_ASIGNADO, trabajador),
+        ) > 0
+
+    def liberar(self, id_: str, trabajador: str) -> bool:
+        """Devuelve a la cola un trabajo sin contar el intento (ej: al detener el trabajador)."""
+        return self._transaccion(
+            "UPDATE cola SET estado = ?, intentos = MAX(0, intentos - 1), vence = NULL, actualizado = ?"
+            " WHERE id = ? AND estado = ? AND trabajador = ?",
+            (ESTADO_EN_COLA, time.time(), id_, ESTADO_ASIGNADO, trabajador),
+        ) > 0
+
+    def reencolar_fallidos(self) -> int:
+        """Vuelve a poner en cola los trabajos fallidos con los intentos a cero."""
+        return self._transaccion(
+            "UPDATE cola SET estado = ?, intentos = 0, actualizado = ? WHERE estado = ?",
+            (ESTADO_EN_COLA, time.time(), ESTADO_FALLIDO),
+        )
+
+    def pendientes(self) -> int:
+        """Trabajos en cola o asignados (incluidas concesiones vencidas aún sin reasignar)."""
+        return self._conexion().execute(
+            "SELECT COUNT(*) FROM cola WHERE estado IN (?, ?)", (ESTADO_EN_COLA, ESTADO_ASIGNADO)
+        ).fetchone()[0]
+
+    def fallidos(self) -> List[dict]:
+        """Registros de los trabajos fallidos, en orden de encolado."""
+        filas = self._conexion().execute(
+            "SELECT * FROM cola WHERE estado = ? ORDER BY rowid", (ESTADO_FALLIDO,)
+        ).fetchall()
+        return [self._fila_a_dict(fila) for fila in filas]
+
+    def resumen(self) -> dict:
+        """Número de trabajos por estado."""
+        filas = self._conexion().execute("SELECT estado, COUNT(*) FROM cola GROUP BY estado").fetchall()
+        return {estado: cantidad for estado, cantidad in filas}
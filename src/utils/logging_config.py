@@ -0,0 +1,42 @@
+import sys
+import logging
+import threading
+
+LOGGER_RAIZ = "src"
+
+_lock = threading.Lock()
+
+# Como librería no se imprime nada por defecto: la salida la decide quien la usa
+# (la CLI, los benchmarks o un notebook con configurar_logging())
+logging.getLogger(LOGGER_RAIZ).addHandler(logging.NullHandler())
+
+
+def configurar_logging(silencioso: bool = False, nivel: int = logging.INFO, formato: str = "%(message)s") -> None:
+    """
+    Configura la salida de los mensajes del proyecto.
+
+    Args:
+        silencioso: Si es True solo se muestran advertencias y errores
+        nivel: Nivel mínimo cuando no es silencioso
+        formato: Formato de cada línea (por defecto solo el mensaje, como los antiguos print)
+    """
+    with _lock:
+        logger = logging.getLogger(LOGGER_RAIZ)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter(formato))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING if silencioso else nivel)
+        logger.propagate = False
+
+
+def obtener_logger(nombre: str) -> logging.Logger:
+    """
+    Devuelve el logger de un módulo del proyecto.
+
+    No configura nada: sin configurar_logging() los mensajes siguen la
+    configuración de logging de la aplicación que importa el paquete.
+    """
+    return logging.getLogger(nombre)
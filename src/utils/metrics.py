@@ -0,0 +1,201 @@
+import json
+import time
+import random
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import List, Optional
+
+# Etapas instrumentadas del pipeline
+ETAPA_CODIFICACION_REFERENCIA = "codificacion_referencia"
+ETAPA_ENVIO = "envio"
+ETAPA_COLA_REMOTA = "cola_remota"
+ETAPA_EJECUCION_REMOTA = "ejecucion_remota"
+ETAPA_DESCARGA = "descarga"
+ETAPA_RESIZE = "resize"
+
+# Límites (segundos) de los buckets del histograma, de 5 ms a 10 minutos
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class SinkJSONL:
+    """Escribe cada evento (span o contador) como una línea JSON en un archivo."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+    def registrar(self, evento: dict) -> None:
+        linea = json.dumps(evento, ensure_ascii=False)
+        with self._lock:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(linea + "\n")
+
+
+class AgregadorMemoria:
+    """
+    Agrega eventos en memoria: histograma y muestras por etapa y totales por contador.
+
+    Puede exportar el estado como texto de exposición de Prometheus.
+    """
+
+    def __init__(self, buckets=BUCKETS_SEGUNDOS, max_muestras: int = 10000):
+        """
+        Args:
+            buckets: Límites superiores de los buckets del histograma en segundos
+            max_muestras: Duraciones guardadas por etapa para calcular percentiles; pasado
+                el límite se mantiene una muestra uniforme de todo el proceso (reservoir
+                sampling), no solo los primeros eventos
+        """
+        self.buckets = tuple(buckets)
+        self.max_muestras = max_muestras
+        self._aleatorio = random.Random()
+        self._histogramas = {}
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, evento: dict) -> None:
+        with self._lock:
+            if evento["tipo"] == "span":
+                histograma = self._histogramas.setdefault(evento["etapa"], {
+                    "conteos": [0] * (len(self.buckets) + 1),
+                    "suma": 0.0,
+                    "total": 0,
+                    "muestras": [],
+                })
+                histograma["conteos"][bisect_left(self.buckets, evento["duracion"])] += 1
+                histograma["suma"] += evento["duracion"]
+                histograma["total"] += 1
+                if len(histograma["muestras"]) < self.max_muestras:
+                    histograma["muestras"].append(evento["duracion"])
+                else:
+                    # Cada duración vista queda en la muestra con probabilidad max_muestras / total
+                    indice = self._aleatorio.randrange(histograma["total"])
+                    if indice < self.max_muestras:
+                        histograma["muestras"][indice] = evento["duracion"]
+            elif evento["tipo"] == "contador":
+                self._contadores[evento["nombre"]] = self._contadores.get(evento["nombre"], 0) + evento["valor"]
+
+    def resumen(self) -> dict:
+        """Conteo, suma y percentiles por etapa, y totales por contador."""
+        with self._lock:
+            etapas = {}
+            for etapa, histograma in self._histogramas.items():
+                muestras = sorted(histograma["muestras"])
+                etapas[etapa] = {
+                    "total": histograma["total"],
+                    "suma": histograma["suma"],
+                    "p50": _percentil(muestras, 0.50),
+                    "p95": _percentil(muestras, 0.95),
+                    "p99": _percentil(muestras, 0.99),
+                }
+            return {"etapas": etapas, "contadores": dict(self._contadores)}
+
+    def exportar_prometheus(self, prefijo: str = "ia_image_generator") -> str:
+        """Estado actual en formato de exposición de texto de Prometheus."""
+        lineas = [
+            f"# HELP {prefijo}_etapa_segundos Duración de cada etapa del pipeline.",
+            f"# TYPE {prefijo}_etapa_segundos histogram",
+        ]
+        with self._lock:
+            for etapa, histograma in sorted(self._histogramas.items()):
+                acumulado = 0
+                for limite, conteo in zip(self.buckets, histograma["conteos"]):
+                    acumulado += conteo
+                    lineas.append(f'{prefijo}_etapa_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+                lineas.append(f'{prefijo}_etapa_segundos_bucket{{etapa="{etapa}",le="+Inf"}} {histograma["total"]}')
+                lineas.append(f'{prefijo}_etapa_segundos_sum{{etapa="{etapa}"}} {histograma["suma"]}')
+                lineas.append(f'{prefijo}_etapa_segundos_count{{etapa="{etapa}"}} {histograma["total"]}')
+
+            for nombre, valor in sorted(self._contadores.items()):
+                lineas.append(f"# TYPE {prefijo}_{nombre}_total counter")
+                lineas.append(f"{prefijo}_{nombre}_total {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+def _percentil(ordenados: List[float], q: float) -> Optional[float]:
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, int(round(q * (len(ordenados) - 1))))]
+
+
+class Instrumentacion:
+    """
+    Punto central de instrumentación: reparte spans y contadores a los sinks registrados.
+
+    Sin sinks registrados las llamadas no hacen nada más que medir el tiempo.
+    """
+
+    def __init__(self, sinks: Optional[list] = None):
+        self.sinks = list(sinks or [])
+
+    def agregar_sink(self, sink) -> None:
+        self.sinks.append(sink)
+
+    def quitar_sink(self, sink) -> None:
+        self.sinks.remove(sink)
+
+    def _emitir(self, evento: dict) -> None:
+        for sink in self.sinks:
+            sink.registrar(evento)
+
+    def registrar_span(self, etapa: str, duracion: float, **atributos) -> None:
+        """Registra la duración de una etapa medida fuera de `span` (ej: tiempos remotos)."""
+        if self.sinks:
+            self._emitir({"tipo": "span", "etapa": etapa, "duracion": duracion,
+                          "timestamp": time.time(), **atributos})
+
+    def contar(self, nombre: str, valor: float = 1, **atributos) -> None:
+        """Incrementa un contador (ej: reintentos, bytes_descargados)."""
+        if self.sinks:
+            self._emitir({"tipo": "contador", "nombre": nombre, "valor": valor,
+                          "timestamp": time.time(), **atributos})
+
+    @contextmanager
+    def span(self, etapa: str, **atributos):
+        """Mide el bloque y lo registra como span de `etapa` (también si lanza una excepción)."""
+        inicio = time.perf_counter()
+        error = None
+        try:
+            yield atributos
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            if error:
+                atributos["error"] = error
+            self.registrar_span(etapa, time.perf_counter() - inicio, **atributos)
+
+
+# Instrumentación compartida por todo el proceso
+instrumentacion = Instrumentacion()
+
+
+def parsear_fecha_iso(valor: Optional[str]) -> Optional[float]:
+    """Convierte una fecha ISO 8601 de Replicate a timestamp."""
+    if not valor:
+        return None
+    from datetime import datetime
+    valor = valor.replace("Z", "+00:00")
+    # Replicate puede enviar más de 6 decimales en los segundos
+    if "." in valor:
+        base, resto = valor.split(".", 1)
+        fraccion = "".join(c for c in resto if c.isdigit())
+        zona = resto[len(fraccion):]
+        valor = f"{base}.{fraccion[:6]}{zona}"
+    return datetime.fromisoformat(valor).timestamp()
+
+
+def registrar_tiempos_remotos(resultado: dict, **atributos) -> None:
+    """
+    Registra la espera en cola y el tiempo de ejecución remotos a partir de
+    created_at / started_at / completed_at de la predicción.
+    """
+    creada = parsear_fecha_iso(resultado.get("created_at"))
+    iniciada = parsear_fecha_iso(resultado.get("started_at"))
+    completada = parsear_fecha_iso(resultado.get("completed_at"))
+
+    if creada is not None and iniciada is not None:
+        instrumentacion.registrar_span(ETAPA_COLA_REMOTA, max(0.0, iniciada - creada), **atributos)
+    if iniciada is not None and completada is not None:
+        instrumentacion.registrar_span(ETAPA_EJECUCION_REMOTA, max(0.0, completada - iniciada), **atributos)
@@ -0,0 +1,130 @@
+import os
+import json
+import random
+import threading
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+# Tipos de moto agrupados por la categoría que usan en img_prompts.json
+MOTORCYCLE_CATEGORIES = {
+    "offroad": ("Doble Propósito", "Enduro", "Cuatrimoto", "ATV"),
+    "city": ("Naked", "Trabajo", "Motoneta", "Café Racer", "Semiautomática", "Chopper", "Eléctrica"),
+    "sport": ("Deportiva",),
+    "touring": ("Touring",),
+    "transport": ("Carga", "Carguero"),
+    "transport_trimoto": ("Trimoto",),
+}
+
+
+class OptionSet:
+    """Opciones de una sección del JSON en tuplas, con índice inverso valor → posición."""
+
+    __slots__ = ("keys", "values", "index")
+
+    def __init__(self, options: Dict[str, str]):
+        self.keys = tuple(options.keys())
+        self.values = tuple(options.values())
+        self.index = {}
+        for i, value in enumerate(self.values):
+            self.index.setdefault(value, i)
+
+    def key_for(self, value: str) -> Optional[str]:
+        """Devuelve la clave de un valor, o None si no pertenece al conjunto."""
+        i = self.index.get(value)
+        return None if i is None else self.keys[i]
+
+    def sample(self, rng: random.Random = random, avoid: Union[str, Iterable[str], None] = None) -> str:
+        """
+        Elige un valor al azar evitando `avoid` (un valor o una colección de valores).
+
+        Se sortea entre las n-k posiciones permitidas y se saltan las k posiciones a
+        evitar, en O(k); si no queda alternativa se usa cualquier opción.
+        """
+        n = len(self.values)
+        if not avoid:
+            return self.values[rng.randrange(n)]
+
+        if isinstance(avoid, str):
+            avoid = (avoid,)
+        avoid_indexes = sorted({self.index[value] for value in avoid if value in self.index})
+        if not avoid_indexes or len(avoid_indexes) >= n:
+            return self.values[rng.randrange(n)]
+
+        i = rng.randrange(n - len(avoid_indexes))
+        for avoid_index in avoid_indexes:
+            if i >= avoid_index:
+                i += 1
+        return self.values[i]
+
+
+class CompiledPromptConfig:
+    """Configuración de prompts precompilada para muestrear sin recorrer el JSON."""
+
+    def __init__(self, config: dict):
+        self.config = config
+
+        # Tipo de moto → categoría
+        self.type_category = {
+            motorcycle_type: category
+            for category, types in MOTORCYCLE_CATEGORIES.items()
+            for motorcycle_type in types
+        }
+
+        self.environments = {k: OptionSet(v) for k, v in config["ENVIRONMENTS"].items()}
+        self.riders = {k: OptionSet(v) for k, v in config["RIDERS"].items()}
+        self.actions_with_rider = {k: OptionSet(v) for k, v in config["ACTIONS"]["with_rider"].items()}
+        self.actions_without_rider = OptionSet(config["ACTIONS"]["without_rider"])
+        self.lighting = OptionSet(config["LIGHTING"])
+        self.style_extras = {k: OptionSet(v) for k, v in config["STYLE_EXTRAS"].items()}
+        self.composition = OptionSet(config["COMPOSITION"])
+        self.camera_distance = OptionSet(config["CAMERA_DISTANCE"])
+        self.variety = {k: tuple(v) for k, v in config["VARIETY_ELEMENTS"].items()}
+
+    def category_for(self, motorcycle_type: str) -> Optional[str]:
+        """Categoría de un tipo de moto, o None si no es un tipo conocido."""
+        return self.type_category.get(motorcycle_type)
+
+    def environment_options(self, motorcycle_type: str) -> OptionSet:
+        # Fallback: usar entorno de ciudad por defecto
+        return self.environments.get(self.category_for(motorcycle_type)) or self.environments["city"]
+
+    def rider_options(self, motorcycle_type: str) -> OptionSet:
+        category = self.category_for(motorcycle_type)
+        if category in self.riders:
+            return self.riders[category]
+        # Fallback: riders "default" si existen en la configuración, si no los de ciudad
+        return self.riders.get("default") or self.riders["city"]
+
+    def action_options(self, motorcycle_type: str, has_rider: bool = True) -> OptionSet:
+        if not has_rider:
+            # Sin conductor: usar acciones genéricas
+            return self.actions_without_rider
+        # Fallback: usar acciones de ciudad
+        return self.actions_with_rider.get(self.category_for(motorcycle_type)) or self.actions_with_rider["city"]
+
+    def style_extra_options(self, has_rider: bool = True) -> OptionSet:
+        # Con conductor: estilos dinámicos; sin conductor: estáticos
+        return self.style_extras["dynamic" if has_rider else "static"]
+
+
+_compiled_cache: Dict[str, Tuple[float, CompiledPromptConfig]] = {}
+_compiled_lock = threading.Lock()
+
+
+def load_prompt_config(prompts_config_path: str) -> CompiledPromptConfig:
+    """
+    Carga y compila img_prompts.json una vez por proceso.
+
+    La caché se indexa por ruta absoluta y se invalida si cambia el mtime del archivo.
+    """
+    path = os.path.abspath(prompts_config_path)
+    mtime = os.path.getmtime(path)
+
+    with _compiled_lock:
+        cached = _compiled_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "r") as f:
+            compiled = CompiledPromptConfig(json.load(f))
+        _compiled_cache[path] = (mtime, compiled)
+        return compiled
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+PROMPT_COMPONENTS = ("environment", "rider", "action", "lighting_style", "extras", "composition", "camera_distance")
+
+DEFAULT_HISTORY_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "temp", "prompt_history.sqlite"
+)
+
+
+class PromptHistoryStore(ABC):
+    """
+    Historial de selecciones de prompts por modelo, usado para evitar repeticiones.
+
+    Las subclases implementan recent/record/clear; avoid_sets construye a partir
+    de las últimas `window` selecciones los valores a evitar por componente y
+    select_and_record elige y registra en un solo paso.
+    """
+
+    @abstractmethod
+    def recent(self, model: str, limit: int = 1) -> List[dict]:
+        """Devuelve las últimas `limit` selecciones del modelo, de la más reciente a la más antigua."""
+
+    @abstractmethod
+    def record(self, model: str, selection: dict) -> None:
+        """Registra una selección de componentes para el modelo."""
+
+    @abstractmethod
+    def clear(self, model: str) -> None:
+        """Elimina el historial del modelo."""
+
+    @staticmethod
+    def _avoid_from(selections: List[dict]) -> Dict[str, Set[str]]:
+        avoid = {component: set() for component in PROMPT_COMPONENTS}
+        for selection in selections:
+            for component in PROMPT_COMPONENTS:
+                value = selection.get(component)
+                if value:
+                    avoid[component].add(value)
+        return avoid
+
+    def avoid_sets(self, model: str, window: int = 1) -> Dict[str, Set[str]]:
+        """Valores a evitar por componente según las últimas `window` selecciones."""
+        return self._avoid_from(self.recent(model, window))
+
+    def select_and_record(self, model: str, window: int,
+                          choose: Callable[[Dict[str, Set[str]]], Tuple[Any, dict]],
+                          reset: bool = False) -> Any:
+        """
+        Elige una selección evitando las últimas `window` y la registra.
+
+        Las subclases lo hacen atómico, para que dos procesos o hilos que generan
+        prompts del mismo modelo a la vez no elijan lo mismo; esta versión base no lo es.
+
+        Args:
+            model: Modelo del historial
+            window: Cuántas selecciones anteriores evitar
+            choose: Recibe los valores a evitar y devuelve (resultado, selección)
+            reset: Vaciar el historial del modelo en lugar de registrar la selección
+
+        Returns:
+            El resultado devuelto por `choose`
+        """
+        result, selection = choose(self.avoid_sets(model, window))
+        if reset:
+            self.clear(model)
+        else:
+            self.record(model, selection)
+        return result
+
+
+class InMemoryPromptHistory(PromptHistoryStore):
+    """Historial en memoria del proceso (seguro entre hilos)."""
+
+    def __init__(self, max_depth: int = 10):
+        """
+        Args:
+            max_depth: Selecciones guardadas por modelo (tope de la ventana de evitación)
+        """
+        self.max_depth = max_depth
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def recent(self, model: str, limit: int = 1) -> List[dict]:
+        with self._lock:
+            return list(self._history.get(model, ()))[:limit]
+
+    def record(self, model: str, selection: dict) -> None:
+        with self._lock:
+            history = self._history.setdefault(model, deque(maxlen=self.max_depth))
+            history.appendleft(dict(selection))
+
+    def clear(self, model: str) -> None:
+        with self._lock:
+            self._history.pop(model, None)
+
+    def select_and_record(self, model: str, window: int,
+                          choose: Callable[[Dict[str, Set[str]]], Tuple[Any, dict]],
+                          reset: bool = False) -> Any:
+        with self._lock:
+            history = self._history.setdefault(model, deque(maxlen=self.max_depth))
+            result, selection = choose(self._avoid_from(list(history)[:window]))
+            if reset:
+                self._history.pop(model, None)
+            else:
+                history.appendleft(dict(selection))
+            return result
+
+
+class SQLitePromptHistory(PromptHistoryStore):
+    """
+    Historial en un único archivo SQLite en modo WAL.
+
+    Cada hilo usa su propia conexión y cada escritura es una transacción, así que
+    varios procesos o hilos pueden generar prompts del mismo modelo a la vez.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, max_depth: int = 10):
+        """
+        Args:
+            path: Ruta del archivo SQLite (se crea si no existe)
+            max_depth: Selecciones guardadas por modelo (tope de la ventana de evitación)
+        """
+        self.path = os.path.normpath(path)
+        self.max_depth = max_depth
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_history ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " model TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " selection TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_prompt_history_model ON prompt_history (model, id)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def recent(self, model: str, limit: int = 1) -> List[dict]:
+        rows = self._connection().execute(
+            "SELECT selection FROM prompt_history WHERE model = ? ORDER BY id DESC LIMIT ?",
+            (model, limit),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _insert(self, conn: sqlite3.Connection, model: str, selection: dict) -> None:
+        conn.execute(
+            "INSERT INTO prompt_history (model, created_at, selection) VALUES (?, ?, ?)",
+            (model, time.time(), json.dumps(selection)),
+        )
+        # Conservar solo las últimas max_depth selecciones del modelo
+        conn.execute(
+            "DELETE FROM prompt_history WHERE model = ? AND id NOT IN ("
+            " SELECT id FROM prompt_history WHERE model = ? ORDER BY id DESC LIMIT ?)",
+            (model, model, self.max_depth),
+        )
+
+    def record(self, model: str, selection: dict) -> None:
+        with self._connection() as conn:
+            self._insert(conn, model, selection)
+
+    def clear(self, model: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM prompt_history WHERE model = ?", (model,))
+
+    def select_and_record(self, model: str, window: int,
+                          choose: Callable[[Dict[str, Set[str]]], Tuple[Any, dict]],
+                          reset: bool = False) -> Any:
+        conn = self._connection()
+        # BEGIN IMMEDIATE toma el bloqueo de escritura antes de leer: quien llegue
+        # después ve ya registrada esta selección
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT selection FROM prompt_history WHERE model = ? ORDER BY id DESC LIMIT ?",
+                (model, window),
+            ).fetchall()
+            result, selection = choose(self._avoid_from([json.loads(row[0]) for row in rows]))
+            if reset:
+                conn.execute("DELETE FROM prompt_history WHERE model = ?", (model,))
+            else:
+                self._insert(conn, model, selection)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return result
+
+
+_default_history = None
+_default_history_lock = threading.Lock()
+
+
+def default_prompt_history() -> PromptHistoryStore:
+    """Historial compartido por defecto (SQLite en src/data/temp/prompt_history.sqlite)."""
+    global _default_history
+    if _default_history is None:
+        with _default_history_lock:
+            if _default_history is None:
+                _default_history = SQLitePromptHistory()
+    return _default_history
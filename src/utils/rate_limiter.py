@@ -0,0 +1,172 @@
+import re
+import time
+import random
+import threading
+from typing import Callable, Optional
+
+from src.utils.metrics import instrumentacion
+from src.utils.logging_config import obtener_logger
+
+logger = obtener_logger(__name__)
+
+# Códigos HTTP que indican un problema transitorio (throttling o error del servidor)
+ESTADOS_REINTENTABLES = (408, 429, 500, 502, 503, 504)
+
+
+class LimitadorTokens:
+    """
+    Cubeta de tokens segura entre hilos.
+
+    Se rellena a `tasa` tokens por segundo hasta `capacidad`; cada llamada a la
+    API consume un token y espera si no hay disponibles.
+    """
+
+    def __init__(self, tasa: float, capacidad: Optional[float] = None):
+        """
+        Args:
+            tasa: Tokens por segundo (llamadas sostenidas por segundo)
+            capacidad: Ráfaga máxima (por defecto igual a `tasa`)
+        """
+        self.tasa = tasa
+        self.capacidad = capacidad if capacidad is not None else max(tasa, 1)
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _rellenar(self) -> None:
+        """Suma los tokens generados desde el último cálculo (llamar con el lock tomado)."""
+        ahora = time.monotonic()
+        self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def adquirir(self, tokens: float = 1) -> float:
+        """
+        Consume `tokens`, esperando lo necesario.
+
+        Returns:
+            Segundos esperados
+        """
+        esperado = 0.0
+        while True:
+            with self._lock:
+                self._rellenar()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return esperado
+                espera = (tokens - self._tokens) / self.tasa
+
+            time.sleep(espera)
+            esperado += espera
+
+    def penalizar(self, segundos: float) -> None:
+        """Vacía la cubeta para que nadie llame durante `segundos` (ej: tras un 429)."""
+        with self._lock:
+            # Rellenar antes: si no, el tiempo previo se acreditaría después y acortaría la pausa
+            self._rellenar()
+            self._tokens = min(self._tokens, -segundos * self.tasa)
+
+
+# Límites compartidos por todas las instancias de GeneradorImagenes del proceso.
+# Replicate permite ~600 creaciones/min y ~3000 consultas/min por cuenta.
+limitador_creacion = LimitadorTokens(tasa=600 / 60)
+limitador_consulta = LimitadorTokens(tasa=3000 / 60)
+
+
+def estado_http(error: Exception) -> Optional[int]:
+    """Código HTTP asociado a una excepción de replicate/httpx/requests, si lo hay."""
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def segundos_retry_after(error: Exception) -> Optional[float]:
+    """Obtiene el Retry-After de la respuesta o del detalle del error, si existe."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    valor = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if valor:
+        try:
+            return float(valor)
+        except ValueError:
+            pass
+
+    # Replicate describe el throttling en el detalle: "... Expected available in 5 seconds."
+    detalle = str(getattr(error, "detail", "") or "")
+    coincidencia = re.search(r"available in (\d+(?:\.\d+)?) second", detalle)
+    if coincidencia:
+        return float(coincidencia.group(1))
+    return None
+
+
+def es_reintentable(error: Exception) -> bool:
+    """Distingue errores transitorios (red, throttling, 5xx) de errores definitivos."""
+    status = estado_http(error)
+    if status is not None:
+        return status in ESTADOS_REINTENTABLES
+
+    import httpx
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def es_reintentable_sin_envio(error: Exception) -> bool:
+    """
+    Errores tras los que es seguro repetir una llamada no idempotente (ej: crear una
+    predicción): un 429, o un fallo de conexión anterior a enviar la petición. Tras
+    un timeout de lectura o un 5xx el servidor pudo haberla aceptado ya.
+    """
+    status = estado_http(error)
+    if status is not None:
+        return status == 429
+
+    import httpx
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, ConnectionRefusedError))
+
+
+def llamar_con_reintentos(funcion: Callable,
+                          *args,
+                          limitador: Optional[LimitadorTokens] = None,
+                          reintentos: int = 5,
+                          espera_base: float = 1.0,
+                          espera_maxima: float = 60.0,
+                          reintentable: Callable[[Exception], bool] = es_reintentable,
+                          limite: Optional[float] = None,
+                          **kwargs):
+    """
+    Llama a `funcion` respetando el limitador y reintentando los errores transitorios.
+
+    Usa backoff exponencial con jitter y respeta Retry-After; los errores no
+    reintentables se propagan de inmediato.
+
+    Args:
+        reintentable: Decide qué errores se reintentan (es_reintentable_sin_envio
+            para llamadas no idempotentes)
+        limite: Instante (time.monotonic) a partir del cual no se reintenta más
+    """
+    for intento in range(reintentos + 1):
+        if limitador is not None:
+            limitador.adquirir()
+        try:
+            return funcion(*args, **kwargs)
+        except Exception as e:
+            if intento >= reintentos or not reintentable(e):
+                raise
+
+            espera = segundos_retry_after(e)
+            penalizado = False
+            if espera is None:
+                espera = min(espera_maxima, espera_base * 2 ** intento) * random.uniform(0.5, 1.0)
+            elif limitador is not None and estado_http(e) == 429:
+                # La espera la hace limitador.adquirir() en el siguiente intento (y la respetan
+                # los demás hilos); dormir aquí además la duplicaría
+                limitador.penalizar(espera)
+                penalizado = True
+
+            if limite is not None and time.monotonic() + espera >= limite:
+                raise
+
+            instrumentacion.contar("reintentos", operacion=getattr(funcion, "__name__", "llamada"))
+            logger.warning(f"   ⚠️ Reintentando en {espera:.1f}s ({intento + 1}/{reintentos}): {e}")
+            if not penalizado:
+                time.sleep(espera)
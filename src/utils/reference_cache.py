@@ -0,0 +1,178 @@
+import io
+import os
+import base64
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Firmas de archivo (ruta, tamaño, mtime) cuyo hash se recuerda
+MAX_HASHES = 4096
+
+
+def hash_archivo(ruta: str, tamano_bloque: int = 1024 * 1024) -> str:
+    """Calcula el SHA-256 del contenido de un archivo."""
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class CacheReferencias:
+    """
+    Prepara imágenes de referencia una sola vez (reducción + recompresión + base64)
+    y guarda el data URL resultante en una caché LRU limitada por memoria.
+
+    La clave es el hash del contenido del archivo junto con los límites de tamaño,
+    así que la misma referencia usada desde rutas distintas se codifica una vez.
+    """
+
+    def __init__(self,
+                 lado_maximo: Optional[int] = None,
+                 bytes_maximos: Optional[int] = None,
+                 memoria_maxima: int = 64 * 1024 * 1024,
+                 calidad_jpeg: int = 90):
+        """
+        Args:
+            lado_maximo: Lado mayor máximo en píxeles (None para no reducir; ej: 1536)
+            bytes_maximos: Tamaño máximo del archivo codificado (None para no limitar)
+            memoria_maxima: Memoria máxima ocupada por los data URLs en caché
+            calidad_jpeg: Calidad inicial al recomprimir imágenes sin transparencia
+        """
+        self.lado_maximo = lado_maximo
+        self.bytes_maximos = bytes_maximos
+        self.memoria_maxima = memoria_maxima
+        self.calidad_jpeg = calidad_jpeg
+        self._entradas = OrderedDict()
+        self._memoria_usada = 0
+        self._hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hash_referencia(self, ruta: str) -> str:
+        """Hash del contenido, reutilizado mientras el archivo no cambie (ruta, tamaño, mtime)."""
+        stat = os.stat(ruta)
+        firma = (os.path.abspath(ruta), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            hash_contenido = self._hashes.get(firma)
+            if hash_contenido is not None:
+                self._hashes.move_to_end(firma)
+                return hash_contenido
+
+        # El hash se calcula fuera del lock para no bloquear a los demás hilos
+        hash_contenido = hash_archivo(ruta)
+        with self._lock:
+            self._hashes[firma] = hash_contenido
+            if len(self._hashes) > MAX_HASHES:
+                self._hashes.popitem(last=False)
+        return hash_contenido
+
+    def preparar(self, ruta: str) -> str:
+        """
+        Devuelve el data URL de la referencia, preparándolo solo si no está en caché.
+
+        Args:
+            ruta: Ruta al archivo de imagen de referencia
+
+        Returns:
+            Data URL en formato base64
+        """
+        clave = (self.hash_referencia(ruta), self.lado_maximo, self.bytes_maximos)
+
+        with self._lock:
+            data_url = self._entradas.get(clave)
+            if data_url is not None:
+                self._entradas.move_to_end(clave)
+                return data_url
+
+        data_url = self._codificar(ruta)
+
+        with self._lock:
+            if clave not in self._entradas:
+                self._entradas[clave] = data_url
+                self._memoria_usada += len(data_url)
+                while self._memoria_usada > self.memoria_maxima and len(self._entradas) > 1:
+                    _, expulsado = self._entradas.popitem(last=False)
+                    self._memoria_usada -= len(expulsado)
+        return data_url
+
+    def limpiar(self) -> None:
+        """Vacía la caché."""
+        with self._lock:
+            self._entradas.clear()
+            self._hashes.clear()
+            self._memoria_usada = 0
+
+    def contenido_reducido(self, ruta: str):
+        """
+        Lee la referencia y le aplica los límites de lado y de bytes (sin base64).
+
+        Returns:
+            Tupla (contenido, mime_type)
+        """
+        with open(ruta, 'rb') as f:
+            contenido = f.read()
+
+        mime_type, _ = mimetypes.guess_type(ruta)
+        mime_type = mime_type or "image/png"
+
+        return self._reducir(contenido, mime_type)
+
+    def _codificar(self, ruta: str) -> str:
+        """Reduce y recomprime la imagen si hace falta y la codifica como data URL."""
+        contenido, mime_type = self.contenido_reducido(ruta)
+        return f"data:{mime_type};base64,{base64.b64encode(contenido).decode('utf-8')}"
+
+    def _reducir(self, contenido: bytes, mime_type: str):
+        """Aplica los límites de lado y de bytes; devuelve el contenido original si ya los cumple."""
+        if self.lado_maximo is None and self.bytes_maximos is None:
+            return contenido, mime_type
+
+        from PIL import Image
+
+        img = Image.open(io.BytesIO(contenido))
+        excede_lado = self.lado_maximo is not None and max(img.size) > self.lado_maximo
+        excede_bytes = self.bytes_maximos is not None and len(contenido) > self.bytes_maximos
+        if not excede_lado and not excede_bytes:
+            return contenido, mime_type
+
+        if img.mode == "P":
+            img = img.convert("RGBA")
+        tiene_alfa = img.mode in ("RGBA", "LA")
+
+        if excede_lado:
+            if img.format == "JPEG":
+                img.draft("RGB", (self.lado_maximo, self.lado_maximo))
+            img.thumbnail((self.lado_maximo, self.lado_maximo), Image.LANCZOS)
+
+        calidad = self.calidad_jpeg
+        while True:
+            buffer = io.BytesIO()
+            if tiene_alfa:
+                img.save(buffer, format="PNG", optimize=True)
+                nuevo_mime = "image/png"
+            else:
+                img.convert("RGB").save(buffer, format="JPEG", quality=calidad, optimize=True)
+                nuevo_mime = "image/jpeg"
+
+            datos = buffer.getvalue()
+            if self.bytes_maximos is None or len(datos) <= self.bytes_maximos:
+                return datos, nuevo_mime
+
+            # Aún excede el límite: bajar calidad primero y luego resolución
+            if not tiene_alfa and calidad > 60:
+                calidad -= 10
+            elif min(img.size) > 64:
+                img = img.resize((int(img.width * 0.8), int(img.height * 0.8)), Image.LANCZOS)
+            else:
+                return datos, nuevo_mime
+
+
+# Caché compartida por todas las instancias de GeneradorImagenes del proceso
+cache_referencias = CacheReferencias()
+
+
+def preparar_referencia(ruta: str) -> str:
+    """Devuelve el data URL de una referencia local usando la caché compartida."""
+    return cache_referencias.preparar(ruta)
@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+from urllib.parse import urlparse
+
+from src.utils.download_utils import obtener_sesion, ruta_temporal_unica
+from src.utils.metrics import instrumentacion
+from src.utils.logging_config import configurar_logging, obtener_logger
+
+logger = obtener_logger(__name__)
+
+DIRECTORIO_ESPEJO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache", "referencias")
+
+# Estados de cada URL tras sincronizar
+ESTADO_DESCARGADA = "descargada"
+ESTADO_SIN_CAMBIOS = "sin_cambios"
+ESTADO_FALLIDA = "fallida"
+
+
+class EspejoReferencias:
+    """
+    Copia local de las imágenes de referencia del catálogo.
+
+    Los archivos se guardan direccionados por contenido (`<sha256[:2]>/<sha256><ext>`),
+    así que la misma imagen publicada en varias URLs ocupa disco una sola vez. El
+    índice (`indice.json`) guarda para cada URL su archivo, ETag y Last-Modified;
+    en las siguientes ejecuciones se piden con If-None-Match / If-Modified-Since y
+    un 304 evita volver a descargar la imagen.
+    """
+
+    def __init__(self,
+                 directorio: str = DIRECTORIO_ESPEJO,
+                 concurrencia: int = 16,
+                 timeout: float = 60,
+                 reintentos: int = 2):
+        """
+        Args:
+            directorio: Carpeta del espejo (archivos + indice.json)
+            concurrencia: Descargas simultáneas
+            timeout: Timeout de conexión/lectura en segundos
+            reintentos: Reintentos por URL tras el primer intento
+        """
+        self.directorio = os.path.normpath(directorio)
+        self.concurrencia = concurrencia
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.ruta_indice = os.path.join(self.directorio, "indice.json")
+        self._lock = threading.Lock()
+
+        try:
+            with open(self.ruta_indice, "r", encoding="utf-8") as f:
+                self._indice = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._indice = {}
+
+    def ruta_local(self, url: str) -> Optional[str]:
+        """Ruta del archivo espejado de `url`, o None si no está en el espejo."""
+        with self._lock:
+            entrada = self._indice.get(url)
+        if entrada:
+            ruta = os.path.join(self.directorio, entrada["archivo"])
+            if os.path.exists(ruta):
+                return ruta
+        return None
+
+    def _guardar_indice(self) -> None:
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._lock:
+            datos = json.dumps(self._indice, indent=2, sort_keys=True)
+        temporal = ruta_temporal_unica(self.ruta_indice)
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(datos)
+        os.replace(temporal, self.ruta_indice)
+
+    @staticmethod
+    def _extension(url: str, content_type: Optional[str]) -> str:
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        if extension:
+            return extension
+        if content_type:
+            return mimetypes.guess_extension(content_type.split(";")[0].strip()) or ""
+        return ""
+
+    def _descargar(self, url: str, entrada: Optional[dict]) -> dict:
+        """Una petición (condicional si ya hay copia) y, si hay contenido nuevo, lo guarda."""
+        headers = {}
+        if entrada and self.ruta_local(url):
+            if entrada.get("etag"):
+                headers["If-None-Match"] = entrada["etag"]
+            if entrada.get("last_modified"):
+                headers["If-Modified-Since"] = entrada["last_modified"]
+
+        with obtener_sesion().get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                return {"estado": ESTADO_SIN_CAMBIOS, "entrada": entrada}
+            response.raise_for_status()
+
+            os.makedirs(self.directorio, exist_ok=True)
+            # Único por descarga: varios procesos `mirror` pueden compartir el directorio
+            temporal = ruta_temporal_unica(os.path.join(self.directorio, ".descarga"))
+            sha = hashlib.sha256()
+            transferidos = 0
+            try:
+                with open(temporal, "wb") as f:
+                    for bloque in response.iter_content(chunk_size=64 * 1024):
+                        if bloque:
+                            f.write(bloque)
+                            sha.update(bloque)
+                            transferidos += len(bloque)
+
+                digest = sha.hexdigest()
+                archivo = os.path.join(digest[:2], digest + self._extension(url, response.headers.get("Content-Type")))
+                ruta = os.path.join(self.directorio, archivo)
+                if not os.path.exists(ruta):
+                    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                    os.replace(temporal, ruta)
+            finally:
+                instrumentacion.contar("bytes_descargados", transferidos)
+                # Si la descarga se cortó, o el contenido ya estaba en el espejo
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+
+            nueva_entrada = {
+                "archivo": archivo,
+                "sha256": digest,
+                "bytes": transferidos,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "actualizado": time.time(),
+            }
+            cambio = not entrada or entrada.get("sha256") != digest
+            return {"estado": ESTADO_DESCARGADA if cambio else ESTADO_SIN_CAMBIOS, "entrada": nueva_entrada}
+
+    def sincronizar_url(self, url: str) -> dict:
+        """
+        Trae `url` al espejo si cambió o no está.
+
+        Returns:
+            {"url", "estado" (descargada / sin_cambios / fallida), "ruta", "error"}
+        """
+        with self._lock:
+            entrada = self._indice.get(url)
+
+        ultimo_error = None
+        for intento in range(self.reintentos + 1):
+            try:
+                resultado = self._descargar(url, entrada)
+                with self._lock:
+                    self._indice[url] = resultado["entrada"]
+                return {"url": url, "estado": resultado["estado"], "ruta": self.ruta_local(url), "error": None}
+            except Exception as e:
+                ultimo_error = e
+                if intento < self.reintentos:
+                    instrumentacion.contar("reintentos", operacion="espejo")
+                    time.sleep(min(2 ** intento, 10))
+
+        logger.warning(f"⚠️ No se pudo espejar {url}: {ultimo_error}")
+        # Si había una copia anterior se sigue usando
+        return {"url": url, "estado": ESTADO_FALLIDA, "ruta": self.ruta_local(url), "error": str(ultimo_error)}
+
+    def sincronizar(self, urls: Iterable[str]) -> dict:
+        """
+        Sincroniza todas las URLs en paralelo y guarda el índice.
+
+        Returns:
+            Conteo por estado, duración y el resultado de cada URL
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        inicio = time.perf_counter()
+        logger.info(f"🪞 Espejando {len(urls)} referencias con concurrencia {self.concurrencia}")
+
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as executor:
+            resultados = list(executor.map(self.sincronizar_url, urls))
+        self._guardar_indice()
+
+        resumen = {ESTADO_DESCARGADA: 0, ESTADO_SIN_CAMBIOS: 0, ESTADO_FALLIDA: 0}
+        for resultado in resultados:
+            resumen[resultado["estado"]] += 1
+        resumen["duracion"] = time.perf_counter() - inicio
+        resumen["urls"] = {resultado["url"]: resultado for resultado in resultados}
+
+        logger.info(f"✅ Espejo listo: {resumen[ESTADO_DESCARGADA]} descargadas, "
+                    f"{resumen[ESTADO_SIN_CAMBIOS]} sin cambios, {resumen[ESTADO_FALLIDA]} fallidas "
+                    f"en {resumen['duracion']:.1f}s")
+        return resumen
+
+
+def espejar_catalogo(ruta_catalogo: Optional[str] = None,
+                     directorio: str = DIRECTORIO_ESPEJO,
+                     concurrencia: int = 16,
+                     disponibilidad: Optional[Iterable[str]] = None,
+                     tipos: Optional[Iterable[str]] = None) -> dict:
+    """Espeja el `image_link` de todas las publicaciones del catálogo que pasan los filtros."""
+    from src.utils.catalog import RUTA_CATALOGO, leer_catalogo
+
+    publicaciones = leer_catalogo(ruta_catalogo or RUTA_CATALOGO, disponibilidad, tipos)
+    return EspejoReferencias(directorio, concurrencia).sincronizar(p.image_link for p in publicaciones)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Espejo local de las imágenes de referencia del catálogo")
+    parser.add_argument("--catalogo", help="CSV del catálogo (por defecto src/data/df_publications_image.csv)")
+    parser.add_argument("--directorio", default=DIRECTORIO_ESPEJO, help="Carpeta del espejo")
+    parser.add_argument("--concurrencia", type=int, default=16, help="Descargas simultáneas")
+    parser.add_argument("--disponibilidad", nargs="+", help="Valores de availability a incluir")
+    parser.add_argument("--tipos", nargs="+", help="Valores de type a incluir")
+    parser.add_argument("--silencioso", action="store_true", help="Mostrar solo advertencias y errores")
+    args = parser.parse_args(argv)
+
+    configurar_logging(silencioso=args.silencioso)
+    resumen = espejar_catalogo(args.catalogo, args.directorio, args.concurrencia, args.disponibilidad, args.tipos)
+    return 1 if resumen[ESTADO_FALLIDA] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import io
+import os
+import json
+import time
+import mimetypes
+import threading
+from typing import Optional
+
+from src.utils.metrics import instrumentacion, parsear_fecha_iso
+from src.utils.rate_limiter import limitador_creacion, llamar_con_reintentos, estado_http
+from src.utils.reference_cache import CacheReferencias, cache_referencias as cache_referencias_compartida
+from src.utils.logging_config import obtener_logger
+
+logger = obtener_logger(__name__)
+
+RUTA_INDICE_SUBIDAS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache", "referencias_subidas.json"
+)
+
+# Replicate borra los archivos subidos a las 24 h; se renuevan con una hora de margen
+VIGENCIA_SUBIDA = 23 * 3600
+
+# Respuestas que indican que el proveedor no ofrece subida de archivos
+ESTADOS_SIN_SUBIDAS = (404, 405, 501)
+
+# Locks por referencia (repartidos por hash de la clave, para no crecer sin límite)
+NUM_LOCKS_CLAVE = 64
+
+# Un lock por archivo de índice, compartido por todas las instancias del proceso
+_locks_indice = {}
+_locks_indice_lock = threading.Lock()
+
+
+def _lock_indice(ruta: str) -> threading.Lock:
+    with _locks_indice_lock:
+        return _locks_indice.setdefault(ruta, threading.Lock())
+
+
+class SubidasReferencias:
+    """
+    Sube cada referencia distinta una sola vez al endpoint de archivos del
+    proveedor y reutiliza la URL devuelta en las predicciones siguientes.
+
+    La clave es el hash del contenido más los límites de la CacheReferencias y
+    el destino (URL base de la API), así que la misma referencia desde rutas
+    distintas se sube una vez. Las URLs caducan según `expires_at` del archivo
+    (o `vigencia`) y el índice se guarda en disco para reutilizarlas entre
+    ejecuciones. Si la subida no está disponible se usa el data URL de siempre.
+
+    Varias instancias pueden compartir el mismo índice: al escribir se fusiona
+    con lo que ya hay en disco en lugar de sobrescribirlo.
+    """
+
+    def __init__(self,
+                 cache_referencias: Optional[CacheReferencias] = None,
+                 ruta_indice: Optional[str] = RUTA_INDICE_SUBIDAS,
+                 vigencia: float = VIGENCIA_SUBIDA):
+        """
+        Args:
+            cache_referencias: Caché que reduce las referencias antes de subirlas
+                y prepara el data URL de respaldo (por defecto la compartida)
+            ruta_indice: JSON donde persistir las URLs subidas (None para solo memoria)
+            vigencia: Segundos máximos que se reutiliza una URL subida
+        """
+        self.cache_referencias = cache_referencias or cache_referencias_compartida
+        self.ruta_indice = os.path.normpath(ruta_indice) if ruta_indice else None
+        self.vigencia = vigencia
+        self._indice = self._cargar_indice()
+        self._sin_subidas = set()
+        self._lock = threading.Lock()
+        self._locks_clave = [threading.Lock() for _ in range(NUM_LOCKS_CLAVE)]
+
+    def _cargar_indice(self) -> dict:
+        if not self.ruta_indice:
+            return {}
+        try:
+            with open(self.ruta_indice, "r", encoding="utf-8") as f:
+                indice = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        ahora = time.time()
+        return {clave: entrada for clave, entrada in indice.items() if entrada.get("expira", 0) > ahora}
+
+    def _fusionar(self, indice: dict) -> None:
+        """Incorpora entradas de otro índice, quedándose con la que caduca más tarde."""
+        with self._lock:
+            for clave, entrada in indice.items():
+                actual = self._indice.get(clave)
+                if actual is None or entrada["expira"] > actual["expira"]:
+                    self._indice[clave] = entrada
+
+    def _guardar_indice(self, fusionar: bool = True) -> None:
+        """
+        Escribe el índice a un temporal y lo mueve para no dejarlo a medias.
+
+        Args:
+            fusionar: Añadir antes lo que otras instancias hayan escrito en disco
+        """
+        if not self.ruta_indice:
+            return
+        os.makedirs(os.path.dirname(self.ruta_indice), exist_ok=True)
+        with _lock_indice(self.ruta_indice):
+            if fusionar:
+                self._fusionar(self._cargar_indice())
+            with self._lock:
+                datos = json.dumps(self._indice, indent=2)
+            temporal = f"{self.ruta_indice}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                f.write(datos)
+            os.replace(temporal, self.ruta_indice)
+
+    def _clave(self, hash_contenido: str, destino: str) -> str:
+        cache = self.cache_referencias
+        return f"{destino}|{hash_contenido}|{cache.lado_maximo}|{cache.bytes_maximos}"
+
+    def _vigente(self, clave: str) -> Optional[str]:
+        with self._lock:
+            entrada = self._indice.get(clave)
+        if entrada and entrada["expira"] > time.time():
+            return entrada["url"]
+        return None
+
+    def url_referencia(self, client, ruta: str, destino: str = "replicate") -> str:
+        """
+        Devuelve una URL utilizable como `image_input` para una referencia local.
+
+        Args:
+            client: replicate.Client con el que subir el archivo
+            ruta: Ruta al archivo de imagen de referencia
+            destino: Identificador de la API (ej: su URL base) para no mezclar subidas
+
+        Returns:
+            URL del archivo subido, o data URL si la subida no está disponible
+        """
+        if destino in self._sin_subidas:
+            return self.cache_referencias.preparar(ruta)
+
+        hash_contenido = self.cache_referencias.hash_referencia(ruta)
+        clave = self._clave(hash_contenido, destino)
+        url = self._vigente(clave)
+        if url:
+            return url
+
+        # Un lock por referencia: los envíos concurrentes de la misma esperan a una sola subida
+        lock_clave = self._locks_clave[hash(clave) % NUM_LOCKS_CLAVE]
+
+        with lock_clave:
+            url = self._vigente(clave)
+            if url:
+                return url
+            # Otra instancia (u otro proceso) puede haberla subido ya
+            self._fusionar(self._cargar_indice())
+            url = self._vigente(clave)
+            if url:
+                return url
+            if destino in self._sin_subidas:
+                return self.cache_referencias.preparar(ruta)
+
+            contenido, mime_type = self.cache_referencias.contenido_reducido(ruta)
+            extension = mimetypes.guess_extension(mime_type) or ""
+            nombre = f"{hash_contenido[:16]}{extension}"
+            try:
+                # Un BytesIO nuevo por intento: un intento fallido deja el anterior leído
+                archivo = llamar_con_reintentos(
+                    lambda: client.files.create(io.BytesIO(contenido), filename=nombre, content_type=mime_type),
+                    limitador=limitador_creacion,
+                )
+            except Exception as e:
+                if estado_http(e) in ESTADOS_SIN_SUBIDAS:
+                    self._sin_subidas.add(destino)
+                instrumentacion.contar("subidas_fallidas")
+                logger.warning(f"⚠️ No se pudo subir la referencia, se envía como data URL: {e}")
+                return self.cache_referencias.preparar(ruta)
+
+            expira = time.time() + self.vigencia
+            expira_remoto = parsear_fecha_iso(getattr(archivo, "expires_at", None))
+            if expira_remoto is not None:
+                expira = min(expira, expira_remoto - 60)
+
+            with self._lock:
+                self._indice[clave] = {"url": archivo.urls["get"], "expira": expira, "bytes": len(contenido)}
+            self._guardar_indice()
+
+        instrumentacion.contar("bytes_subidos", len(contenido))
+        logger.info(f"☁️ Referencia subida una vez ({len(contenido) // 1024} KB): {archivo.urls['get']}")
+        return archivo.urls["get"]
+
+    def limpiar(self) -> None:
+        """Olvida todas las URLs subidas (se volverán a subir al usarlas)."""
+        with self._lock:
+            self._indice.clear()
+            self._sin_subidas.clear()
+        self._guardar_indice(fusionar=False)
+
+
+# Subidas compartidas por todas las instancias de GeneradorImagenes del proceso
+subidas_referencias = SubidasReferencias()
@@ -1,30 +1,226 @@
 import time
-import replicate
+import random
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+from src.utils.rate_limiter import es_reintentable, limitador_consulta, limitador_creacion, llamar_con_reintentos
+from src.utils.logging_config import obtener_logger
 
-def esperar_completado(client: replicate.Client, prediction_id: str, intervalo: int = 10) -> dict:
-    """Espera a que la predicción se complete."""
-    print("⏳ Esperando generación...")
+if TYPE_CHECKING:
+    import replicate
 
+logger = obtener_logger(__name__)
+
+ESTADOS_FINALES = ("succeeded", "failed", "canceled")
+
+
+class TiempoAgotadoError(RuntimeError):
+    """La predicción no terminó dentro del plazo; puede seguir en curso en Replicate."""
+
+
+def intervalos_sondeo(intervalo_inicial: float = 1.0,
+                      intervalo_maximo: float = 10.0,
+                      factor: float = 2.0,
+                      jitter: float = 0.2) -> Iterator[float]:
+    """
+    Genera los intervalos de espera entre consultas: un primer intervalo corto
+    y luego crecimiento exponencial con jitter, limitado a `intervalo_maximo`.
+    """
+    intervalo = intervalo_inicial
     while True:
+        variacion = intervalo * jitter
+        yield max(0.0, min(intervalo_maximo, intervalo + random.uniform(-variacion, variacion)))
+        intervalo = min(intervalo_maximo, intervalo * factor)
+
+
+def _resultado_prediccion(prediction) -> dict:
+    """Convierte una predicción terminada con éxito al diccionario de resultado."""
+    campos = ("id", "status", "output", "created_at", "started_at", "completed_at")
+    if isinstance(prediction, dict):
+        return {campo: prediction.get(campo) for campo in campos}
+    return {campo: getattr(prediction, campo, None) for campo in campos}
+
+
+def _verificar_estado(prediction) -> Optional[dict]:
+    """Devuelve el resultado si la predicción terminó bien, lanza si falló y None si sigue en curso."""
+    if isinstance(prediction, dict):
+        status = prediction.get("status")
+        error = prediction.get("error")
+    else:
+        status = prediction.status
+        error = getattr(prediction, 'error', None)
+
+    if status == "succeeded":
+        return _resultado_prediccion(prediction)
+
+    if status in ("failed", "canceled"):
+        raise RuntimeError(f"Generación {status}: {error or 'Error desconocido'}")
+
+    return None
+
+
+def consultar_prediccion(client: "replicate.Client", prediction_id: str, limite: Optional[float] = None):
+    """
+    Consulta una predicción con el limitador de consultas compartido y reintentos.
+
+    Args:
+        limite: Instante (time.monotonic) del plazo del llamador; no se reintenta más allá
+    """
+    return llamar_con_reintentos(client.predictions.get, prediction_id, limitador=limitador_consulta,
+                                 limite=limite)
+
+
+def cancelar_prediccion(client: "replicate.Client", prediction_id: str) -> bool:
+    """
+    Cancela una predicción en Replicate para no seguir pagando por ella.
+
+    Returns:
+        True si se pudo cancelar; los errores solo se informan
+    """
+    try:
+        llamar_con_reintentos(client.predictions.cancel, prediction_id, limitador=limitador_creacion, reintentos=2)
+        logger.info(f"🛑 Predicción cancelada: {prediction_id}")
+        return True
+    except Exception as e:
+        logger.warning(f"   ⚠️ No se pudo cancelar la predicción {prediction_id}: {e}")
+        return False
+
+
+def _manejar_error_consulta(error: Exception) -> None:
+    """Propaga los errores definitivos; los transitorios solo se informan."""
+    if isinstance(error, RuntimeError) or not es_reintentable(error):
+        raise RuntimeError(f"Error consultando estado: {error}") from error
+    logger.warning(f"   ⚠️ Error consultando estado: {error}")
+
+
+def esperar_por_sondeo(client: "replicate.Client",
+                       prediction_id: str,
+                       intervalo_inicial: float = 1.0,
+                       intervalo_maximo: float = 10.0,
+                       timeout: Optional[float] = None) -> dict:
+    """Espera la predicción consultando su estado con backoff exponencial."""
+    limite = None if timeout is None else time.monotonic() + timeout
+
+    for intervalo in intervalos_sondeo(intervalo_inicial, intervalo_maximo):
         try:
-            prediction = replicate.predictions.get(prediction_id)
-            status = prediction.status
+            prediction = consultar_prediccion(client, prediction_id, limite)
+        except Exception as e:
+            _manejar_error_consulta(e)
+        else:
+            resultado = _verificar_estado(prediction)
+            if resultado:
+                return resultado
+            logger.info(f"   Estado: {prediction.status}...")
+
+        if limite is not None:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise TiempoAgotadoError(f"Tiempo de espera agotado ({timeout}s) para la predicción {prediction_id}")
+            intervalo = min(intervalo, restante)
+        time.sleep(intervalo)
+
+
+def esperar_primera(client: "replicate.Client",
+                    prediction_ids: List[str],
+                    intervalo_inicial: float = 1.0,
+                    intervalo_maximo: float = 10.0,
+                    timeout: Optional[float] = None) -> Tuple[str, dict]:
+    """
+    Espera varias predicciones equivalentes y devuelve la primera que termina bien.
+
+    Las que fallan se descartan mientras quede alguna en curso; si fallan todas
+    se propaga el último error.
+
+    Returns:
+        Tupla (prediction_id ganadora, resultado)
+    """
+    limite = None if timeout is None else time.monotonic() + timeout
+    pendientes = list(prediction_ids)
+    ultimo_error = None
+
+    for intervalo in intervalos_sondeo(intervalo_inicial, intervalo_maximo):
+        for prediction_id in list(pendientes):
+            try:
+                resultado = _verificar_estado(consultar_prediccion(client, prediction_id, limite))
+            except RuntimeError as e:
+                pendientes.remove(prediction_id)
+                ultimo_error = e
+                continue
+            except Exception as e:
+                _manejar_error_consulta(e)
+                continue
+            if resultado:
+                return prediction_id, resultado
+
+        if not pendientes:
+            raise ultimo_error
+
+        if limite is not None:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise TiempoAgotadoError(f"Tiempo de espera agotado ({timeout}s) para las predicciones "
+                                         f"{', '.join(pendientes)}")
+            intervalo = min(intervalo, restante)
+        time.sleep(intervalo)
 
-            if status == "succeeded":
-                return {
-                    "id": prediction.id,
-                    "status": status,
-                    "output": prediction.output
-                }
 
-            if status in ("failed", "canceled"):
-                error_msg = getattr(prediction, 'error', 'Error desconocido')
-                raise RuntimeError(f"Generación {status}: {error_msg}")
+def esperar_por_webhook(client: "replicate.Client",
+                        prediction_id: str,
+                        receptor,
+                        intervalo_maximo: float = 10.0,
+                        timeout: Optional[float] = None) -> dict:
+    """
+    Espera la predicción a través del receptor de webhooks.
 
-            print(f"   Estado: {status}...")
-            time.sleep(intervalo)
+    Si el webhook no llega en `intervalo_maximo` segundos se consulta el estado
+    una vez, por si la notificación se perdió.
+    """
+    limite = None if timeout is None else time.monotonic() + timeout
 
+    while True:
+        espera = intervalo_maximo
+        if limite is not None:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise TiempoAgotadoError(f"Tiempo de espera agotado ({timeout}s) para la predicción {prediction_id}")
+            espera = min(espera, restante)
+
+        payload = receptor.esperar(prediction_id, timeout=espera)
+        if payload:
+            return _verificar_estado(payload)
+
+        try:
+            prediction = consultar_prediccion(client, prediction_id, limite)
         except Exception as e:
-            if isinstance(e, RuntimeError):
-                raise
-            time.sleep(intervalo)
\ No newline at end of file
+            _manejar_error_consulta(e)
+        else:
+            resultado = _verificar_estado(prediction)
+            if resultado:
+                return resultado
+
+
+def esperar_completado(client: "replicate.Client",
+                       prediction_id: str,
+                       intervalo_inicial: float = 1.0,
+                       intervalo_maximo: float = 10.0,
+                       timeout: Optional[float] = None,
+                       receptor=None) -> dict:
+    """
+    Espera a que la predicción se complete.
+
+    Args:
+        client: Cliente de Replicate con el que se creó la predicción
+        prediction_id: ID de la predicción
+        intervalo_inicial: Espera antes de la segunda consulta (segundos)
+        intervalo_maximo: Tope del intervalo entre consultas (segundos)
+        timeout: Plazo máximo total de espera (segundos); None para no limitar
+        receptor: ReceptorWebhook opcional; si se da, se espera el webhook
+
+    Returns:
+        Diccionario con id, status, output y los timestamps (created_at,
+        started_at, completed_at) de la predicción
+    """
+    logger.info("⏳ Esperando generación...")
+
+    if receptor is not None:
+        return esperar_por_webhook(client, prediction_id, receptor, intervalo_maximo, timeout)
+
+    return esperar_por_sondeo(client, prediction_id, intervalo_inicial, intervalo_maximo, timeout)
@@ -1,23 +1,156 @@
 import os
-from PIL import Image
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from PIL import Image, ImageChops
+from src.utils.metrics import instrumentacion, ETAPA_RESIZE
+
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+# Lado máximo de la decodificación JPEG mínima con la que se estima el contenido
+TRIM_PROXY_SIZE = 256
+
+# Opciones de recorte con que se generó cada salida (modo incremental); fuera de las
+# carpetas de salida para no mezclarlas con las imágenes entregables
+TRIM_SIGNATURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache", "resize")
+
 
 class ResizeImage:
     @staticmethod
-    def resize_and_crop_transparent(image_path, output_path, target_width, target_height):
+    def _background_mask(pixels, background, tolerance, use_alpha):
+        """True en los píxeles RGB(A) que se consideran fondo (color cercano a `background` o transparentes)."""
+        # Canal a canal y en uint8: mucho más rápido que reducir sobre el último eje
+        mask = None
+        for channel, value in enumerate(background):
+            plane = pixels[..., channel]
+            near = (plane >= max(0, value - tolerance)) & (plane <= min(255, value + tolerance))
+            mask = near if mask is None else mask & near
+        if use_alpha and pixels.shape[2] == 4:
+            mask |= pixels[..., 3] <= tolerance
+        return mask
+
+    @staticmethod
+    def content_bbox(img, background=(255, 255, 255), tolerance=12, use_alpha=True):
         """
-        Redimensiona y recorta la imagen para llenar completamente el área objetivo, dejando el fondo transparente.
+        Caja (left, top, right, bottom) del contenido de una imagen RGB o RGBA, sin el fondo.
+
+        Se calcula sobre la imagen completa (una tabla por canal con Image.point y
+        getbbox, ambos en C), así que una línea de un píxel también cuenta como contenido.
+
+        Args:
+            img: Imagen RGB o RGBA (otros modos se convierten a RGBA)
+            background: Color RGB del fondo
+            tolerance: Diferencia máxima por canal (0-255) para considerar un píxel fondo;
+                absorbe el ruido de JPEG y los blancos no puros
+            use_alpha: Considerar fondo también los píxeles (casi) transparentes
+
+        Returns:
+            La caja, o None si toda la imagen es fondo
+        """
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+
+        # 255 en los canales que se alejan del fondo más que la tolerancia
+        table = []
+        for value in background:
+            table += [0 if abs(level - value) <= tolerance else 255 for level in range(256)]
+        if img.mode == "RGB":
+            return img.point(table).getbbox()
+
+        table += [0 if use_alpha and level <= tolerance else 255 for level in range(256)]
+        red, green, blue, alpha = img.point(table).split()
+        content = ImageChops.lighter(ImageChops.lighter(red, green), blue)
+        # Contenido: color distinto del fondo y (con use_alpha) no transparente
+        return ImageChops.darker(content, alpha).getbbox()
+
+    @staticmethod
+    def _open_draft(image_path, draft_size, background, tolerance, use_alpha):
         """
-        # Cargar la imagen con PIL y asegurar canal alfa
-        img = Image.open(image_path).convert("RGBA")
+        Abre la imagen; si es JPEG y se da `draft_size`, la decodifica a la escala
+        más reducida con la que el contenido (no el cuadro entero) sigue midiendo
+        al menos `draft_size`.
 
-        # Convertir a escala de grises para encontrar los bordes del contenido
-        gray = img.convert("L")
-        bbox = gray.getbbox()
+        La caja del contenido se estima antes sobre una decodificación mínima
+        (hasta 1/8), que cuesta poco frente a la decodificación completa.
+        """
+        img = Image.open(image_path)
+        if not draft_size or img.format != "JPEG":
+            return img
 
+        width, height = img.size
+        img.draft("RGB", (TRIM_PROXY_SIZE, TRIM_PROXY_SIZE))
+        bbox = ResizeImage.content_bbox(img, background, tolerance, use_alpha)
         if bbox:
-            # Recortar la imagen para eliminar el fondo blanco alrededor
+            scale_x = width / img.width
+            scale_y = height / img.height
+            content_width = max(1.0, (bbox[2] - bbox[0]) * scale_x)
+            content_height = max(1.0, (bbox[3] - bbox[1]) * scale_y)
+        else:
+            content_width, content_height = width, height
+
+        # Tamaño del cuadro completo con el que el contenido mide draft_size
+        request = (min(width, int(np.ceil(draft_size[0] * width / content_width))),
+                   min(height, int(np.ceil(draft_size[1] * height / content_height))))
+
+        if hasattr(image_path, "seek"):
+            image_path.seek(0)
+        img = Image.open(image_path)
+        img.draft("RGB", request)
+        return img
+
+    @staticmethod
+    def load_trimmed(image_path, draft_size=None, background=(255, 255, 255), tolerance=12,
+                     use_alpha=True, make_transparent=False):
+        """
+        Decodifica la imagen una sola vez, en RGBA y recortada a su contenido.
+
+        Args:
+            image_path: Ruta de la imagen o archivo en memoria (ej: io.BytesIO de una descarga)
+            draft_size: Tamaño mínimo (ancho, alto) que se necesita del contenido recortado;
+                para JPEG permite decodificar directamente a una escala reducida (modo draft)
+            background: Color RGB del fondo a recortar
+            tolerance: Diferencia máxima por canal con `background` para considerar un píxel fondo
+            use_alpha: Considerar fondo también los píxeles transparentes
+            make_transparent: Volver transparentes los píxeles de fondo que quedan tras el recorte
+        """
+        img = ResizeImage._open_draft(image_path, draft_size, background, tolerance, use_alpha)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+
+        # Recortar el fondo alrededor del contenido (buscado sobre la imagen completa)
+        # antes de añadir el canal alfa, para convertir solo el área que queda
+        bbox = ResizeImage.content_bbox(img, background, tolerance, use_alpha)
+        if bbox and bbox != (0, 0, img.width, img.height):
             img = img.crop(bbox)
 
+        # Asegurar canal alfa
+        img = img.convert("RGBA")
+
+        if make_transparent:
+            pixels = np.asarray(img)
+            alpha = pixels[..., 3].copy()
+            alpha[ResizeImage._background_mask(pixels, background, tolerance, use_alpha)] = 0
+            img.putalpha(Image.fromarray(alpha))
+        return img
+
+    @staticmethod
+    def _resize(img, size):
+        """Reduce con Image.reduce hasta ~2x el tamaño final y termina con LANCZOS."""
+        factor = min(img.width // size[0], img.height // size[1]) // 2
+        if factor >= 2:
+            img = img.reduce(factor)
+        return img.resize(size, Image.LANCZOS)
+
+    @staticmethod
+    def render(img, target_width, target_height, jpeg=False):
+        """
+        Genera una rendición a partir de una imagen ya recortada (ver load_trimmed).
+
+        Returns:
+            Imagen RGBA con fondo transparente, o RGB con fondo blanco si jpeg=True
+        """
         # Calcular las proporciones
         target_ratio = target_width / target_height
         img_ratio = img.width / img.height
@@ -26,14 +159,14 @@ class ResizeImage:
             # La imagen es más ancha, recortar los lados
             new_height = target_height
             new_width = int(target_height * img_ratio)
-            img_resized = img.resize((new_width, new_height), Image.LANCZOS)
+            img_resized = ResizeImage._resize(img, (new_width, new_height))
             left = int((new_width - target_width) / 2)
             img_cropped = img_resized.crop((left, 0, left + target_width, target_height))
         else:
             # La imagen es más alta, recortar la parte superior e inferior
             new_width = target_width
             new_height = int(target_width / img_ratio)
-            img_resized = img.resize((new_width, new_height), Image.LANCZOS)
+            img_resized = ResizeImage._resize(img, (new_width, new_height))
             top = int((new_height - target_height) / 2)
             img_cropped = img_resized.crop((0, top, target_width, top + target_height))
 
@@ -43,44 +176,228 @@ class ResizeImage:
         background.paste(img_cropped, (0, 0), img_cropped)
 
         # Si el formato de salida es JPEG, convertir a RGB y fondo blanco (JPEG no soporta transparencia)
-        if output_path.lower().endswith('.jpg') or output_path.lower().endswith('.jpeg'):
+        if jpeg:
             # Crear fondo blanco para JPEG
             background_rgb = Image.new("RGB", (target_width, target_height), (255, 255, 255))
             # Usar el canal alfa como máscara para pegar la imagen sobre el fondo blanco
             background_rgb.paste(background, mask=background.split()[3])
-            background_rgb.save(output_path)
-        else:
-            # Guardar la imagen con fondo transparente
-            background.save(output_path)
+            return background_rgb
+        return background
+
+    @staticmethod
+    def resize_and_crop_transparent(image_path, output_path, target_width, target_height, **trim_options):
+        """
+        Redimensiona y recorta la imagen para llenar completamente el área objetivo, dejando el fondo transparente.
+
+        `image_path` puede ser una ruta o un archivo en memoria (io.BytesIO). `trim_options`
+        se pasan a load_trimmed (background, tolerance, use_alpha, make_transparent).
+        """
+        with instrumentacion.span(ETAPA_RESIZE, renditions=1):
+            ResizeImage._resize_and_crop(image_path, output_path, target_width, target_height, **trim_options)
         return True
 
     @staticmethod
-    def process_images_in_folder(input_folder, output_folder, target_width, target_height):
+    def _resize_and_crop(image_path, output_path, target_width, target_height, **trim_options):
+        img = ResizeImage.load_trimmed(image_path, draft_size=(target_width * 2, target_height * 2),
+                                       **trim_options)
+        jpeg = output_path.lower().endswith(JPEG_EXTENSIONS)
+        ResizeImage.render(img, target_width, target_height, jpeg=jpeg).save(output_path)
+
+    @staticmethod
+    def _timed_resize(image_path, output_path, target_width, target_height, **trim_options):
+        """
+        Como resize_and_crop_transparent pero devuelve (duración, excepción o None) en lugar de
+        registrar el span: en un proceso hijo la instrumentación no tiene sinks, así que el
+        proceso padre registra la duración (ver resize_in_pool).
+        """
+        start = time.perf_counter()
+        try:
+            ResizeImage._resize_and_crop(image_path, output_path, target_width, target_height, **trim_options)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    @staticmethod
+    def _record_resize(duration, error_type=None):
+        """Registra en este proceso el span de un redimensionado medido con _timed_resize."""
+        attributes = {"error": error_type} if error_type else {}
+        instrumentacion.registrar_span(ETAPA_RESIZE, duration, renditions=1, **attributes)
+
+    @staticmethod
+    def resize_in_pool(pool, image_path, output_path, target_width, target_height, **trim_options):
+        """
+        resize_and_crop_transparent ejecutado en un ProcessPoolExecutor; el span de
+        redimensionado se registra en el proceso actual.
+        """
+        duration, error = pool.submit(ResizeImage._timed_resize, image_path, output_path,
+                                      target_width, target_height, **trim_options).result()
+        ResizeImage._record_resize(duration, type(error).__name__ if error is not None else None)
+        if error is not None:
+            raise error
+        return True
+
+    @staticmethod
+    def resize_to_renditions(image_path, output_folder, targets, base_name=None, **trim_options):
+        """
+        Genera varias rendiciones de una imagen decodificándola y recortándola una sola vez.
+
+        Args:
+            image_path: Ruta de la imagen original o archivo en memoria (io.BytesIO)
+            output_folder: Carpeta donde guardar las rendiciones
+            targets: Lista de (ancho, alto, formato), ej: [(1000, 700, "png"), (300, 300, "jpg")]
+            base_name: Nombre base de los archivos (por defecto el nombre de la imagen original;
+                obligatorio si image_path está en memoria)
+            trim_options: Opciones de recorte de load_trimmed (background, tolerance, use_alpha, make_transparent)
+
+        Returns:
+            Lista de rutas generadas, en el mismo orden que `targets`
+            (cada archivo se nombra "{base_name}_{ancho}x{alto}.{formato}")
+        """
         os.makedirs(output_folder, exist_ok=True)
+        base_name = base_name or os.path.splitext(os.path.basename(image_path))[0]
+
+        # Decodificar a la escala mínima que sirve para la rendición más grande
+        max_width = max(width for width, _, _ in targets)
+        max_height = max(height for _, height, _ in targets)
+        with instrumentacion.span(ETAPA_RESIZE, renditions=len(targets)):
+            img = ResizeImage.load_trimmed(image_path, draft_size=(max_width * 2, max_height * 2), **trim_options)
+            return ResizeImage.save_renditions(img, output_folder, base_name, targets)
+
+    @staticmethod
+    def save_renditions(img, output_folder, base_name, targets):
+        """Guarda las rendiciones de una imagen ya recortada y devuelve sus rutas."""
+        output_paths = []
+        for width, height, fmt in targets:
+            fmt = fmt.lower().lstrip(".")
+            output_path = os.path.join(output_folder, f"{base_name}_{width}x{height}.{fmt}")
+            rendition = ResizeImage.render(img, width, height, jpeg=f".{fmt}" in JPEG_EXTENSIONS)
+            rendition.save(output_path)
+            output_paths.append(output_path)
+        return output_paths
+
+    @staticmethod
+    def target_size_for(filename, target_width, target_height):
+        """Devuelve el tamaño objetivo de un archivo ("lifestyle" usa siempre 1000x700)."""
+        # Verificar si el nombre del archivo contiene "lifestyle"
+        if "lifestyle" in filename.lower():
+            return 1000, 700
+        return target_width, target_height
+
+    @staticmethod
+    def _trim_signature(trim_options):
+        """Texto que identifica las opciones de recorte con que se generó una salida."""
+        options = {
+            "background": list(trim_options.get("background", (255, 255, 255))),
+            "tolerance": trim_options.get("tolerance", 12),
+            "use_alpha": trim_options.get("use_alpha", True),
+            "make_transparent": trim_options.get("make_transparent", False),
+        }
+        return json.dumps(options, sort_keys=True)
+
+    @staticmethod
+    def _signature_path(output_path):
+        name = hashlib.sha1(os.path.abspath(output_path).encode("utf-8")).hexdigest()
+        return os.path.join(TRIM_SIGNATURE_DIR, f"{name}.json")
 
-        for filename in os.listdir(input_folder):
+    @staticmethod
+    def _write_signature(output_path, trim_options):
+        os.makedirs(TRIM_SIGNATURE_DIR, exist_ok=True)
+        with open(ResizeImage._signature_path(output_path), "w", encoding="utf-8") as f:
+            f.write(ResizeImage._trim_signature(trim_options))
+
+    @staticmethod
+    def is_up_to_date(image_path, output_path, target_width, target_height, **trim_options):
+        """
+        Indica si la salida existe, es más reciente que la entrada, tiene el tamaño objetivo
+        y se generó con las mismas opciones de recorte (ver process_images_in_folder).
+        """
+        if not os.path.exists(output_path):
+            return False
+        if os.path.getmtime(output_path) < os.path.getmtime(image_path):
+            return False
+        try:
+            with open(ResizeImage._signature_path(output_path), encoding="utf-8") as f:
+                if f.read() != ResizeImage._trim_signature(trim_options):
+                    return False
+            # Image.open solo lee la cabecera, no decodifica la imagen
+            with Image.open(output_path) as output_img:
+                return output_img.size == (target_width, target_height)
+        except Exception:
+            return False
+
+    @staticmethod
+    def _process_file(image_path, output_path, target_width, target_height, trim_options=None):
+        """
+        Procesa un archivo y devuelve (estado, error, tiempo) sin propagar excepciones.
+
+        `tiempo` es (duración, tipo de error o None) para que quien lo llama registre el
+        span con _record_resize (puede ejecutarse en un proceso hijo).
+        """
+        trim_options = trim_options or {}
+        duration, error = ResizeImage._timed_resize(image_path, output_path, target_width, target_height,
+                                                    **trim_options)
+        if error is not None:
+            return "failed", str(error), (duration, type(error).__name__)
+        try:
+            ResizeImage._write_signature(output_path, trim_options)
+        except Exception as e:
+            return "failed", str(e), (duration, None)
+        return "processed", None, (duration, None)
+
+    @staticmethod
+    def process_images_in_folder(input_folder, output_folder, target_width, target_height,
+                                 max_workers=1, incremental=False, **trim_options):
+        """
+        Redimensiona todas las imágenes de una carpeta.
+
+        Args:
+            input_folder: Carpeta con las imágenes originales
+            output_folder: Carpeta donde guardar las imágenes procesadas
+            target_width: Ancho objetivo (los archivos "lifestyle" usan 1000x700)
+            target_height: Alto objetivo
+            max_workers: Número de procesos; con 1 se procesa en el proceso actual
+            incremental: Omitir archivos cuya salida ya está al día (las opciones de recorte
+                de cada salida se anotan en src/data/cache/resize)
+            trim_options: Opciones de recorte de load_trimmed (background, tolerance, use_alpha, make_transparent)
+
+        Returns:
+            Resumen con el conteo por estado y el estado de cada archivo
+            ("processed", "skipped" o "failed", más el error si lo hubo)
+        """
+        os.makedirs(output_folder, exist_ok=True)
+
+        files = {}
+        pending = []
+        for filename in sorted(os.listdir(input_folder)):
             if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.avif')):
                 image_path = os.path.join(input_folder, filename)
                 output_path = os.path.join(output_folder, filename)
+                width, height = ResizeImage.target_size_for(filename, target_width, target_height)
 
-                # Verificar si el nombre del archivo contiene "lifestyle"
-                if "lifestyle" in filename.lower():
-                    specific_width = 1000
-                    specific_height = 700
+                if incremental and ResizeImage.is_up_to_date(image_path, output_path, width, height,
+                                                              **trim_options):
+                    files[filename] = {"status": "skipped", "error": None}
                 else:
-                    specific_width = target_width
-                    specific_height = target_height
-
-                try:
-                    success = ResizeImage.resize_and_crop_transparent(
-                        image_path,
-                        output_path,
-                        specific_width,
-                        specific_height
-                    )
-                    if success:
-                        print(f"Procesada: {filename}")
-                    else:
-                        print(f"No se pudo procesar: {filename}")
-                except Exception as e:
-                    print(f"Error procesando {filename}: {e}")
\ No newline at end of file
+                    pending.append((filename, (image_path, output_path, width, height, trim_options)))
+
+        if max_workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(ResizeImage._process_file, *args): filename
+                    for filename, args in pending
+                }
+                for future in as_completed(futures):
+                    status, error, timing = future.result()
+                    ResizeImage._record_resize(*timing)
+                    files[futures[future]] = {"status": status, "error": error}
+        else:
+            for filename, args in pending:
+                status, error, timing = ResizeImage._process_file(*args)
+                ResizeImage._record_resize(*timing)
+                files[filename] = {"status": status, "error": error}
+
+        summary = {"processed": 0, "skipped": 0, "failed": 0}
+        for info in files.values():
+            summary[info["status"]] += 1
+        summary["files"] = dict(sorted(files.items()))
+        return summary
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from typing import Optional
+
+from src.utils.download_utils import ruta_temporal_unica
+
+DIRECTORIO_CACHE_RESULTADOS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache", "resultados"
+)
+
+# Segundos tras los que se vuelve a medir la carpeta aunque no se supere el tamaño
+# (otros procesos pueden estar escribiendo en la misma caché)
+INTERVALO_REVISION = 600
+
+# Al expulsar se baja hasta esta fracción de tamano_maximo, para no volver a
+# recorrer la carpeta en cada guardado cuando la caché está llena
+FRACCION_TRAS_EXPULSAR = 0.9
+
+
+class CacheResultados:
+    """
+    Caché en disco de imágenes generadas, direccionada por contenido.
+
+    La clave es el hash de (modelo, prompt, contenido de la referencia, aspect_ratio,
+    output_format); el valor es el archivo descargado más un JSON con sus metadatos.
+    Cuando el tamaño total supera `tamano_maximo` se expulsan las entradas usadas
+    hace más tiempo. El tamaño se lleva como un total acumulado, así que la carpeta
+    solo se recorre al superarlo (o cada INTERVALO_REVISION segundos).
+    """
+
+    def __init__(self,
+                 directorio: str = DIRECTORIO_CACHE_RESULTADOS,
+                 tamano_maximo: int = 2 * 1024 * 1024 * 1024):
+        """
+        Args:
+            directorio: Carpeta donde se guardan las entradas
+            tamano_maximo: Tamaño total máximo de la caché en bytes
+        """
+        self.directorio = os.path.normpath(directorio)
+        self.tamano_maximo = tamano_maximo
+        self._lock = threading.Lock()
+        # Tamaño total según el último recorrido más lo guardado después (None: sin medir)
+        self._tamano_total = None
+        self._ultima_revision = 0.0
+
+    @staticmethod
+    def clave(modelo: str,
+              prompt: str,
+              hash_referencia: str,
+              aspect_ratio: str,
+              output_format: str) -> str:
+        """Calcula la clave de una generación."""
+        partes = json.dumps([modelo, prompt, hash_referencia, aspect_ratio, output_format])
+        return hashlib.sha256(partes.encode("utf-8")).hexdigest()
+
+    def _ruta_metadatos(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.json")
+
+    def obtener(self, clave: str) -> Optional[dict]:
+        """
+        Busca una entrada en la caché.
+
+        Returns:
+            Metadatos de la entrada (con `ruta_archivo`), o None si no existe
+        """
+        ruta_metadatos = self._ruta_metadatos(clave)
+        try:
+            with open(ruta_metadatos, "r", encoding="utf-8") as f:
+                metadatos = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        ruta_archivo = os.path.join(self.directorio, metadatos["archivo"])
+        if not os.path.exists(ruta_archivo):
+            return None
+
+        # Marcar como usada recientemente para la expulsión LRU
+        os.utime(ruta_metadatos, None)
+        metadatos["ruta_archivo"] = ruta_archivo
+        return metadatos
+
+    def guardar(self, clave: str, ruta_origen: str, metadatos: dict) -> dict:
+        """
+        Copia un archivo generado a la caché junto con sus metadatos.
+
+        Args:
+            clave: Clave calculada con `clave()`
+            ruta_origen: Archivo descargado a guardar
+            metadatos: Información adicional (modelo, prompt, url, etc.)
+
+        Returns:
+            Metadatos guardados
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        nombre = f"{clave}{os.path.splitext(ruta_origen)[1]}"
+
+        ruta_archivo = os.path.join(self.directorio, nombre)
+        ruta_temporal = ruta_temporal_unica(ruta_archivo)
+        shutil.copyfile(ruta_origen, ruta_temporal)
+        os.replace(ruta_temporal, ruta_archivo)
+        return self._guardar_metadatos(clave, nombre, metadatos)
+
+    def guardar_contenido(self, clave: str, contenido: bytes, extension: str, metadatos: dict) -> dict:
+        """
+        Guarda en la caché una imagen que solo está en memoria.
+
+        Args:
+            clave: Clave calculada con `clave()`
+            contenido: Bytes de la imagen
+            extension: Extensión del archivo (ej: ".png")
+            metadatos: Información adicional (modelo, prompt, url, etc.)
+
+        Returns:
+            Metadatos guardados
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        nombre = f"{clave}{extension}"
+
+        ruta_archivo = os.path.join(self.directorio, nombre)
+        ruta_temporal = ruta_temporal_unica(ruta_archivo)
+        with open(ruta_temporal, "wb") as f:
+            f.write(contenido)
+        os.replace(ruta_temporal, ruta_archivo)
+        return self._guardar_metadatos(clave, nombre, metadatos)
+
+    def _guardar_metadatos(self, clave: str, nombre: str, metadatos: dict) -> dict:
+        metadatos = dict(metadatos, archivo=nombre, guardado=time.time())
+        ruta_metadatos = self._ruta_metadatos(clave)
+        ruta_temporal = ruta_temporal_unica(ruta_metadatos)
+        with open(ruta_temporal, "w", encoding="utf-8") as f:
+            json.dump(metadatos, f, indent=4)
+        os.replace(ruta_temporal, ruta_metadatos)
+
+        tamano = os.path.getsize(ruta_metadatos) + os.path.getsize(os.path.join(self.directorio, nombre))
+        with self._lock:
+            revisar = (self._tamano_total is None
+                       or time.monotonic() - self._ultima_revision > INTERVALO_REVISION)
+            if not revisar:
+                self._tamano_total += tamano
+                revisar = self._tamano_total > self.tamano_maximo
+        if revisar:
+            self.expulsar()
+        return metadatos
+
+    def expulsar(self) -> int:
+        """
+        Si se supera `tamano_maximo`, elimina las entradas menos usadas hasta
+        quedar bajo FRACCION_TRAS_EXPULSAR de ese tamaño.
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        with self._lock:
+            if not os.path.isdir(self.directorio):
+                return 0
+
+            entradas = []
+            tamano_total = 0
+            for nombre in os.listdir(self.directorio):
+                if not nombre.endswith(".json"):
+                    continue
+                ruta_metadatos = os.path.join(self.directorio, nombre)
+                clave = nombre[:-len(".json")]
+                archivos = self._archivos_entrada(clave)
+                tamano = sum(os.path.getsize(a) for a in archivos if os.path.exists(a))
+                entradas.append((os.path.getmtime(ruta_metadatos), archivos, tamano))
+                tamano_total += tamano
+
+            eliminadas = 0
+            objetivo = self.tamano_maximo * FRACCION_TRAS_EXPULSAR if tamano_total > self.tamano_maximo else None
+            for _, archivos, tamano in sorted(entradas, key=lambda e: e[0]):
+                if objetivo is None or tamano_total <= objetivo:
+                    break
+                for archivo in archivos:
+                    if os.path.exists(archivo):
+                        os.remove(archivo)
+                tamano_total -= tamano
+                eliminadas += 1
+
+            self._tamano_total = tamano_total
+            self._ultima_revision = time.monotonic()
+            return eliminadas
+
+    def _archivos_entrada(self, clave: str) -> list:
+        """Archivos en disco que pertenecen a una entrada (metadatos y salida)."""
+        ruta_metadatos = self._ruta_metadatos(clave)
+        archivos = [ruta_metadatos]
+        try:
+            with open(ruta_metadatos, "r", encoding="utf-8") as f:
+                archivos.append(os.path.join(self.directorio, json.load(f)["archivo"]))
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        return archivos
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas de la caché."""
+        with self._lock:
+            if os.path.isdir(self.directorio):
+                shutil.rmtree(self.directorio)
+            self._tamano_total = 0
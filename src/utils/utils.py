@@ -1,5 +1,6 @@
 import mimetypes
 import base64
+from typing import List, Optional
 
 def imagen_a_data_url(ruta_imagen: str) -> str:
     """
@@ -29,6 +30,32 @@ def imagen_a_data_url(ruta_imagen: str) -> str:
         raise RuntimeError(f"Error convirtiendo imagen a data URL: {e}")
 
 
+def _url_de(item) -> Optional[str]:
+    """URL de un elemento de output (string, FileOutput con .url o diccionario con 'url')."""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        return item.get("url")
+    if hasattr(item, 'url'):
+        return item.url
+    return None
+
+
+def extraer_urls_imagen(resultado: dict) -> List[str]:
+    """Extrae todas las URLs de imagen del resultado (una por output), en orden."""
+    output = resultado.get("output")
+
+    if not output:
+        raise RuntimeError("No se encontró output en el resultado")
+
+    items = output if isinstance(output, list) else [output]
+    urls = [url for url in (_url_de(item) for item in items) if url]
+
+    if not urls:
+        raise RuntimeError("No se pudo extraer URL de imagen del resultado")
+    return urls
+
+
 def extraer_url_imagen(resultado: dict) -> str:
     """Extrae la URL de la imagen desde el resultado."""
     output = resultado.get("output")
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class ReceptorWebhook:
+    """
+    Servidor HTTP local mínimo que recibe los webhooks de Replicate.
+
+    Replicate envía el JSON completo de la predicción al terminar; el receptor
+    lo guarda por ID de predicción y despierta a quien esté esperando. Los eventos
+    que nadie recoge (IDs desconocidos o esperas abandonadas) se descartan pasada
+    `antiguedad_maxima` o al superar `max_eventos`.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", puerto: int = 8787, url_publica: Optional[str] = None,
+                 max_eventos: int = 10000, antiguedad_maxima: float = 3600.0):
+        """
+        Inicializa el receptor (no lo arranca).
+
+        Args:
+            host: Interfaz donde escuchar
+            puerto: Puerto donde escuchar (0 para uno libre)
+            url_publica: URL accesible desde Replicate (ej: un túnel hacia este puerto).
+                Si no se da, se usa http://{host}:{puerto}/
+            max_eventos: Eventos sin recoger que se conservan como máximo
+            antiguedad_maxima: Segundos que se conserva un evento sin recoger
+        """
+        self.host = host
+        self.puerto = puerto
+        self.url_publica = url_publica
+        self.max_eventos = max_eventos
+        self.antiguedad_maxima = antiguedad_maxima
+        # prediction_id -> (payload, recibido), del más antiguo al más reciente
+        self._eventos = OrderedDict()
+        self._condicion = threading.Condition()
+        self._servidor = None
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        """URL que se pasa como `webhook` al crear la predicción."""
+        if self.url_publica:
+            return self.url_publica
+        return f"http://{self.host}:{self.puerto}/"
+
+    def iniciar(self) -> "ReceptorWebhook":
+        """Arranca el servidor en un hilo en segundo plano."""
+        receptor = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_POST(self):
+                longitud = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(longitud) or b"{}")
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                receptor.registrar(payload)
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), _Manejador)
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        """Detiene el servidor."""
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def registrar(self, payload: dict) -> None:
+        """Guarda el payload de una predicción y notifica a los que esperan."""
+        prediction_id = payload.get("id")
+        if not prediction_id:
+            return
+        ahora = time.monotonic()
+        with self._condicion:
+            self._eventos.pop(prediction_id, None)
+            self._eventos[prediction_id] = (payload, ahora)
+            while self._eventos:
+                _, (_, recibido) = next(iter(self._eventos.items()))
+                if len(self._eventos) <= self.max_eventos and ahora - recibido <= self.antiguedad_maxima:
+                    break
+                self._eventos.popitem(last=False)
+            self._condicion.notify_all()
+
+    def esperar(self, prediction_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Espera el webhook de una predicción terminada.
+
+        Returns:
+            Payload de la predicción, o None si se agotó el tiempo
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._condicion:
+            while True:
+                payload, _ = self._eventos.get(prediction_id, (None, None))
+                if payload and payload.get("status") in ("succeeded", "failed", "canceled"):
+                    return self._eventos.pop(prediction_id)[0]
+
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return None
+                self._condicion.wait(restante)
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Las pruebas importan el proyecto como `src.*`, igual que `python -m src`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# El cliente de Replicate exige un token aunque se hable con el servidor simulado
+os.environ.setdefault("REPLICATE_API_TOKEN", "pruebas")
@@ -0,0 +1,32 @@
+from src.benchmarks.fake_replicate import ServidorReplicateFalso
+from src.processors.generador_imagenes_basico import GeneradorImagenes
+from src.utils.result_cache import CacheResultados
+
+
+class ServidorConFallos(ServidorReplicateFalso):
+    """Servidor simulado en el que fallan las predicciones número `fallan` (empezando en 1)."""
+
+    def __init__(self, fallan=(), **kwargs):
+        super().__init__(retardo_cola=0.01, retardo_ejecucion=0.05, **kwargs)
+        self.fallan = set(fallan)
+        self._creadas = 0
+
+    def crear(self, modelo, cuerpo):
+        prediccion = super().crear(modelo, cuerpo)
+        with self._lock:
+            self._creadas += 1
+            if self._creadas in self.fallan:
+                self.predicciones[prediccion["id"]]["falla"] = True
+        return prediccion
+
+
+def crear_generador(servidor, tmp_path, **kwargs):
+    """GeneradorImagenes contra `servidor` con caché propia y sondeo rápido."""
+    return GeneradorImagenes("google/nano-banana", base_url=servidor.base_url,
+                             cache_resultados=CacheResultados(str(tmp_path / "cache")),
+                             intervalo_inicial=0.02, intervalo_maximo=0.05, **kwargs)
+
+
+def trabajos_de_prueba(tmp_path, cantidad):
+    return [{"prompt": f"moto {i}", "imagen_referencia": "https://cdn/ref.png", "ruta_destino": str(tmp_path),
+             "nombre_carpeta": "motos", "nombre_archivo": f"{i}.png"} for i in range(cantidad)]
@@ -0,0 +1,65 @@
+import csv
+import json
+
+from src.cli import main
+from src.utils.catalog import HuellasCatalogo, publicaciones_cambiadas
+
+COLUMNAS = ["id", "brand", "model", "type", "availability", "link", "image_link"]
+
+
+def _escribir_catalogo(ruta, filas):
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS)
+        escritor.writerows(filas)
+
+
+def _fila(id_, tipo="Naked", imagen="https://cdn/img.png", disponibilidad="in stock"):
+    return [id_, "Honda", "CBF 160", tipo, disponibilidad, f"https://galgo/{id_}", imagen]
+
+
+def _prompts(catalogo, huellas, salida):
+    codigo = main(["--silencioso", "prompts", "--catalogo", str(catalogo), "--huellas", str(huellas),
+                   "--solo-cambios", "--imagenes", "2", "--seed", "1", "--salida", str(salida)])
+    assert codigo == 0
+    with open(salida, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def test_solo_cambios_segunda_ejecucion_no_genera_nada(tmp_path):
+    catalogo = tmp_path / "catalogo.csv"
+    huellas = tmp_path / "huellas.json"
+    _escribir_catalogo(catalogo, [_fila("MX1"), _fila("MX2", tipo="Deportiva")])
+
+    primera = _prompts(catalogo, huellas, tmp_path / "primera.jsonl")
+    assert sorted({fila["id"] for fila in primera}) == ["MX1", "MX2"]
+    assert len(primera) == 4
+
+    assert _prompts(catalogo, huellas, tmp_path / "segunda.jsonl") == []
+
+
+def test_solo_cambios_repite_las_publicaciones_modificadas(tmp_path):
+    catalogo = tmp_path / "catalogo.csv"
+    huellas = tmp_path / "huellas.json"
+    _escribir_catalogo(catalogo, [_fila("MX1"), _fila("MX2")])
+    _prompts(catalogo, huellas, tmp_path / "primera.jsonl")
+
+    _escribir_catalogo(catalogo, [_fila("MX1", imagen="https://cdn/nueva.png"), _fila("MX2"), _fila("MX3")])
+    segunda = _prompts(catalogo, huellas, tmp_path / "segunda.jsonl")
+    assert sorted({fila["id"] for fila in segunda}) == ["MX1", "MX3"]
+
+
+def test_huellas_sin_confirmar_siguen_como_cambiadas(tmp_path):
+    catalogo = tmp_path / "catalogo.csv"
+    _escribir_catalogo(catalogo, [_fila("MX1"), _fila("MX2"), _fila("MX3", disponibilidad="out of stock")])
+    huellas = HuellasCatalogo(str(tmp_path / "huellas.json"))
+
+    cambiadas = list(publicaciones_cambiadas(huellas, str(catalogo)))
+    assert [p.id for p in cambiadas] == ["MX1", "MX2"]
+
+    # Solo se confirma la primera (la segunda "falló")
+    huellas.confirmar(cambiadas[0])
+    huellas.guardar()
+
+    recargadas = HuellasCatalogo(str(tmp_path / "huellas.json"))
+    assert [p.id for p in publicaciones_cambiadas(recargadas, str(catalogo))] == ["MX2"]
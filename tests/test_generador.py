@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from servidor_pruebas import ServidorConFallos, crear_generador
+
+
+def test_generar_urls_devuelve_las_salidas_que_terminaron(tmp_path):
+    with ServidorConFallos(fallan={2}) as servidor:
+        urls = crear_generador(servidor, tmp_path).generar_urls("moto", "https://cdn/ref.png", num_salidas=3)
+    assert len(urls) == 2
+
+
+def test_generar_urls_falla_si_no_termina_ninguna(tmp_path):
+    with ServidorConFallos(fallan={1, 2}) as servidor:
+        with pytest.raises(RuntimeError):
+            crear_generador(servidor, tmp_path).generar_urls("moto", "https://cdn/ref.png", num_salidas=2)
+
+
+def test_generar_y_descargar_usa_la_cache(tmp_path):
+    with ServidorConFallos() as servidor:
+        generador = crear_generador(servidor, tmp_path)
+        argumentos = ("moto", "https://cdn/ref.png", str(tmp_path / "salida"), "a.png", "moto")
+        primera = generador.generar_y_descargar(*argumentos)
+        segunda = generador.generar_y_descargar(*argumentos)
+        assert primera == segunda
+        assert servidor.contadores["create"] == 1
+
+
+class _CoberturaFija:
+    """Política de cobertura con umbral fijo y cupo ilimitado."""
+
+    def __init__(self, umbral):
+        self._umbral = umbral
+
+    def umbral(self):
+        return self._umbral
+
+    def reservar(self):
+        return True
+
+    def liberar(self):
+        pass
+
+    def registrar(self, duracion):
+        pass
+
+
+def test_cobertura_cancela_ambas_si_la_espera_falla(tmp_path, monkeypatch):
+    import src.processors.generador_imagenes_basico as modulo
+    from src.utils.replicate_utils import TiempoAgotadoError
+
+    canceladas = []
+    plazos = []
+
+    def esperar_una(self, prediction_id, timeout):
+        # La espera hasta el umbral dura más que el propio umbral
+        time.sleep(0.3)
+        raise TiempoAgotadoError("lenta")
+
+    def esperar_primera(client, ids, intervalo_inicial, intervalo_maximo, timeout):
+        plazos.append(timeout)
+        raise ValueError("error no reintentable")
+
+    monkeypatch.setattr(modulo.GeneradorImagenes, "_esperar_una", esperar_una)
+    monkeypatch.setattr(modulo, "esperar_primera", esperar_primera)
+    monkeypatch.setattr(modulo, "cancelar_prediccion", lambda client, prediction_id: canceladas.append(prediction_id))
+
+    with ServidorConFallos() as servidor:
+        generador = crear_generador(servidor, tmp_path, cobertura=_CoberturaFija(0.2))
+        with pytest.raises(ValueError):
+            generador._esperar_con_cobertura(["original"], 10.0, lambda: "duplicado")
+
+    assert sorted(canceladas) == ["duplicado", "original"]
+    # El plazo del duplicado descuenta lo ya esperado
+    assert plazos and plazos[0] <= 10.0 - 0.3
@@ -0,0 +1,50 @@
+import os
+
+from servidor_pruebas import ServidorConFallos, crear_generador, trabajos_de_prueba
+from src.processors.generador_lotes import GeneradorLotes
+from src.utils.job_ledger import RegistroTrabajos, id_trabajo, ESTADO_DESCARGADO
+
+
+def test_el_lote_sigue_aunque_falle_un_trabajo(tmp_path):
+    trabajos = trabajos_de_prueba(tmp_path, 6)
+    with ServidorConFallos(fallan={3}) as servidor:
+        resultado = GeneradorLotes(crear_generador(servidor, tmp_path), concurrencia=3).procesar(trabajos)
+
+    resumen = resultado["resumen"]
+    assert (resumen["exitosos"], resumen["fallidos"]) == (5, 1)
+    assert [r["indice"] for r in resultado["resultados"]] == list(range(6))
+    for r in resultado["resultados"]:
+        assert r["error"] or os.path.exists(r["ruta"])
+
+
+def test_reanudar_solo_repite_los_fallidos(tmp_path):
+    trabajos = trabajos_de_prueba(tmp_path, 4)
+    registro = RegistroTrabajos(str(tmp_path / "registro.sqlite"))
+    with ServidorConFallos(fallan={2}) as servidor:
+        primera = GeneradorLotes(crear_generador(servidor, tmp_path), concurrencia=1, registro=registro)
+        assert primera.procesar(trabajos)["resumen"]["fallidos"] == 1
+
+    with ServidorConFallos() as servidor:
+        segunda = GeneradorLotes(crear_generador(servidor, tmp_path), concurrencia=2, registro=registro)
+        resumen = segunda.reanudar()["resumen"]
+        assert servidor.contadores["create"] == 1
+
+    assert (resumen["total"], resumen["exitosos"]) == (1, 1)
+    assert registro.resumen() == {ESTADO_DESCARGADO: 4}
+
+
+def test_reanudar_consulta_la_prediccion_ya_enviada(tmp_path):
+    trabajo = trabajos_de_prueba(tmp_path, 1)[0]
+    registro = RegistroTrabajos(str(tmp_path / "registro.sqlite"))
+    with ServidorConFallos() as servidor:
+        generador = crear_generador(servidor, tmp_path)
+        # Ejecución interrumpida justo después de enviar la predicción
+        registro.encolar(id_trabajo(trabajo), trabajo)
+        registro.marcar_enviado(id_trabajo(trabajo), generador.enviar_prediccion(trabajo["prompt"],
+                                                                                trabajo["imagen_referencia"]))
+
+        resumen = GeneradorLotes(generador, registro=registro).reanudar()["resumen"]
+        assert servidor.contadores["create"] == 1
+
+    assert resumen["exitosos"] == 1
+    assert registro.obtener(id_trabajo(trabajo))["estado"] == ESTADO_DESCARGADO
@@ -0,0 +1,60 @@
+import time
+
+from servidor_pruebas import ServidorConFallos, crear_generador, trabajos_de_prueba
+from src.processors.worker import TrabajadorCola
+from src.utils.job_queue import ColaTrabajos, ESTADO_FALLIDO, ESTADO_TERMINADO
+
+
+def _cola(tmp_path, trabajos, **kwargs):
+    cola = ColaTrabajos(str(tmp_path / "cola.sqlite"), **kwargs)
+    cola.encolar(trabajos)
+    return cola
+
+
+def test_una_concesion_vencida_pasa_a_otro_trabajador(tmp_path):
+    cola = _cola(tmp_path, trabajos_de_prueba(tmp_path, 1))
+    tomado = cola.tomar("a", 0.05)
+    assert cola.tomar("b", 60) is None
+
+    time.sleep(0.1)
+    retomado = cola.tomar("b", 60)
+    assert retomado["id"] == tomado["id"]
+    assert retomado["intentos"] == 2
+    # El primer trabajador ya no puede renovar ni completar
+    assert cola.renovar([tomado["id"]], "a", 60) == [tomado["id"]]
+    assert not cola.completar(tomado["id"], "a")
+    assert cola.completar(tomado["id"], "b")
+    assert cola.resumen() == {ESTADO_TERMINADO: 1}
+
+
+def test_el_latido_mantiene_la_concesion(tmp_path):
+    cola = _cola(tmp_path, trabajos_de_prueba(tmp_path, 1))
+    tomado = cola.tomar("a", 0.1)
+    for _ in range(3):
+        time.sleep(0.05)
+        assert cola.renovar([tomado["id"]], "a", 0.1) == []
+    assert cola.tomar("b", 60) is None
+
+
+def test_los_intentos_se_agotan_y_liberar_no_cuenta(tmp_path):
+    cola = _cola(tmp_path, trabajos_de_prueba(tmp_path, 1), max_intentos=2)
+    tomado = cola.tomar("a", 60)
+    assert cola.liberar(tomado["id"], "a")
+    assert cola.tomar("a", 60)["intentos"] == 1
+
+    assert cola.fallar(tomado["id"], "a", "error")
+    assert cola.tomar("a", 0.01)["intentos"] == 2
+    time.sleep(0.05)
+    assert cola.tomar("b", 60) is None
+    assert cola.resumen() == {ESTADO_FALLIDO: 1}
+
+
+def test_el_trabajador_vacia_la_cola(tmp_path):
+    cola = _cola(tmp_path, trabajos_de_prueba(tmp_path, 5), max_intentos=2)
+    with ServidorConFallos(fallan={1}) as servidor:
+        trabajador = TrabajadorCola(cola, crear_generador(servidor, tmp_path), concurrencia=2, duracion_lease=5)
+        resumen = trabajador.ejecutar(espera_vacia=0.05)["resumen"]
+
+    # El trabajo cuya primera predicción falló se reintenta en una segunda toma
+    assert cola.resumen() == {ESTADO_TERMINADO: 5}
+    assert resumen["exitosos"] == 5
@@ -0,0 +1,18 @@
+from src.utils.metrics import AgregadorMemoria
+
+
+def _span(duracion):
+    return {"tipo": "span", "etapa": "descarga", "duracion": duracion}
+
+
+def test_las_muestras_cubren_todo_el_proceso_y_no_solo_el_principio():
+    agregador = AgregadorMemoria(max_muestras=100)
+    for _ in range(1000):
+        agregador.registrar(_span(0.01))
+    for _ in range(9000):
+        agregador.registrar(_span(1.0))
+
+    etapa = agregador.resumen()["etapas"]["descarga"]
+    assert etapa["total"] == 10000
+    # Con solo las primeras 100 muestras el p50 sería 0.01
+    assert etapa["p50"] == 1.0
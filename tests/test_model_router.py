@@ -0,0 +1,26 @@
+from src.processors.generador_imagenes_basico import GeneradorImagenes
+from src.processors.model_router import EnrutadorModelos
+from src.utils.result_cache import CacheResultados
+
+
+def test_clave_cache_con_enrutador_no_coincide_con_la_del_modelo_principal(tmp_path):
+    cache = CacheResultados(str(tmp_path / "cache"))
+    solo = GeneradorImagenes("proveedor/a", cache_resultados=cache)
+    enrutado = GeneradorImagenes(enrutador=EnrutadorModelos(["proveedor/a", "proveedor/b"]), cache_resultados=cache)
+
+    argumentos = ("una moto", "https://cdn/ref.png", "4:3", "png")
+    assert enrutado.modelo == "proveedor/a"
+    assert enrutado.clave_cache(*argumentos) != solo.clave_cache(*argumentos)
+
+
+def test_enrutador_prefiere_el_modelo_mas_rapido_y_evita_el_que_falla():
+    enrutador = EnrutadorModelos(["proveedor/a", "proveedor/b"], latencia_inicial=10.0)
+    for _ in range(5):
+        enrutador.iniciar("proveedor/b")
+        enrutador.registrar_exito("proveedor/b", 1.0)
+    assert enrutador.elegir() == "proveedor/b"
+
+    for _ in range(5):
+        enrutador.iniciar("proveedor/b")
+        enrutador.registrar_fallo("proveedor/b")
+    assert enrutador.elegir() == "proveedor/a"
@@ -0,0 +1,19 @@
+from servidor_pruebas import ServidorConFallos, crear_generador, trabajos_de_prueba
+from src.processors.pipeline import PipelineImagenes
+from src.utils.metrics import AgregadorMemoria, ETAPA_RESIZE, instrumentacion
+
+
+def test_el_resize_en_procesos_se_registra_en_el_padre(tmp_path):
+    trabajos = trabajos_de_prueba(tmp_path, 3)
+    agregador = AgregadorMemoria()
+    instrumentacion.agregar_sink(agregador)
+    try:
+        with ServidorConFallos() as servidor:
+            pipeline = PipelineImagenes(crear_generador(servidor, tmp_path), procesos_resize=2,
+                                        carpeta_resize=str(tmp_path / "resize"), ancho=400, alto=300)
+            resultado = pipeline.procesar(trabajos)
+    finally:
+        instrumentacion.quitar_sink(agregador)
+
+    assert all(r["ruta_resize"] for r in resultado["resultados"])
+    assert agregador.resumen()["etapas"][ETAPA_RESIZE]["total"] == 3
@@ -0,0 +1,23 @@
+import time
+
+from src.utils.rate_limiter import LimitadorTokens
+
+
+def test_penalizar_respeta_el_tiempo_completo():
+    limitador = LimitadorTokens(tasa=10, capacidad=10)
+    # Sin llamadas durante un rato: la cubeta acumula tiempo sin contabilizar
+    time.sleep(0.3)
+    limitador.penalizar(0.5)
+
+    inicio = time.monotonic()
+    limitador.adquirir()
+    assert time.monotonic() - inicio >= 0.5
+
+
+def test_adquirir_respeta_la_tasa():
+    limitador = LimitadorTokens(tasa=20, capacidad=1)
+    inicio = time.monotonic()
+    for _ in range(5):
+        limitador.adquirir()
+    # La primera es inmediata; las otras cuatro esperan 1/20 s cada una
+    assert time.monotonic() - inicio >= 4 / 20 * 0.9
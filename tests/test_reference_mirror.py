@@ -0,0 +1,30 @@
+import os
+
+from src.benchmarks.fake_replicate import ServidorReplicateFalso
+from src.processors.generador_imagenes_basico import GeneradorImagenes
+from src.utils.reference_mirror import EspejoReferencias
+
+
+def test_el_generador_usa_la_copia_del_espejo(tmp_path):
+    with ServidorReplicateFalso() as servidor:
+        url = f"{servidor.base_url}/files/moto.png"
+        espejo = EspejoReferencias(str(tmp_path / "espejo"))
+        espejo.sincronizar([url])
+        generador = GeneradorImagenes("google/nano-banana", base_url=servidor.base_url, espejo=espejo)
+
+        ruta = generador.resolver_referencia(url)
+        otra = f"{servidor.base_url}/files/no-espejada.png"
+        assert ruta == espejo.ruta_local(url)
+        assert os.path.exists(ruta)
+        assert generador.resolver_referencia(otra) == otra
+
+
+def test_el_espejo_no_deja_temporales(tmp_path):
+    with ServidorReplicateFalso() as servidor:
+        espejo = EspejoReferencias(str(tmp_path / "espejo"))
+        urls = [f"{servidor.base_url}/files/{i}.png" for i in range(4)]
+        espejo.sincronizar(urls)
+        espejo.sincronizar(urls)
+
+    restos = [nombre for _, _, archivos in os.walk(tmp_path) for nombre in archivos if nombre.endswith(".part")]
+    assert restos == []
@@ -0,0 +1,53 @@
+import os
+
+from PIL import Image
+
+from src.utils.metrics import AgregadorMemoria, ETAPA_RESIZE, instrumentacion
+from src.utils.resize_image import ResizeImage
+
+
+def _imagen_con_producto(ruta):
+    img = Image.new("RGB", (1200, 900), (255, 255, 255))
+    img.paste((30, 90, 200), (400, 300, 800, 600))
+    img.save(ruta)
+
+
+def test_content_bbox_conserva_lineas_finas():
+    img = Image.new("RGB", (3000, 2000), (255, 255, 255))
+    img.paste((30, 90, 200), (1000, 800, 2000, 1200))
+    img.paste((150, 150, 150), (100, 0, 101, 2000))
+    assert ResizeImage.content_bbox(img) == (100, 0, 2000, 2000)
+
+
+def test_incremental_reprocesa_al_cambiar_opciones_sin_ensuciar_la_salida(tmp_path):
+    entrada, salida = tmp_path / "entrada", tmp_path / "salida"
+    entrada.mkdir()
+    _imagen_con_producto(entrada / "moto.png")
+
+    def procesar(**opciones):
+        return ResizeImage.process_images_in_folder(str(entrada), str(salida), 400, 300, incremental=True,
+                                                    **opciones)
+
+    assert procesar()["processed"] == 1
+    assert procesar()["skipped"] == 1
+    assert procesar(tolerance=30)["processed"] == 1
+    assert procesar(tolerance=30)["skipped"] == 1
+    assert os.listdir(salida) == ["moto.png"]
+
+
+def test_los_spans_de_los_procesos_hijos_llegan_al_padre(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    for i in range(3):
+        _imagen_con_producto(entrada / f"moto{i}.png")
+
+    agregador = AgregadorMemoria()
+    instrumentacion.agregar_sink(agregador)
+    try:
+        resumen = ResizeImage.process_images_in_folder(str(entrada), str(tmp_path / "salida"), 400, 300,
+                                                       max_workers=2)
+    finally:
+        instrumentacion.quitar_sink(agregador)
+
+    assert resumen["processed"] == 3
+    assert agregador.resumen()["etapas"][ETAPA_RESIZE]["total"] == 3
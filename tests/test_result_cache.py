@@ -0,0 +1,36 @@
+import os
+import threading
+
+from src.utils.result_cache import CacheResultados
+
+
+def test_guardados_simultaneos_de_la_misma_clave(tmp_path):
+    cache = CacheResultados(str(tmp_path / "cache"))
+    errores = []
+
+    def guardar(i):
+        try:
+            cache.guardar_contenido("misma", bytes([i]) * 50_000, ".png", {"hilo": i})
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=guardar, args=(i,)) for i in range(16)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert sorted(os.listdir(cache.directorio)) == ["misma.json", "misma.png"]
+    assert cache.obtener("misma") is not None
+
+
+def test_expulsa_las_entradas_menos_usadas(tmp_path):
+    cache = CacheResultados(str(tmp_path / "cache"), tamano_maximo=10_000)
+    for i in range(20):
+        cache.guardar_contenido(f"k{i}", b"x" * 1_000, ".png", {})
+
+    tamano = sum(os.path.getsize(os.path.join(cache.directorio, n)) for n in os.listdir(cache.directorio))
+    assert tamano <= 10_000
+    assert cache.obtener("k19") is not None
+    assert cache.obtener("k0") is None